@@ -0,0 +1,135 @@
+# api/enrollment_cache.py
+
+"""
+Enrollment membership cache.
+
+Each user's enrolled course ids are kept in a small process-local LRU in
+front of the shared Django cache (Redis). The shared entry is keyed by a
+per-user version. Writers (enrollment signals, on commit) only bump the
+version and drop the local entry; the next read reloads from the DB.
+Readers fill a miss with cache.add, never set, so a reader that loaded
+the DB just before a payment committed cannot overwrite newer state:
+its entry lands under the old version, which nobody reads any more.
+
+A local hit only ever answers "enrolled"; a local miss re-checks the
+shared cache, so new enrollments never wait for the local TTL. Removed
+enrollments can stay visible in other workers for up to
+ENROLLMENT_LOCAL_CACHE_TTL seconds.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+from api.models import Enrollment
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY = "enrollments:v2:{user_id}:{version}"
+VERSION_KEY = "enrollments:version:{user_id}"
+
+
+class _LocalLRU:
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+
+_local = _LocalLRU(
+    maxsize=getattr(settings, "ENROLLMENT_LOCAL_CACHE_SIZE", 10000),
+    ttl=getattr(settings, "ENROLLMENT_LOCAL_CACHE_TTL", 30),
+)
+
+
+def _load_from_db(user_id):
+    return frozenset(
+        Enrollment.objects.filter(user_id=user_id).values_list("course_id", flat=True)
+    )
+
+
+def _cache_version(user_id):
+    return cache.get(VERSION_KEY.format(user_id=user_id)) or 0
+
+
+def invalidate_enrollments(user_id):
+    """
+    Make every worker reload this user's enrollments on its next read.
+    Call after the enrollment change is committed.
+    """
+    _local.pop(user_id)
+    try:
+        # no timeout: an evicted version would bring old entries back
+        cache.set(VERSION_KEY.format(user_id=user_id), time.time_ns(), None)
+    except Exception as exc:
+        logger.warning("Enrollment cache invalidation failed: %s", exc)
+
+
+def get_enrolled_course_ids(user_id):
+    try:
+        key = CACHE_KEY.format(user_id=user_id, version=_cache_version(user_id))
+        cached = cache.get(key)
+    except Exception as exc:
+        logger.warning("Enrollment cache read failed: %s", exc)
+        key = cached = None
+
+    if cached is None:
+        course_ids = _load_from_db(user_id)
+        if key is not None:
+            try:
+                cache.add(key, sorted(course_ids), getattr(settings, "ENROLLMENT_CACHE_TTL", 60 * 60))
+            except Exception as exc:
+                logger.warning("Enrollment cache write failed: %s", exc)
+    else:
+        course_ids = frozenset(cached)
+
+    _local.set(user_id, course_ids)
+    return course_ids
+
+
+def is_enrolled(user, course):
+    """
+    Cached replacement for Enrollment.objects.filter(user=, course=).exists().
+    `course` may be a Course instance or an id.
+    """
+    if user is None or not getattr(user, "is_authenticated", False):
+        return False
+
+    try:
+        course_id = int(getattr(course, "pk", course))
+    except (TypeError, ValueError):
+        return False
+
+    course_ids = _local.get(user.id)
+    if course_ids is not None and course_id in course_ids:
+        return True
+
+    return course_id in get_enrolled_course_ids(user.id)
@@ -0,0 +1,126 @@
+# api/grading.py
+
+"""
+Test grading.
+
+A test's answer key ({question id: (correct answer, marks)}) is loaded in
+one query and cached; Question save/delete signals drop the cached key.
+A submission is scored in memory and stored with one bulk_create.
+"""
+
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from api.models import Question, StudentAnswer, StudentTest
+
+logger = logging.getLogger(__name__)
+
+ANSWER_KEY_CACHE_KEY = "answer_key:v1:{test_id}"
+
+PASS_RATIO = 0.5
+
+
+def _load_answer_key(test_id):
+    return {
+        question_id: (correct_answer, marks)
+        for question_id, correct_answer, marks in Question.objects.filter(
+            test_id=test_id
+        ).values_list("id", "correct_answer", "marks")
+    }
+
+
+def get_answer_key(test_id):
+    key = ANSWER_KEY_CACHE_KEY.format(test_id=test_id)
+    try:
+        cached = cache.get(key)
+    except Exception as exc:
+        logger.warning("Answer key cache read failed: %s", exc)
+        cached = None
+
+    if cached is not None:
+        # JSON-safe form: [[question_id, correct_answer, marks], ...]
+        return {row[0]: (row[1], row[2]) for row in cached}
+
+    answer_key = _load_answer_key(test_id)
+    try:
+        cache.set(
+            key,
+            [[qid, correct, marks] for qid, (correct, marks) in answer_key.items()],
+            getattr(settings, "ANSWER_KEY_CACHE_TTL", 60 * 60),
+        )
+    except Exception as exc:
+        logger.warning("Answer key cache write failed: %s", exc)
+    return answer_key
+
+
+def invalidate_answer_key(test_id):
+    try:
+        cache.delete(ANSWER_KEY_CACHE_KEY.format(test_id=test_id))
+    except Exception as exc:
+        logger.warning("Answer key cache delete failed: %s", exc)
+
+
+def grade_answers(answer_key, answers):
+    """
+    Score `answers` ({question id: selected option}) against the key.
+    Unknown question ids are ignored; total counts answered questions only.
+
+    Returns (score, total, graded) where graded is a list of
+    (question_id, selected, is_correct, marks_awarded).
+    """
+    score = 0
+    total = 0
+    graded = []
+
+    for qid, selected in answers.items():
+        try:
+            question_id = int(qid)
+        except (TypeError, ValueError):
+            continue
+
+        entry = answer_key.get(question_id)
+        if entry is None:
+            continue
+
+        correct_answer, question_marks = entry
+        is_correct = correct_answer == selected
+        marks = question_marks if is_correct else 0
+
+        score += marks
+        total += question_marks
+        graded.append((question_id, selected, is_correct, marks))
+
+    return score, total, graded
+
+
+def submit_test_attempt(user, test, answers):
+    """
+    Grade a submission and store the attempt with all its answers in one
+    transaction. Returns the saved StudentTest.
+    """
+    score, total, graded = grade_answers(get_answer_key(test.id), answers)
+
+    with transaction.atomic():
+        student_test = StudentTest.objects.create(
+            user=user,
+            test=test,
+            score=score,
+            total_marks=total,
+            passed=total > 0 and score >= (total * PASS_RATIO),
+        )
+
+        StudentAnswer.objects.bulk_create([
+            StudentAnswer(
+                student_test=student_test,
+                question_id=question_id,
+                selected_answer=selected,
+                is_correct=is_correct,
+                marks_awarded=marks,
+            )
+            for question_id, selected, is_correct, marks in graded
+        ])
+
+    return student_test
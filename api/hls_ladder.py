@@ -0,0 +1,388 @@
+# api/hls_ladder.py
+
+"""
+Source-aware HLS rendition ladder.
+
+The source is probed first; only ladder rungs that do not upscale it are
+encoded (a source smaller than every rung gets one rung at its own
+size). Frame rate sets the GOP so every segment starts on a keyframe,
+and sources with audio also get an audio-only rendition. master.m3u8 is
+written by us from the chosen ladder rather than by ffmpeg.
+
+The ladder is encoded either by one ffmpeg process (build_hls_command)
+or by one process per rendition (build_rendition_commands).
+"""
+
+import json
+import os
+import re
+import subprocess
+from fractions import Fraction
+
+from django.conf import settings
+
+AUDIO_CODEC = "mp4a.40.2"   # AAC-LC
+
+# (max short side, max fps) → H.264 level, as used in the CODECS attribute
+_H264_LEVELS = [
+    (720, 30, "3.1", "1f"),
+    (720, 60, "3.2", "20"),
+    (1080, 30, "4.0", "28"),
+    (1080, 60, "4.2", "2a"),
+]
+_H264_LEVEL_MAX = ("5.1", "33")
+
+
+def probe_source(path):
+    """
+    Width, height, fps, codecs, bitrate, audio presence and duration of
+    the source. Falls back to parsing `ffmpeg -i` when ffprobe is not
+    installed.
+    """
+    try:
+        result = subprocess.run(
+            [
+                "ffprobe", "-v", "error",
+                "-show_entries",
+                "stream=codec_type,codec_name,width,height,avg_frame_rate,r_frame_rate"
+                ":format=duration,bit_rate",
+                "-of", "json",
+                path,
+            ],
+            capture_output=True,
+            text=True,
+        )
+    except FileNotFoundError:
+        return _probe_with_ffmpeg(path)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffprobe failed: {result.stderr[-300:]}")
+
+    data = json.loads(result.stdout or "{}")
+    streams = data.get("streams", [])
+    video = next((s for s in streams if s.get("codec_type") == "video"), None)
+    audio = next((s for s in streams if s.get("codec_type") == "audio"), None)
+    if not video:
+        raise RuntimeError("No video stream in upload")
+
+    fps = 30.0
+    for key in ("avg_frame_rate", "r_frame_rate"):
+        try:
+            value = float(Fraction(video.get(key) or "0/1"))
+        except (ValueError, ZeroDivisionError):
+            value = 0
+        if value > 0:
+            fps = value
+            break
+
+    return {
+        "width": int(video.get("width") or 0),
+        "height": int(video.get("height") or 0),
+        "fps": round(fps, 3),
+        "has_audio": audio is not None,
+        "duration": float(data.get("format", {}).get("duration") or 0),
+        "video_codec": video.get("codec_name") or "",
+        "audio_codec": (audio or {}).get("codec_name") or "",
+        "bitrate": int(data.get("format", {}).get("bit_rate") or 0),
+    }
+
+
+def _probe_with_ffmpeg(path):
+    result = subprocess.run(
+        ["ffmpeg", "-hide_banner", "-i", path],
+        capture_output=True,
+        text=True,
+    )
+    output = result.stderr
+    video = re.search(r"Stream #\S+.*?: Video: (\w+).*?, (\d{2,5})x(\d{2,5})", output)
+    if not video:
+        raise RuntimeError("No video stream in upload")
+    audio = re.search(r"Stream #\S+.*?: Audio: (\w+)", output)
+    bitrate = re.search(r"Duration: .*?bitrate: (\d+) kb/s", output)
+    fps = re.search(r"Stream #\S+.*?: Video: .*?([\d.]+) fps", output)
+    duration = re.search(r"Duration: (\d+):(\d+):([\d.]+)", output)
+    return {
+        "width": int(video.group(2)),
+        "height": int(video.group(3)),
+        "fps": round(float(fps.group(1)), 3) if fps else 30.0,
+        "has_audio": audio is not None,
+        "duration": (
+            int(duration.group(1)) * 3600 + int(duration.group(2)) * 60 + float(duration.group(3))
+            if duration else 0.0
+        ),
+        "video_codec": video.group(1),
+        "audio_codec": audio.group(1) if audio else "",
+        "bitrate": int(bitrate.group(1)) * 1000 if bitrate else 0,
+    }
+
+
+def _even(value):
+    return max(int(round(value / 2.0)) * 2, 2)
+
+
+def _h264_level(short_side, fps):
+    for max_side, max_fps, level, hex_level in _H264_LEVELS:
+        if short_side <= max_side and fps <= max_fps + 0.5:
+            return level, hex_level
+    return _H264_LEVEL_MAX
+
+
+def build_ladder(source):
+    """
+    Renditions for this source, smallest first. Each rung: name, width,
+    height, bitrate/maxrate/bufsize (kbit/s), level and CODECS string.
+    """
+    src_w, src_h = source["width"], source["height"]
+    short_side = min(src_w, src_h)
+    portrait = src_h > src_w
+    fps = source["fps"]
+    # high frame rate needs more bits for the same quality
+    fps_factor = 1.5 if fps > 30.5 else 1.0
+
+    rungs = sorted(settings.HLS_LADDER, key=lambda rung: rung["height"])
+    chosen = [rung for rung in rungs if rung["height"] <= short_side]
+
+    if not chosen:
+        # smaller than every rung: one rendition at source size, bitrate
+        # scaled by pixel count from the smallest rung
+        base = rungs[0]
+        chosen = [{
+            "name": f"{_even(short_side)}p",
+            "height": _even(short_side),
+            "bitrate": max(int(base["bitrate"] * (short_side / base["height"]) ** 2), 200),
+        }]
+
+    ladder = []
+    for rung in chosen:
+        target = rung["height"]
+        scaled_long = _even((src_w if not portrait else src_h) * target / short_side)
+        width, height = (target, scaled_long) if portrait else (scaled_long, target)
+
+        bitrate = int(rung["bitrate"] * fps_factor)
+        level, hex_level = _h264_level(target, fps)
+        ladder.append({
+            "name": rung["name"],
+            "width": width,
+            "height": height,
+            # scale filter arguments (keep aspect, force even size)
+            "scale": f"{target}:-2" if portrait else f"-2:{target}",
+            "bitrate": bitrate,
+            "maxrate": int(bitrate * 1.07),
+            "bufsize": int(bitrate * 1.5),
+            "level": level,
+            "codecs": f"avc1.6400{hex_level}",
+        })
+    return ladder
+
+
+def _keyframe_args(source):
+    # same forced keyframe times in every process/rendition, so segment
+    # boundaries line up across the ladder for ABR switching
+    hls_time = settings.HLS_SEGMENT_SECONDS
+    gop = str(max(int(round(source["fps"] * hls_time)), 1))
+    return [
+        "-g", gop, "-keyint_min", gop, "-sc_threshold", "0",
+        "-force_key_frames", f"expr:gte(t,n_forced*{hls_time})",
+        "-pix_fmt", "yuv420p",
+    ]
+
+
+def _hls_output_args(hls_root, variant, hls_flags):
+    return [
+        "-hls_time", str(settings.HLS_SEGMENT_SECONDS),
+        "-hls_playlist_type", "vod",
+        "-hls_flags", hls_flags,
+        "-hls_segment_filename", os.path.join(hls_root, variant, "segment_%03d.ts"),
+    ]
+
+
+def build_hls_command(*, input_path, hls_root, source, ladder, encoder,
+                      hls_flags, extra_output_args=()):
+    """
+    The whole ladder from one ffmpeg process (split filter + var_stream_map).
+    extra_output_args follow -i, so they apply to the outputs (e.g. the
+    encoder's -threads), not to decoding the input.
+    """
+    has_audio = source["has_audio"]
+
+    splits = "".join(f"[s{i}]" for i in range(len(ladder)))
+    graph = [f"[0:v]split={len(ladder)}{splits}"]
+    graph += [f"[s{i}]scale={rung['scale']}[v{i}]" for i, rung in enumerate(ladder)]
+
+    cmd = [
+        "ffmpeg", "-y",
+        "-i", input_path,
+        *extra_output_args,
+        "-filter_complex", ";".join(graph),
+    ]
+
+    stream_map = []
+    for i, rung in enumerate(ladder):
+        cmd += ["-map", f"[v{i}]"]
+        if has_audio:
+            cmd += ["-map", "0:a:0"]
+        cmd += [
+            f"-c:v:{i}", encoder,
+            f"-b:v:{i}", f"{rung['bitrate']}k",
+            f"-maxrate:v:{i}", f"{rung['maxrate']}k",
+            f"-bufsize:v:{i}", f"{rung['bufsize']}k",
+            f"-profile:v:{i}", "high",
+            f"-level:v:{i}", rung["level"],
+        ]
+        stream_map.append(
+            f"v:{i},a:{i},name:{rung['name']}" if has_audio else f"v:{i},name:{rung['name']}"
+        )
+
+    cmd += _keyframe_args(source)
+
+    if has_audio:
+        audio_only = len(ladder)
+        cmd += ["-map", "0:a:0"]
+        cmd += ["-c:a", "aac", "-b:a", f"{settings.HLS_AUDIO_BITRATE}k"]
+        cmd += [f"-b:a:{audio_only}", f"{settings.HLS_AUDIO_ONLY_BITRATE}k"]
+        stream_map.append(f"a:{audio_only},name:audio")
+
+    cmd += _hls_output_args(hls_root, "%v", hls_flags)
+    cmd += [
+        "-var_stream_map", " ".join(stream_map),
+        os.path.join(hls_root, "%v", "index.m3u8"),
+    ]
+    return cmd
+
+
+def build_rendition_commands(*, input_path, hls_root, source, ladder, encoder,
+                             hls_flags, extra_output_args=()):
+    """
+    One ffmpeg process per rendition (plus one for audio-only), so the
+    renditions encode in parallel. Returns [(variant name, cmd), ...].
+    """
+    has_audio = source["has_audio"]
+    audio_args = (
+        ["-map", "0:a:0", "-c:a", "aac", "-b:a", f"{settings.HLS_AUDIO_BITRATE}k"]
+        if has_audio else []
+    )
+
+    commands = []
+    for rung in ladder:
+        os.makedirs(os.path.join(hls_root, rung["name"]), exist_ok=True)
+        cmd = [
+            "ffmpeg", "-y",
+            "-i", input_path,
+            *extra_output_args,
+            "-map", "0:v:0",
+            "-vf", f"scale={rung['scale']}",
+            "-c:v", encoder,
+            "-b:v", f"{rung['bitrate']}k",
+            "-maxrate", f"{rung['maxrate']}k",
+            "-bufsize", f"{rung['bufsize']}k",
+            "-profile:v", "high",
+            "-level:v", rung["level"],
+            *_keyframe_args(source),
+            *audio_args,
+            *_hls_output_args(hls_root, rung["name"], hls_flags),
+            os.path.join(hls_root, rung["name"], "index.m3u8"),
+        ]
+        commands.append((rung["name"], cmd))
+
+    if has_audio:
+        os.makedirs(os.path.join(hls_root, "audio"), exist_ok=True)
+        commands.append(("audio", [
+            "ffmpeg", "-y",
+            "-i", input_path,
+            *extra_output_args,
+            "-map", "0:a:0", "-vn",
+            "-c:a", "aac", "-b:a", f"{settings.HLS_AUDIO_ONLY_BITRATE}k",
+            *_hls_output_args(hls_root, "audio", hls_flags),
+            os.path.join(hls_root, "audio", "index.m3u8"),
+        ]))
+    return commands
+
+
+def write_master_playlist(hls_root, source, ladder):
+    """
+    master.m3u8 for the ladder actually encoded: video variants smallest
+    first (the first entry is where players start), audio-only last.
+    """
+    variants = [rung["name"] for rung in ladder] + (["audio"] if source["has_audio"] else [])
+    for name in variants:
+        if not os.path.exists(os.path.join(hls_root, name, "index.m3u8")):
+            raise RuntimeError(f"{name}/index.m3u8 not generated")
+
+    audio_kbps = settings.HLS_AUDIO_BITRATE if source["has_audio"] else 0
+    lines = ["#EXTM3U", "#EXT-X-VERSION:3", "#EXT-X-INDEPENDENT-SEGMENTS"]
+
+    for rung in ladder:
+        codecs = rung["codecs"] + (f",{AUDIO_CODEC}" if source["has_audio"] else "")
+        lines.append(
+            "#EXT-X-STREAM-INF:"
+            f"BANDWIDTH={(rung['maxrate'] + audio_kbps) * 1000},"
+            f"AVERAGE-BANDWIDTH={(rung['bitrate'] + audio_kbps) * 1000},"
+            f"RESOLUTION={rung['width']}x{rung['height']},"
+            f"FRAME-RATE={source['fps']:.3f},"
+            f'CODECS="{codecs}"'
+        )
+        lines.append(f"{rung['name']}/index.m3u8")
+
+    if source["has_audio"]:
+        audio_only_bps = settings.HLS_AUDIO_ONLY_BITRATE * 1000
+        lines.append(
+            f"#EXT-X-STREAM-INF:BANDWIDTH={audio_only_bps},"
+            f'AVERAGE-BANDWIDTH={audio_only_bps},CODECS="{AUDIO_CODEC}"'
+        )
+        lines.append("audio/index.m3u8")
+
+    master_path = os.path.join(hls_root, "master.m3u8")
+    with open(master_path, "w", encoding="utf-8") as master:
+        master.write("\n".join(lines) + "\n")
+    return master_path
+
+
+_ATTRIBUTE = re.compile(r'([A-Z0-9-]+)=("[^"]*"|[^,]*)')
+
+_CODEC_NAMES = {"avc1": "h264", "hvc1": "hevc", "hev1": "hevc", "mp4a": "aac"}
+
+
+def parse_master_playlist(text):
+    """
+    Variants of a master playlist: [{"uri", "bandwidth", "width", "height",
+    "frame_rate", "codecs"}, ...] in playlist order.
+    """
+    variants = []
+    attributes = None
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith("#EXT-X-STREAM-INF:"):
+            attributes = {
+                key: value.strip('"')
+                for key, value in _ATTRIBUTE.findall(line[len("#EXT-X-STREAM-INF:"):])
+            }
+        elif line and not line.startswith("#") and attributes is not None:
+            width, _, height = attributes.get("RESOLUTION", "").partition("x")
+            variants.append({
+                "uri": line,
+                "bandwidth": int(attributes.get("BANDWIDTH") or 0),
+                "width": int(width) if width.isdigit() else None,
+                "height": int(height) if height.isdigit() else None,
+                "frame_rate": float(attributes["FRAME-RATE"]) if attributes.get("FRAME-RATE") else None,
+                "codecs": [codec.strip() for codec in attributes.get("CODECS", "").split(",") if codec.strip()],
+            })
+            attributes = None
+    return variants
+
+
+def playlist_duration(text):
+    """
+    Sum of #EXTINF durations of a media playlist, in seconds.
+    """
+    return sum(
+        float(line[len("#EXTINF:"):].split(",")[0])
+        for line in text.splitlines()
+        if line.startswith("#EXTINF:")
+    )
+
+
+def codec_name(codec):
+    """
+    "avc1.64001f" → "h264", "mp4a.40.2" → "aac".
+    """
+    prefix = codec.split(".")[0]
+    return _CODEC_NAMES.get(prefix, prefix)
@@ -0,0 +1,119 @@
+# api/management/commands/backfill_video_media_info.py
+import posixpath
+import urllib.request
+from urllib.parse import urljoin
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from api.hls_ladder import codec_name, parse_master_playlist, playlist_duration, probe_source
+from api.models import Video
+from api.r2 import get_r2_client, presigned_get_url
+from api.video_pipeline import media_info
+
+
+def _read_r2_text(key):
+    body = get_r2_client().get_object(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=key)["Body"]
+    try:
+        return body.read().decode("utf-8")
+    finally:
+        body.close()
+
+
+def _read_url_text(url):
+    with urllib.request.urlopen(url, timeout=30) as response:
+        return response.read().decode("utf-8")
+
+
+def _info_from_hls(video):
+    """
+    Media info from the published playlists: duration from the segment
+    list, resolution/codecs/bandwidth from the top variant. Playlists in
+    our bucket are read from R2, others (external playlist_url, legacy
+    hosts) over HTTP.
+    """
+    base = f"{settings.R2_PUBLIC_BASE_URL}/"
+    if video.video_url.startswith(base):
+        master_key = video.video_url[len(base):]
+        read_master = lambda: _read_r2_text(master_key)
+        read_variant = lambda uri: _read_r2_text(
+            posixpath.normpath(posixpath.join(posixpath.dirname(master_key), uri))
+        )
+    elif video.video_url.startswith(("http://", "https://")):
+        read_master = lambda: _read_url_text(video.video_url)
+        read_variant = lambda uri: _read_url_text(urljoin(video.video_url, uri))
+    else:
+        return None
+
+    master = read_master()
+    variants = parse_master_playlist(master)
+    if not variants:
+        # a media playlist without a master: only the duration is known
+        duration = int(round(playlist_duration(master)))
+        return {"duration": duration} if duration else None
+    variants = [v for v in variants if v["height"]] or variants
+    top = max(variants, key=lambda v: v["bandwidth"])
+    codecs = [codec_name(codec) for codec in top["codecs"]]
+
+    return {
+        "duration": int(round(playlist_duration(read_variant(top["uri"])))) or None,
+        "width": top["width"],
+        "height": top["height"],
+        "frame_rate": top["frame_rate"],
+        "video_codec": next((c for c in codecs if c != "aac"), ""),
+        "audio_codec": "aac" if "aac" in codecs else "",
+        # HLS bandwidth of the top rendition; the source bitrate is unknown
+        "bitrate": top["bandwidth"] or None,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill duration, resolution, codecs and bitrate for videos that were "
+        "never probed at ingest (older, admin-created or external ones): from "
+        "the R2 source when it is kept, otherwise from the HLS playlists."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--video", type=int, help="Only this video id")
+        parser.add_argument("--force", action="store_true", help="Re-probe videos that already have info")
+
+    def handle(self, *args, **options):
+        # any video with something to probe, whatever its status (rows made
+        # in the Django admin or by AdminVideoCreateView never went through
+        # the pipeline)
+        videos = (
+            Video.objects
+            .filter(Q(source_key__gt="") | Q(video_url__gt=""))
+            .exclude(status__in=["uploading", "processing"])
+            .order_by("id")
+        )
+        if options.get("video"):
+            videos = videos.filter(id=options["video"])
+        if not options["force"]:
+            videos = videos.filter(Q(width__isnull=True) | Q(duration__isnull=True) | Q(duration=0))
+
+        updated = skipped = failed = 0
+        for video in videos.iterator():
+            try:
+                if video.source_key:
+                    # ffprobe reads only the container header over HTTP
+                    info = media_info(probe_source(presigned_get_url(video.source_key, expires_in=600)))
+                elif video.video_url:
+                    info = _info_from_hls(video)
+                else:
+                    info = None
+            except Exception as exc:
+                failed += 1
+                self.stderr.write(f"Video {video.id}: {exc}")
+                continue
+
+            if not info:
+                skipped += 1
+                continue
+
+            Video.objects.filter(id=video.id).update(**info)
+            updated += 1
+
+        self.stdout.write(f"Updated {updated} video(s), skipped {skipped}, failed {failed}")
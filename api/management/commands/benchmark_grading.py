@@ -0,0 +1,119 @@
+# api/management/commands/benchmark_grading.py
+import random
+import statistics
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from api.grading import PASS_RATIO, invalidate_answer_key, submit_test_attempt
+from api.models import Course, CustomUser, Question, StudentAnswer, StudentTest, Test
+
+
+def grade_per_answer(user, test, answers):
+    """
+    The grading loop SubmitTestAPIView used before api.grading: one
+    Question lookup and one StudentAnswer insert per submitted answer.
+    """
+    student_test = StudentTest.objects.create(user=user, test=test)
+    score = 0
+    total = 0
+    for qid, selected in answers.items():
+        question = Question.objects.filter(id=qid, test=test).first()
+        if not question:
+            continue
+        is_correct = question.correct_answer == selected
+        marks = question.marks if is_correct else 0
+        score += marks
+        total += question.marks
+        StudentAnswer.objects.create(
+            student_test=student_test,
+            question=question,
+            selected_answer=selected,
+            is_correct=is_correct,
+            marks_awarded=marks,
+        )
+    student_test.score = score
+    student_test.total_marks = total
+    student_test.passed = total > 0 and score >= (total * PASS_RATIO)
+    student_test.save()
+    return student_test
+
+
+class Command(BaseCommand):
+    help = (
+        "Time test submissions graded per answer (the old SubmitTestAPIView "
+        "loop) against api.grading, on throwaway tests of several sizes. "
+        "Everything runs in a transaction that is rolled back. Run it "
+        "against the MySQL database from settings: local sqlite has no "
+        "network round trips, so it understates the per-answer cost."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--questions", default="10,100,500", help="Comma-separated test sizes")
+        parser.add_argument("--rounds", type=int, default=20, help="Submissions per size and engine")
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options["questions"].split(",")]
+        except ValueError:
+            raise CommandError("--questions takes comma-separated integers")
+        rounds = options["rounds"]
+
+        self.stdout.write(f"{connection.vendor} database, {rounds} submission(s) per size and engine")
+        for size in sizes:
+            with transaction.atomic():
+                self._bench_size(size, rounds)
+                transaction.set_rollback(True)
+
+    def _bench_size(self, size, rounds):
+        user = CustomUser.objects.create_user(email=f"bench-{uuid.uuid4().hex}@example.com", role="student")
+        course = Course.objects.create(title="Grading benchmark", description="", price=0)
+        test = Test.objects.create(course=course, name=f"Benchmark {size}")
+        Question.objects.bulk_create([
+            Question(
+                test=test,
+                text=f"Question {number}",
+                option_a="A",
+                option_b="B",
+                option_c="C",
+                option_d="D",
+                correct_answer=random.choice("ABCD"),
+            )
+            for number in range(size)
+        ])
+        question_ids = list(Question.objects.filter(test=test).values_list("id", flat=True))
+        answers = {str(qid): random.choice("ABCD") for qid in question_ids}
+
+        # cold: the answer key is not cached yet
+        invalidate_answer_key(test.id)
+        with CaptureQueriesContext(connection) as queries:
+            submit_test_attempt(user, test, answers)
+        cold_queries = len(queries.captured_queries)
+
+        try:
+            for name, grade in (("per_answer", grade_per_answer), ("bulk", submit_test_attempt)):
+                # queries are counted on one submission; the timed ones run
+                # without the capture overhead
+                with CaptureQueriesContext(connection) as queries:
+                    grade(user, test, answers)
+
+                timings = []
+                for _ in range(rounds):
+                    started = time.perf_counter()
+                    grade(user, test, answers)
+                    timings.append(time.perf_counter() - started)
+
+                timings.sort()
+                median = statistics.median(timings)
+                extra = f" (cold cache {cold_queries})" if name == "bulk" else ""
+                self.stdout.write(
+                    f"{size} questions {name}: median={median * 1000:.1f}ms "
+                    f"p95={timings[min(len(timings) - 1, int(len(timings) * 0.95))] * 1000:.1f}ms "
+                    f"rate={1 / median if median else 0:.0f}/s "
+                    f"queries={len(queries.captured_queries)}{extra}"
+                )
+        finally:
+            invalidate_answer_key(test.id)
@@ -0,0 +1,93 @@
+# api/management/commands/benchmark_hls_encode.py
+import os
+import resource
+import shutil
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.hls_ladder import build_ladder, probe_source
+from api.video_pipeline import build_encode_commands, run_ffmpeg_parallel
+
+
+def _segment_durations(playlist_path):
+    with open(playlist_path, encoding="utf-8") as playlist:
+        return [
+            round(float(line[len("#EXTINF:"):].split(",")[0]), 2)
+            for line in playlist
+            if line.startswith("#EXTINF:")
+        ]
+
+
+class Command(BaseCommand):
+    help = (
+        "Encode a local video to the HLS ladder in single-process and/or "
+        "per-rendition mode and compare wall time and CPU utilisation."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("input", help="Local source video")
+        parser.add_argument(
+            "--mode",
+            choices=["single", "per_rendition", "both"],
+            default="both",
+        )
+        parser.add_argument("--encoder", default="libx264")
+
+    def handle(self, *args, **options):
+        input_path = options["input"]
+        if not os.path.exists(input_path):
+            raise CommandError(f"{input_path} does not exist")
+
+        source = probe_source(input_path)
+        ladder = build_ladder(source)
+        modes = ["single", "per_rendition"] if options["mode"] == "both" else [options["mode"]]
+        cores = os.cpu_count() or 1
+
+        self.stdout.write(
+            f"Source {source['width']}x{source['height']}@{source['fps']} "
+            f"{source['duration']:.1f}s, ladder "
+            f"{', '.join(rung['name'] for rung in ladder)}, {cores} cores"
+        )
+
+        for mode in modes:
+            hls_root = tempfile.mkdtemp(prefix=f"hls-bench-{mode}-")
+            try:
+                commands = build_encode_commands(
+                    mode=mode,
+                    input_path=input_path,
+                    hls_root=hls_root,
+                    source=source,
+                    ladder=ladder,
+                    encoder=options["encoder"],
+                    hls_flags="independent_segments",
+                )
+
+                before = resource.getrusage(resource.RUSAGE_CHILDREN)
+                started = time.monotonic()
+                runs = run_ffmpeg_parallel(commands, duration=source["duration"])
+                wall = time.monotonic() - started
+                after = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+                failed = [name for name, _, returncode, _, _ in runs if returncode != 0]
+                if failed:
+                    raise CommandError(f"{mode}: ffmpeg failed for {', '.join(failed)}")
+
+                cpu = (after.ru_utime - before.ru_utime) + (after.ru_stime - before.ru_stime)
+
+                # segment boundaries must match across renditions for ABR switching
+                durations = [
+                    _segment_durations(os.path.join(hls_root, rung["name"], "index.m3u8"))
+                    for rung in ladder
+                ]
+                aligned = all(d == durations[0] for d in durations)
+
+                self.stdout.write(
+                    f"{mode}: processes={len(runs)} wall={wall:.1f}s cpu={cpu:.1f}s "
+                    f"utilisation={cpu / (wall * cores) * 100:.0f}% "
+                    f"speed={source['duration'] / wall if wall else 0:.2f}x "
+                    f"segments={len(durations[0])} aligned={'yes' if aligned else 'NO'}"
+                )
+            finally:
+                shutil.rmtree(hls_root, ignore_errors=True)
@@ -0,0 +1,128 @@
+# api/management/commands/benchmark_overlap_upload.py
+import os
+import shutil
+import tempfile
+import time
+import uuid
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.hls_ladder import build_ladder, probe_source, write_master_playlist
+from api.r2 import IncrementalFolderUploader, delete_r2_objects, upload_files_parallel
+from api.video_pipeline import build_encode_commands, choose_encode_mode, run_ffmpeg_parallel
+
+
+def _publish_order(item):
+    relative_path = item[1]
+    if relative_path == "master.m3u8":
+        return 2, relative_path
+    if relative_path.endswith(".m3u8"):
+        return 1, relative_path
+    return 0, relative_path
+
+
+class Command(BaseCommand):
+    help = (
+        "Encode a local video to the HLS ladder and upload it to a scratch "
+        "prefix in the media bucket, once encode-then-upload and once with "
+        "segments uploaded while ffmpeg runs, and compare time to ready. "
+        "The uploads are deleted afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("input", help="Local source video")
+        parser.add_argument(
+            "--mode",
+            choices=["sequential", "overlap", "both"],
+            default="both",
+        )
+        parser.add_argument("--encoder", default="libx264")
+
+    def handle(self, *args, **options):
+        input_path = options["input"]
+        if not os.path.exists(input_path):
+            raise CommandError(f"{input_path} does not exist")
+
+        source = probe_source(input_path)
+        ladder = build_ladder(source)
+        encode_mode = choose_encode_mode(options["encoder"], ladder)
+        modes = ["sequential", "overlap"] if options["mode"] == "both" else [options["mode"]]
+        prefix = f"benchmark/overlap-upload-{uuid.uuid4().hex}"
+
+        self.stdout.write(
+            f"Source {source['width']}x{source['height']}@{source['fps']} "
+            f"{source['duration']:.1f}s, ladder "
+            f"{', '.join(rung['name'] for rung in ladder)}, encode mode {encode_mode}, "
+            f"to {settings.AWS_STORAGE_BUCKET_NAME}/{prefix}/"
+        )
+
+        uploaded_keys = []
+        try:
+            for mode in modes:
+                hls_root = tempfile.mkdtemp(prefix=f"hls-bench-{mode}-")
+                r2_prefix = f"{prefix}/{mode}"
+                try:
+                    commands = build_encode_commands(
+                        mode=encode_mode,
+                        input_path=input_path,
+                        hls_root=hls_root,
+                        source=source,
+                        ladder=ladder,
+                        encoder=options["encoder"],
+                        # as the pipeline: temp_file hides unfinished segments
+                        hls_flags="independent_segments+temp_file" if mode == "overlap" else "independent_segments",
+                    )
+
+                    started = time.monotonic()
+                    uploader = None
+                    if mode == "overlap":
+                        uploader = IncrementalFolderUploader(
+                            hls_root,
+                            r2_prefix,
+                            is_ready=lambda relative_path: relative_path.endswith(".ts"),
+                        ).start()
+
+                    try:
+                        runs = run_ffmpeg_parallel(commands, duration=source["duration"])
+                        failed = [name for name, _, returncode, _, _ in runs if returncode != 0]
+                        if failed:
+                            raise CommandError(f"{mode}: ffmpeg failed for {', '.join(failed)}")
+                        write_master_playlist(hls_root, source, ladder)
+                        encoded = time.monotonic() - started
+
+                        if uploader:
+                            uploaded_during_encode = uploader.uploaded
+                            uploader.finish()
+                            uploader = None
+                        else:
+                            uploaded_during_encode = 0
+                            files = []
+                            for root, _, names in os.walk(hls_root):
+                                for name in names:
+                                    local_path = os.path.join(root, name)
+                                    relative_path = os.path.relpath(local_path, hls_root).replace("\\", "/")
+                                    files.append((local_path, relative_path))
+                            files.sort(key=_publish_order)
+                            upload_files_parallel([(path, f"{r2_prefix}/{rel}") for path, rel in files])
+                    finally:
+                        if uploader:
+                            uploader.abort()
+                    total = time.monotonic() - started
+
+                    file_count = sum(len(names) for _, _, names in os.walk(hls_root))
+                    self.stdout.write(
+                        f"{mode}: encode={encoded:.1f}s upload_after_encode={total - encoded:.1f}s "
+                        f"time_to_ready={total:.1f}s files={file_count} "
+                        f"uploaded_during_encode={uploaded_during_encode}"
+                    )
+                finally:
+                    # also what a failed run managed to upload
+                    uploaded_keys.extend(
+                        f"{r2_prefix}/{os.path.relpath(os.path.join(root, name), hls_root)}".replace("\\", "/")
+                        for root, _, names in os.walk(hls_root)
+                        for name in names
+                    )
+                    shutil.rmtree(hls_root, ignore_errors=True)
+        finally:
+            delete_r2_objects(uploaded_keys)
@@ -0,0 +1,110 @@
+# api/management/commands/benchmark_r2_upload.py
+import os
+import shutil
+import tempfile
+import time
+import uuid
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.r2 import (
+    UPLOAD_TRANSFER_CONFIG,
+    content_type_for,
+    delete_r2_objects,
+    get_r2_client,
+    upload_files_parallel,
+)
+
+
+def upload_serial(files):
+    """
+    The loop the video pipeline used before upload_files_parallel: one
+    upload_file call after another.
+    """
+    client = get_r2_client()
+    for local_path, key in files:
+        client.upload_file(
+            local_path,
+            settings.AWS_STORAGE_BUCKET_NAME,
+            key,
+            ExtraArgs={"ContentType": content_type_for(local_path)},
+            Config=UPLOAD_TRANSFER_CONFIG,
+        )
+    return len(files)
+
+
+class Command(BaseCommand):
+    help = (
+        "Upload a folder (or generated HLS-like segments) to a scratch prefix "
+        "in the media bucket serially and with upload_files_parallel at "
+        "several pool sizes, and compare throughput. The uploads are deleted "
+        "afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("folder", nargs="?", help="Local folder to upload, e.g. an HLS output dir")
+        parser.add_argument("--files", type=int, default=300, help="Generated files when no folder is given")
+        parser.add_argument("--size-kb", type=int, default=256, help="Size of each generated file")
+        parser.add_argument("--workers", default="4,16", help="Comma-separated pool sizes")
+        parser.add_argument("--skip-serial", action="store_true", help="Only run the parallel uploads")
+
+    def handle(self, *args, **options):
+        try:
+            pool_sizes = [int(size) for size in options["workers"].split(",")]
+        except ValueError:
+            raise CommandError("--workers takes comma-separated integers")
+
+        generated = None
+        folder = options["folder"]
+        if folder:
+            if not os.path.isdir(folder):
+                raise CommandError(f"Not a directory: {folder}")
+        else:
+            generated = folder = tempfile.mkdtemp(prefix="r2-upload-bench-")
+            for number in range(options["files"]):
+                with open(os.path.join(folder, f"segment_{number:05d}.ts"), "wb") as f:
+                    f.write(os.urandom(options["size_kb"] * 1024))
+
+        local_files = [
+            os.path.join(root, name)
+            for root, _, names in os.walk(folder)
+            for name in names
+        ]
+        total_bytes = sum(os.path.getsize(path) for path in local_files)
+        prefix = f"benchmark/r2-upload-{uuid.uuid4().hex}"
+        self.stdout.write(
+            f"{len(local_files)} file(s), {total_bytes / 1024 / 1024:.1f} MB "
+            f"to {settings.AWS_STORAGE_BUCKET_NAME}/{prefix}/"
+        )
+
+        runs = [] if options["skip_serial"] else [("serial", None)]
+        runs += [(f"parallel workers={size}", size) for size in pool_sizes]
+
+        uploaded_keys = []
+        baseline = None
+        try:
+            for label, workers in runs:
+                run_prefix = f"{prefix}/{label.replace(' ', '-').replace('=', '')}"
+                files = [
+                    (path, f"{run_prefix}/{os.path.relpath(path, folder)}".replace("\\", "/"))
+                    for path in local_files
+                ]
+                uploaded_keys.extend(key for _, key in files)
+
+                started = time.monotonic()
+                if workers is None:
+                    upload_serial(files)
+                else:
+                    upload_files_parallel(files, max_workers=workers)
+                wall = time.monotonic() - started
+
+                baseline = baseline or wall
+                self.stdout.write(
+                    f"{label}: wall={wall:.2f}s files/s={len(files) / wall:.0f} "
+                    f"MB/s={total_bytes / 1024 / 1024 / wall:.1f} speedup={baseline / wall:.1f}x"
+                )
+        finally:
+            delete_r2_objects(uploaded_keys)
+            if generated:
+                shutil.rmtree(generated, ignore_errors=True)
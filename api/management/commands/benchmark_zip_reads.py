@@ -0,0 +1,112 @@
+# api/management/commands/benchmark_zip_reads.py
+import io
+import statistics
+import time
+import zipfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.r2 import R2RangeReader, get_r2_client
+from api.zip_index import FILE_SIZE, NAME, build_zip_index, find_entry, read_member
+
+
+class RequestCounter:
+    """
+    Counts S3 API calls made through a boto3 client.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.count = 0
+
+    def _count(self, **kwargs):
+        self.count += 1
+
+    def __enter__(self):
+        self.client.meta.events.register("before-call.s3", self._count)
+        return self
+
+    def __exit__(self, *exc):
+        self.client.meta.events.unregister("before-call.s3", self._count)
+
+
+class Command(BaseCommand):
+    help = (
+        "Read members of a zip in the media bucket the old way (download the "
+        "whole archive, then zipfile) and with ranged GETs (api.zip_index), "
+        "and compare bytes transferred, requests and latency."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("key", help="Key of the zip in AWS_STORAGE_BUCKET_NAME")
+        parser.add_argument("--path", action="append", help="Member to read (repeatable); default: smallest, median and largest")
+        parser.add_argument("--upload", help="Local zip to upload to KEY first; deleted again afterwards")
+        parser.add_argument("--rounds", type=int, default=5, help="Reads per member and method")
+
+    def handle(self, *args, **options):
+        client = get_r2_client()
+        bucket = settings.AWS_STORAGE_BUCKET_NAME
+        key = options["key"]
+
+        if options["upload"]:
+            client.upload_file(options["upload"], bucket, key)
+        try:
+            self._bench(client, bucket, key, options)
+        finally:
+            if options["upload"]:
+                client.delete_object(Bucket=bucket, Key=key)
+
+    def _bench(self, client, bucket, key, options):
+        with RequestCounter(client) as requests:
+            reader = R2RangeReader(key, bucket=bucket)
+            index = build_zip_index(reader, key)
+        if index is None:
+            raise CommandError(f"{key} is not a readable zip")
+
+        files = sorted(
+            (entry for entry in index["entries"] if not entry[NAME].endswith("/")),
+            key=lambda entry: entry[FILE_SIZE],
+        )
+        if options["path"]:
+            entries = [find_entry(index, path) for path in options["path"]]
+            missing = [path for path, entry in zip(options["path"], entries) if entry is None]
+            if missing:
+                raise CommandError(f"Not in the archive: {', '.join(missing)}")
+        else:
+            readable = [e for e in files if e[FILE_SIZE] <= settings.ATTACHMENT_CONTENT_MAX_BYTES]
+            if not readable:
+                raise CommandError(f"{key} has no member under ATTACHMENT_CONTENT_MAX_BYTES")
+            entries = []
+            for entry in (readable[0], readable[len(readable) // 2], readable[-1]):
+                if entry not in entries:
+                    entries.append(entry)
+
+        self.stdout.write(
+            f"{key}: {index['size']} bytes, {len(files)} file(s); "
+            f"index: {requests.count} request(s), {reader.bytes_fetched} bytes"
+        )
+
+        for entry in entries:
+            for method in ("full", "ranged"):
+                timings = []
+                for _ in range(options["rounds"]):
+                    with RequestCounter(client) as requests:
+                        started = time.perf_counter()
+                        if method == "full":
+                            body = client.get_object(Bucket=bucket, Key=key)["Body"].read()
+                            with zipfile.ZipFile(io.BytesIO(body), "r") as z:
+                                z.read(entry[NAME])
+                            fetched = len(body)
+                        else:
+                            # as AttachmentContentAPIView: the size comes from the index
+                            with R2RangeReader(key, bucket=bucket, size=index["size"]) as member_reader:
+                                read_member(member_reader, entry, settings.ATTACHMENT_CONTENT_MAX_BYTES)
+                                fetched = member_reader.bytes_fetched
+                        timings.append(time.perf_counter() - started)
+
+                self.stdout.write(
+                    f"{entry[NAME]} ({entry[FILE_SIZE]} bytes) {method}: "
+                    f"median={statistics.median(timings) * 1000:.1f}ms "
+                    f"requests={requests.count} fetched={fetched} bytes"
+                )
@@ -0,0 +1,45 @@
+# api/management/commands/build_attachment_indexes.py
+from django.core.management.base import BaseCommand
+from api.models import Video
+from api.zip_index import index_matches, index_video_attachment
+
+
+class Command(BaseCommand):
+    help = "Backfill the zip central-directory index for video attachments"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--video", type=int, help="Only this video id")
+        parser.add_argument(
+            "--force", action="store_true", help="Rebuild even if the index is current"
+        )
+
+    def handle(self, *args, **options):
+        videos = Video.objects.exclude(folder_attachment="").exclude(
+            folder_attachment__isnull=True
+        ).order_by("id")
+
+        if options.get("video"):
+            videos = videos.filter(id=options["video"])
+
+        built = skipped = failed = 0
+        for video in videos.iterator():
+            name = video.folder_attachment.name
+            if not options["force"] and index_matches(video.attachment_index, name):
+                skipped += 1
+                continue
+
+            try:
+                index = index_video_attachment(video)
+            except Exception as exc:
+                failed += 1
+                self.stderr.write(f"Video {video.id}: {exc}")
+                continue
+
+            if index:
+                built += 1
+            else:
+                skipped += 1
+
+        self.stdout.write(
+            f"Indexed {built} attachment(s), skipped {skipped}, failed {failed}"
+        )
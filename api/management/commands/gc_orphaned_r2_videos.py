@@ -0,0 +1,101 @@
+# api/management/commands/gc_orphaned_r2_videos.py
+import re
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.models import Video
+from api.r2 import delete_r2_objects, get_r2_client
+
+HLS_PREFIX = re.compile(r"videos/course-\d+/[^/]+/hls/")
+
+
+def live_prefixes():
+    """
+    HLS prefixes still in use: every Video.video_url (deduplicated videos
+    share their original's prefix) plus the prefixes of jobs in flight,
+    which have no video_url yet.
+    """
+    prefixes = set()
+    rows = Video.objects.values_list("id", "course_id", "status", "video_url")
+    for video_id, course_id, status, video_url in rows.iterator():
+        match = HLS_PREFIX.search(video_url or "")
+        if match:
+            prefixes.add(match.group(0))
+        if status in ("uploading", "processing"):
+            prefixes.add(f"videos/course-{course_id}/lesson_{video_id}/hls/")
+    return prefixes
+
+
+def _format_bytes(size):
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+
+class Command(BaseCommand):
+    help = (
+        "Find HLS prefixes under videos/ in R2 that no Video points at any more "
+        "(failed or deleted videos) and report them; --delete removes them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--delete", action="store_true", help="Delete the orphans (default: report only)")
+        parser.add_argument(
+            "--min-age-hours",
+            type=float,
+            default=settings.VIDEO_WORK_DIR_MAX_AGE / 3600,
+            help="Keep prefixes written to more recently than this (failed jobs can still be retried)",
+        )
+        parser.add_argument("--workers", type=int, help="Concurrent DeleteObjects calls")
+
+    def handle(self, *args, **options):
+        live = live_prefixes()
+        cutoff = timezone.now() - timedelta(hours=options["min_age_hours"])
+
+        # one pass over the bucket; keys are only kept for orphan candidates
+        orphans = {}
+        live_objects = unmatched = 0
+        paginator = get_r2_client().get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Prefix="videos/"):
+            for item in page.get("Contents", []):
+                match = HLS_PREFIX.match(item["Key"])
+                if not match:
+                    unmatched += 1
+                    continue
+                prefix = match.group(0)
+                if prefix in live:
+                    live_objects += 1
+                    continue
+                entry = orphans.setdefault(prefix, {"keys": [], "bytes": 0, "newest": item["LastModified"]})
+                entry["keys"].append(item["Key"])
+                entry["bytes"] += item["Size"]
+                entry["newest"] = max(entry["newest"], item["LastModified"])
+
+        stale = {prefix: entry for prefix, entry in orphans.items() if entry["newest"] < cutoff}
+        recent = len(orphans) - len(stale)
+
+        for prefix, entry in sorted(stale.items()):
+            self.stdout.write(
+                f"{prefix}  {len(entry['keys'])} object(s)  {_format_bytes(entry['bytes'])}  "
+                f"last written {entry['newest']:%Y-%m-%d}"
+            )
+
+        keys = [key for entry in stale.values() for key in entry["keys"]]
+        total = sum(entry["bytes"] for entry in stale.values())
+        self.stdout.write(
+            f"{len(live)} live prefix(es), {live_objects} live object(s); "
+            f"{len(stale)} orphaned prefix(es): {len(keys)} object(s), {_format_bytes(total)}; "
+            f"{recent} recent orphan(s) kept; {unmatched} other object(s) under videos/ ignored"
+        )
+
+        if not options["delete"]:
+            self.stdout.write("Report only; re-run with --delete to remove the orphaned prefixes.")
+            return
+
+        deleted = delete_r2_objects(keys, max_workers=options.get("workers"))
+        self.stdout.write(f"Deleted {deleted} object(s), {_format_bytes(total)}")
@@ -0,0 +1,30 @@
+# api/management/commands/gc_video_work_dirs.py
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.video_checkpoints import gc_work_dirs
+
+
+class Command(BaseCommand):
+    help = (
+        "Remove job and upload-session work dirs under VIDEO_WORK_DIR that "
+        "have not been touched for VIDEO_WORK_DIR_MAX_AGE (failed jobs nobody "
+        "retried, abandoned uploads)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--max-age-hours", type=float, help="Override VIDEO_WORK_DIR_MAX_AGE")
+        parser.add_argument("--dry-run", action="store_true", help="Only list what would be removed")
+
+    def handle(self, *args, **options):
+        max_age = settings.VIDEO_WORK_DIR_MAX_AGE
+        if options.get("max_age_hours") is not None:
+            max_age = int(options["max_age_hours"] * 60 * 60)
+
+        removed = gc_work_dirs(max_age=max_age, dry_run=options["dry_run"])
+        for path, size in removed:
+            self.stdout.write(f"{path}  {size} bytes")
+
+        verb = "Would remove" if options["dry_run"] else "Removed"
+        total = sum(size for _, size in removed)
+        self.stdout.write(f"{verb} {len(removed)} dir(s), {total} bytes")
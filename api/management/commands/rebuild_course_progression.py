@@ -0,0 +1,27 @@
+# api/management/commands/rebuild_course_progression.py
+from django.core.management.base import BaseCommand
+from api.models import Enrollment
+from api.progression import rebuild_progression
+
+
+class Command(BaseCommand):
+    help = "Recompute materialized course progression for enrolled students"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--course", type=int, help="Only this course id")
+        parser.add_argument("--user", type=int, help="Only this user id")
+
+    def handle(self, *args, **options):
+        enrollments = Enrollment.objects.select_related("user").order_by("id")
+
+        if options.get("course"):
+            enrollments = enrollments.filter(course_id=options["course"])
+        if options.get("user"):
+            enrollments = enrollments.filter(user_id=options["user"])
+
+        count = 0
+        for enrollment in enrollments.iterator():
+            rebuild_progression(enrollment.user, enrollment.course_id)
+            count += 1
+
+        self.stdout.write(f"Rebuilt progression for {count} enrollment(s)")
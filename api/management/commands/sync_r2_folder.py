@@ -0,0 +1,29 @@
+# api/management/commands/sync_r2_folder.py
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.r2 import sync_folder_to_r2
+
+
+class Command(BaseCommand):
+    help = (
+        "Upload a local folder to an R2 prefix, skipping files R2 already has "
+        "with the same size and ETag (e.g. re-running a partially failed upload)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("folder", help="Local folder to upload")
+        parser.add_argument("prefix", help="R2 key prefix, e.g. videos/course-1/lesson_2/hls")
+        parser.add_argument("--delete", action="store_true", help="Delete remote keys with no local file")
+
+    def handle(self, *args, **options):
+        if not os.path.isdir(options["folder"]):
+            raise CommandError(f"Not a directory: {options['folder']}")
+
+        summary = sync_folder_to_r2(options["folder"], options["prefix"], delete=options["delete"])
+        self.stdout.write(
+            f"Uploaded {summary['uploaded']} file(s) ({summary['bytes_sent']} bytes), "
+            f"skipped {summary['skipped']} unchanged ({summary['bytes_skipped']} bytes), "
+            f"deleted {summary['deleted']}"
+        )
@@ -0,0 +1,37 @@
+# api/management/commands/transcribe_video.py
+import sys
+
+from django.core.management.base import BaseCommand
+from api.transcription import transcribe_to_vtt
+
+
+class Command(BaseCommand):
+    help = (
+        "Transcribe a video to WebVTT with Whisper. Run by the video pipeline "
+        "in its own process so it can overlap with ffmpeg."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("input", help="Local media file")
+        parser.add_argument("output", help="Where to write the .vtt file")
+        parser.add_argument("--language", default="en")
+        parser.add_argument("--job", help="Video job id to report subtitle_progress to")
+        parser.add_argument("--threads", type=int, default=0, help="CPU threads for Whisper (0 = library default)")
+
+    def handle(self, *args, **options):
+        try:
+            transcribe_to_vtt(
+                options["input"],
+                options["output"],
+                language=options["language"],
+                job_id=options.get("job"),
+                threads=options["threads"],
+            )
+        except Exception as exc:
+            # an empty VTT is still written; the pipeline reports the warning
+            with open(options["output"], "w", encoding="utf-8") as vtt:
+                vtt.write("WEBVTT\n\n")
+            self.stderr.write(f"Subtitle generation unavailable: {exc}")
+            sys.exit(1)
+
+        self.stdout.write(f"Subtitles written to {options['output']}")
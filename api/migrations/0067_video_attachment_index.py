@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-17 04:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0066_studentcourseprogression'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='video',
+            name='attachment_index',
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.9 on 2026-10-17 04:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0067_video_attachment_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VideoEncodeMetric',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('job_id', models.CharField(db_index=True, max_length=64)),
+                ('host', models.CharField(max_length=255)),
+                ('encoder', models.CharField(max_length=50)),
+                ('preset', models.CharField(blank=True, max_length=50)),
+                ('renditions', models.CharField(blank=True, max_length=100)),
+                ('source_seconds', models.FloatField(default=0)),
+                ('processed_seconds', models.FloatField(default=0)),
+                ('wall_seconds', models.FloatField(default=0)),
+                ('speed', models.FloatField(default=0)),
+                ('succeeded', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('video', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='encode_metrics', to='api.video')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
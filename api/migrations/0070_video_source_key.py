@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-17 04:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0069_videouploadsession'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='video',
+            name='source_key',
+            field=models.CharField(blank=True, max_length=500),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-17 04:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0070_video_source_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='video',
+            name='source_sha256',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.9 on 2026-10-17 05:22
+
+from django.db import migrations, models
+
+
+def language_from_upload_sessions(apps, schema_editor):
+    # videos uploaded through a resumable session know their language;
+    # older ones stay blank and are simply never deduplicated
+    Video = apps.get_model("api", "Video")
+    VideoUploadSession = apps.get_model("api", "VideoUploadSession")
+    sessions = VideoUploadSession.objects.filter(status="finalized", video__isnull=False)
+    for video_id, language in sessions.values_list("video_id", "language"):
+        Video.objects.filter(id=video_id).update(subtitle_language=language)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0072_video_media_info'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='video',
+            name='subtitle_language',
+            field=models.CharField(blank=True, max_length=10),
+        ),
+        migrations.RunPython(language_from_upload_sessions, migrations.RunPython.noop),
+    ]
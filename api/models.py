@@ -11,7 +11,6 @@ from django.contrib.auth.models import (
 
 import uuid
 from django.utils import timezone
-from moviepy.editor import VideoFileClip
 
 
 
@@ -292,14 +291,117 @@ class Video(models.Model):
 
 
     duration = models.PositiveIntegerField(null=True, blank=True)
+    # probed from the source at ingest (api/hls_ladder.probe_source)
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
+    frame_rate = models.FloatField(null=True, blank=True)
+    video_codec = models.CharField(max_length=32, blank=True)
+    audio_codec = models.CharField(max_length=32, blank=True)
+    bitrate = models.PositiveIntegerField(null=True, blank=True)   # bits/s
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # R2 key of the source video when it was uploaded straight to R2
+    source_key = models.CharField(max_length=500, blank=True)
+    # sha256 of the source bytes; identical re-uploads reuse the HLS output
+    source_sha256 = models.CharField(max_length=64, blank=True, db_index=True)
+    # Whisper language of the VTT in the HLS prefix; part of the dedupe match
+    subtitle_language = models.CharField(max_length=10, blank=True)
+
+    # Zip central directory of folder_attachment (see api/zip_index.py)
+    attachment_index = models.JSONField(null=True, blank=True, editable=False)
+
     class Meta:
         ordering = ["created_at"]
 
     def __str__(self):
         return f"{self.course.title} → {self.title}"
 
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or "folder_attachment" in update_fields:
+            self._refresh_attachment_index()
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "attachment_index"}
+        super().save(*args, **kwargs)
+
+    def _refresh_attachment_index(self):
+        from .zip_index import build_zip_index
+
+        attachment = self.folder_attachment
+        if not attachment or not attachment.name.lower().endswith(".zip"):
+            self.attachment_index = None
+        elif not attachment._committed:
+            # fresh upload: index while it is still local, then store it
+            # now so the index records the final storage name
+            content = attachment.file
+            index = build_zip_index(content, attachment.name)
+            attachment.save(attachment.name, content, save=False)
+            if index:
+                index["name"] = self.folder_attachment.name
+            self.attachment_index = index
+
+
+class VideoEncodeMetric(models.Model):
+    """
+    One ffmpeg run of the video pipeline, for tracking encode throughput
+    across hosts, encoders and presets.
+    """
+    video = models.ForeignKey(Video, on_delete=models.SET_NULL, null=True, blank=True, related_name="encode_metrics")
+    job_id = models.CharField(max_length=64, db_index=True)
+    host = models.CharField(max_length=255)
+    encoder = models.CharField(max_length=50)
+    preset = models.CharField(max_length=50, blank=True)
+    renditions = models.CharField(max_length=100, blank=True)
+
+    source_seconds = models.FloatField(default=0)    # media duration
+    processed_seconds = models.FloatField(default=0)
+    wall_seconds = models.FloatField(default=0)
+    speed = models.FloatField(default=0)             # x realtime (processed / wall)
+    succeeded = models.BooleanField(default=False)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"{self.job_id} {self.encoder}@{self.host} {self.speed:.2f}x"
+
+
+class VideoUploadSession(models.Model):
+    """
+    Resumable chunked upload of a source video (see api/video_uploads.py).
+    Chunks are appended to a part file under VIDEO_WORK_DIR/uploads;
+    `received` is the committed offset a client resumes from.
+    """
+    STATUS_CHOICES = (
+        ("open", "Open"),
+        ("finalized", "Finalized"),
+        ("aborted", "Aborted"),
+    )
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name="upload_sessions")
+    created_by = models.ForeignKey("CustomUser", on_delete=models.SET_NULL, null=True, blank=True)
+
+    title = models.CharField(max_length=200, default="Video")
+    description = models.TextField(blank=True)
+    language = models.CharField(max_length=10, default="en")
+    filename = models.CharField(max_length=255)
+
+    size = models.BigIntegerField()
+    received = models.BigIntegerField(default=0)
+    sha256 = models.CharField(max_length=64, blank=True)   # expected, hex
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="open")
+    job_id = models.CharField(max_length=64, blank=True)
+    video = models.ForeignKey(Video, on_delete=models.SET_NULL, null=True, blank=True, related_name="upload_sessions")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.filename} {self.received}/{self.size} ({self.status})"
+
 
 
 # =====================================================
@@ -551,6 +653,45 @@ class StudentModuleUnlock(models.Model):
 
 
 
+class StudentCourseProgression(models.Model):
+    """
+    Materialized unlock/completion state of every module in a course for
+    one student. `module_ids` is the course's module ids in order and
+    `states` holds one character per module (see api.progression).
+    """
+    LOCKED = "L"
+    UNLOCKED = "U"
+    COMPLETED = "C"
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    course = models.ForeignKey(Course, on_delete=models.CASCADE)
+    module_ids = models.JSONField(default=list, blank=True)
+    states = models.TextField(default="", blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("user", "course")
+
+    def state_map(self):
+        return dict(zip(self.module_ids, self.states))
+
+    def unlocked_module_ids(self):
+        return {
+            module_id
+            for module_id, state in zip(self.module_ids, self.states)
+            if state != self.LOCKED
+        }
+
+    def is_unlocked(self, module_id):
+        return self.state_map().get(module_id, self.LOCKED) != self.LOCKED
+
+    def is_completed(self, module_id):
+        return self.state_map().get(module_id) == self.COMPLETED
+
+    def __str__(self):
+        return f"{self.user.email} → {self.course.title} [{self.states}]"
+
+
 class EmailOTP(models.Model):
     email = models.EmailField(unique=True)
     otp = models.CharField(max_length=6)
@@ -29,3 +29,4 @@ class IsSEOUserRole(BasePermission):
             and request.user.is_active
             and hasattr(request.user, "seo_profile")
         )
+
@@ -0,0 +1,114 @@
+# api/playback.py
+
+"""
+Signed HLS playback URLs.
+
+The token lives in the URL path, in front of the HLS directory:
+
+    {PLAYBACK_BASE_URL}/p/{expires}/{user_id}/{signature}/videos/course-1/lesson_2/hls/master.m3u8
+
+    signature = base64url(HMAC-SHA256(PLAYBACK_SIGNING_KEY,
+                                      "{expires}:{user_id}:{prefix}")), unpadded
+    prefix    = "videos/course-1/lesson_2/hls/"
+
+Variant playlists, segments and the VTT are relative URIs, so players
+resolve them under the same token path and one token covers the whole
+stream. The edge worker in front of the bucket recomputes the HMAC
+(see verify_playback_path), checks the expiry, strips the token and
+serves the object under its bare key. No Django round trip is needed,
+and the CDN keeps one cached copy per object for all users.
+
+Expiry is rounded up to a PLAYBACK_TOKEN_WINDOW boundary, so a user gets
+the same URL for a whole window and it is only signed once per window.
+"""
+
+import base64
+import hashlib
+import hmac
+import re
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+PLAYBACK_URL_CACHE_KEY = "playback_url:v1:{video_id}:{user_id}:{expires}"
+
+_TOKEN_PATH = re.compile(r"^/?p/(\d+)/(\d+)/([A-Za-z0-9_-]+)/(.+)$")
+
+
+def playback_enabled():
+    return bool(getattr(settings, "PLAYBACK_SIGNING_KEY", "") and getattr(settings, "PLAYBACK_BASE_URL", ""))
+
+
+def _signature(expires, user_id, prefix):
+    digest = hmac.new(
+        settings.PLAYBACK_SIGNING_KEY.encode("utf-8"),
+        f"{expires}:{user_id}:{prefix}".encode("utf-8"),
+        hashlib.sha256,
+    ).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode("ascii")
+
+
+def _object_key(video_url):
+    base = f"{settings.R2_PUBLIC_BASE_URL}/"
+    if not video_url or not video_url.startswith(base):
+        return None
+    return video_url[len(base):]
+
+
+def window_expiry(now=None):
+    """
+    Expiry for a token issued at `now`: at least PLAYBACK_TOKEN_TTL away,
+    rounded up to the next window boundary.
+    """
+    now = int(now if now is not None else time.time())
+    window = settings.PLAYBACK_TOKEN_WINDOW
+    return -(-(now + settings.PLAYBACK_TOKEN_TTL) // window) * window
+
+
+def sign_playback_url(key, user_id, expires):
+    prefix = key.rsplit("/", 1)[0] + "/"
+    signature = _signature(expires, user_id, prefix)
+    return f"{settings.PLAYBACK_BASE_URL}/p/{expires}/{user_id}/{signature}/{key}"
+
+
+def playback_url(video, user):
+    """
+    Signed master.m3u8 URL of `video` for `user`. Falls back to the raw
+    video_url when signing is not configured or the URL is not ours.
+    """
+    key = _object_key(video.video_url)
+    if not playback_enabled() or key is None:
+        return video.video_url
+
+    now = int(time.time())
+    expires = window_expiry(now)
+    cache_key = PLAYBACK_URL_CACHE_KEY.format(video_id=video.id, user_id=user.id, expires=expires)
+    url = cache.get(cache_key)
+    if url is None:
+        url = sign_playback_url(key, user.id, expires)
+        cache.set(cache_key, url, timeout=expires - now)
+    return url
+
+
+def verify_playback_path(path, now=None):
+    """
+    Reference check for the edge: the bare object key for a valid,
+    unexpired token path, else None. The token must cover the object's
+    directory (or a parent of it).
+    """
+    match = _TOKEN_PATH.match(path)
+    if not match:
+        return None
+    expires, user_id, signature, key = match.groups()
+    if int(expires) < int(now if now is not None else time.time()):
+        return None
+    if ".." in key.split("/"):
+        return None
+
+    parts = key.split("/")
+    for depth in range(len(parts) - 1, 0, -1):
+        prefix = "/".join(parts[:depth]) + "/"
+        if hmac.compare_digest(signature, _signature(expires, user_id, prefix)):
+            return key
+    return None
@@ -0,0 +1,187 @@
+# api/progression.py
+
+"""
+Per-(user, course) progression state.
+
+The state of each module is kept in StudentCourseProgression as one
+character per module, in course order:
+
+    L → locked, U → unlocked, C → completed
+
+Writers (video progress, complete-video, test submit) update the row
+incrementally; readers fetch a single row. If the course's module list
+changed since the row was written, it is rebuilt from the source tables.
+"""
+
+import logging
+
+from django.db import transaction
+from django.utils import timezone
+
+from api.models import (
+    CourseModuleItem,
+    StudentContentProgress,
+    StudentCourseProgression,
+    StudentModuleUnlock,
+    StudentVideoProgress,
+)
+
+logger = logging.getLogger(__name__)
+
+LOCKED = StudentCourseProgression.LOCKED
+UNLOCKED = StudentCourseProgression.UNLOCKED
+COMPLETED = StudentCourseProgression.COMPLETED
+
+
+def _course_module_rows(course_id):
+    return list(
+        CourseModuleItem.objects.filter(course_id=course_id)
+        .order_by("order")
+        .values_list("id", "item_type", "video_id")
+    )
+
+
+def compute_states(user, module_rows):
+    """
+    Recompute module states from the progress tables in three queries.
+    A module is completed when its video/content progress says so and
+    unlocked when it is first, follows a completed module or has an
+    unlock row.
+    """
+    module_ids = [row[0] for row in module_rows]
+    video_ids = [row[2] for row in module_rows if row[2]]
+
+    completed_videos = set(
+        StudentVideoProgress.objects.filter(
+            user=user, video_id__in=video_ids, is_completed=True
+        ).values_list("video_id", flat=True)
+    )
+    completed_modules = set(
+        StudentContentProgress.objects.filter(
+            user=user, module_id__in=module_ids, is_completed=True
+        ).values_list("module_id", flat=True)
+    )
+    unlocked_modules = set(
+        StudentModuleUnlock.objects.filter(
+            user=user, module_id__in=module_ids, is_unlocked=True
+        ).values_list("module_id", flat=True)
+    )
+
+    states = []
+    previous_completed = False
+    for index, (module_id, item_type, video_id) in enumerate(module_rows):
+        completed = module_id in completed_modules or (
+            item_type == "video" and video_id in completed_videos
+        )
+        unlocked = index == 0 or previous_completed or module_id in unlocked_modules
+
+        if completed:
+            states.append(COMPLETED)
+        elif unlocked:
+            states.append(UNLOCKED)
+        else:
+            states.append(LOCKED)
+
+        previous_completed = completed
+
+    return "".join(states)
+
+
+def rebuild_progression(user, course_id, module_rows=None):
+    """
+    Recompute the row from the source tables. The states are computed
+    while holding the row lock, so a rebuild cannot overwrite a
+    concurrent mark_module_completed() with states read before it.
+    """
+    with transaction.atomic():
+        # make sure there is a row to lock; a concurrent creator wins
+        StudentCourseProgression.objects.get_or_create(user=user, course_id=course_id)
+        progression = StudentCourseProgression.objects.select_for_update().get(
+            user=user, course_id=course_id
+        )
+
+        if module_rows is None:
+            module_rows = _course_module_rows(course_id)
+
+        progression.module_ids = [row[0] for row in module_rows]
+        progression.states = compute_states(user, module_rows)
+        progression.save(update_fields=["module_ids", "states", "updated_at"])
+    return progression
+
+
+def get_progression(user, course_id, module_ids=None):
+    """
+    Return the user's progression row for a course.
+
+    Pass the course's ordered `module_ids` when the caller already loaded
+    the modules; the row is rebuilt if it is missing or out of date.
+    """
+    progression = StudentCourseProgression.objects.filter(
+        user=user, course_id=course_id
+    ).first()
+
+    if module_ids is None:
+        module_ids = [row[0] for row in _course_module_rows(course_id)]
+
+    if progression is None or progression.module_ids != list(module_ids):
+        # recomputed under the row lock, from the current module list
+        progression = rebuild_progression(user, course_id)
+
+    return progression
+
+
+def mark_module_completed(user, module):
+    """
+    Mark `module` completed and unlock the module right after it.
+    Call after the source progress rows have been written.
+    """
+    with transaction.atomic():
+        progression = (
+            StudentCourseProgression.objects.select_for_update()
+            .filter(user=user, course_id=module.course_id)
+            .first()
+        )
+
+        if progression is None or module.id not in progression.module_ids:
+            rebuild_progression(user, module.course_id)
+            return
+
+        index = progression.module_ids.index(module.id)
+        states = list(progression.states.ljust(len(progression.module_ids), LOCKED))
+        states[index] = COMPLETED
+        if index + 1 < len(states) and states[index + 1] == LOCKED:
+            states[index + 1] = UNLOCKED
+
+        new_states = "".join(states)
+        if new_states != progression.states:
+            progression.states = new_states
+            progression.save(update_fields=["states", "updated_at"])
+
+
+def complete_module(user, module):
+    """
+    Record completion of `module`: content progress row, unlock row for
+    the next module in order, then the materialized state.
+    """
+    StudentContentProgress.objects.update_or_create(
+        user=user,
+        module=module,
+        defaults={
+            "is_completed": True,
+            "completed_at": timezone.now()
+        }
+    )
+
+    next_module = CourseModuleItem.objects.filter(
+        course_id=module.course_id,
+        order__gt=module.order
+    ).order_by("order").first()
+
+    if next_module:
+        StudentModuleUnlock.objects.update_or_create(
+            user=user,
+            module=next_module,
+            defaults={"is_unlocked": True}
+        )
+
+    mark_module_completed(user, module)
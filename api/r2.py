@@ -36,39 +36,25 @@ import logging
 logger = logging.getLogger(__name__)
 
 
-def upload_folder_recursive_to_r2(local_folder, r2_prefix):
-    logger.info("☁️ Initializing Cloudflare R2 client")
-
-    s3 = boto3.client(
-        "s3",
-        endpoint_url=f"https://{os.getenv('R2_ACCOUNT_ID')}.r2.cloudflarestorage.com",
-        aws_access_key_id=os.getenv("R2_ACCESS_KEY_ID"),
-        aws_secret_access_key=os.getenv("R2_SECRET_ACCESS_KEY"),
-        region_name="auto",
-    )
-
-    bucket = os.getenv("R2_BUCKET_NAME")
+def upload_folder_recursive_to_r2(local_folder, r2_prefix, sync=False, delete=False):
+    """
+    Upload every file under `local_folder` to `r2_prefix`. With sync=True
+    only new or changed files are sent (see sync_folder_to_r2), and
+    delete=True also removes remote keys that no longer exist locally.
+    """
+    if sync or delete:
+        return sync_folder_to_r2(local_folder, r2_prefix, delete=delete)
 
-    for root, _, files in os.walk(local_folder):
-        for file in files:
+    files = []
+    for root, _, filenames in os.walk(local_folder):
+        for file in filenames:
             local_path = os.path.join(root, file)
             rel_path = os.path.relpath(local_path, local_folder)
             r2_key = f"{r2_prefix}/{rel_path}".replace("\\", "/")
+            files.append((local_path, r2_key))
 
-            logger.info(f"⬆️ Uploading: {r2_key}")
-
-            extra = {}
-            if file.endswith(".m3u8"):
-                extra["ContentType"] = "application/vnd.apple.mpegurl"
-            elif file.endswith(".ts"):
-                extra["ContentType"] = "video/mp2t"
-
-            s3.upload_file(
-                local_path,
-                bucket,
-                r2_key,
-                ExtraArgs=extra
-            )
+    logger.info(f"⬆️ Uploading {len(files)} file(s) to {r2_prefix}")
+    upload_files_parallel(files)
 
     logger.info("☁️ All files uploaded to R2")
 
@@ -100,3 +86,662 @@ def download_from_r2(r2_key: str) -> str:
             for chunk in remote_file:
                 tmp.write(chunk)
             return tmp.name
+
+
+import io
+import threading
+from botocore.config import Config
+
+_r2_client = None
+_r2_client_lock = threading.Lock()
+
+
+def get_r2_client():
+    """
+    Shared boto3 client for the media bucket. boto3 clients are
+    thread-safe; one pooled client avoids a TLS handshake per call.
+    """
+    global _r2_client
+    if _r2_client is None:
+        with _r2_client_lock:
+            if _r2_client is None:
+                _r2_client = boto3.client(
+                    "s3",
+                    endpoint_url=settings.AWS_S3_ENDPOINT_URL,
+                    aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+                    aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+                    region_name=settings.AWS_S3_REGION_NAME,
+                    config=Config(
+                        signature_version="s3v4",
+                        max_pool_connections=getattr(settings, "R2_MAX_POOL_CONNECTIONS", 32),
+                        retries={"max_attempts": 5, "mode": "standard"},
+                    ),
+                )
+    return _r2_client
+
+
+class R2RangeReader(io.RawIOBase):
+    """
+    Read-only, seekable file object over an R2 object.
+    Every read() is a single HTTP Range GET, so zipfile and friends only
+    transfer the bytes they actually touch.
+    """
+
+    def __init__(self, key, bucket=None, size=None, client=None):
+        super().__init__()
+        self.key = key
+        self.bucket = bucket or settings.AWS_STORAGE_BUCKET_NAME
+        self.client = client or get_r2_client()
+        if size is None:
+            size = self.client.head_object(Bucket=self.bucket, Key=self.key)["ContentLength"]
+        self.size = size
+        self.bytes_fetched = 0
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            pos = offset
+        elif whence == io.SEEK_CUR:
+            pos = self._pos + offset
+        elif whence == io.SEEK_END:
+            pos = self.size + offset
+        else:
+            raise ValueError(f"invalid whence {whence}")
+        if pos < 0:
+            raise ValueError("negative seek position")
+        self._pos = pos
+        return pos
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = self.size - self._pos
+        size = min(size, self.size - self._pos)
+        if size <= 0:
+            return b""
+        data = self._get(self._pos, size).read()
+        self.bytes_fetched += len(data)
+        self._pos += len(data)
+        return data
+
+    def readall(self):
+        return self.read()
+
+    def readinto(self, buffer):
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def iter_range(self, start, length, chunk_size=256 * 1024):
+        """
+        Stream `length` bytes from `start` with one GET.
+        """
+        if length <= 0:
+            return
+        body = self._get(start, length)
+        try:
+            for chunk in body.iter_chunks(chunk_size):
+                self.bytes_fetched += len(chunk)
+                yield chunk
+        finally:
+            body.close()
+
+    def _get(self, start, length):
+        return self.client.get_object(
+            Bucket=self.bucket,
+            Key=self.key,
+            Range=f"bytes={start}-{start + length - 1}",
+        )["Body"]
+
+
+import re
+from django.http import HttpResponse, StreamingHttpResponse
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def parse_range_header(header, size):
+    """
+    Parse a single-range "Range: bytes=..." header.
+
+    Returns (start, end) inclusive, None when the header is absent or not
+    something we serve partially (other units), or False when the range
+    cannot be satisfied. Multi-range requests are rejected (False): we
+    never build multipart/byteranges bodies.
+    """
+    if not header:
+        return None
+
+    if header.strip().startswith("bytes=") and "," in header:
+        return False
+
+    match = _RANGE_RE.match(header.strip())
+    if not match:
+        return None
+
+    first, last = match.groups()
+    if not first and not last:
+        return None
+
+    if not first:
+        # suffix range: last N bytes
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or end < start:
+        return False
+    return start, min(end, size - 1)
+
+
+def presigned_get_url(key, expires_in=300, filename=None, bucket=None):
+    params = {
+        "Bucket": bucket or settings.AWS_STORAGE_BUCKET_NAME,
+        "Key": key,
+    }
+    if filename:
+        params["ResponseContentDisposition"] = f'attachment; filename="{filename}"'
+
+    return get_r2_client().generate_presigned_url(
+        "get_object", Params=params, ExpiresIn=expires_in
+    )
+
+
+def stream_r2_object(request, key, content_type=None, filename=None,
+                     chunk_size=256 * 1024, bucket=None):
+    """
+    Stream an R2 object to the client in fixed-size chunks with
+    Content-Length, honouring a single Range header (206 / 416).
+    The worker never holds more than one chunk in memory.
+    """
+    bucket = bucket or settings.AWS_STORAGE_BUCKET_NAME
+    client = get_r2_client()
+
+    head = client.head_object(Bucket=bucket, Key=key)
+    size = head["ContentLength"]
+    content_type = content_type or head.get("ContentType") or "application/octet-stream"
+
+    byte_range = parse_range_header(request.META.get("HTTP_RANGE"), size)
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{size}"
+        return response
+
+    get_kwargs = {"Bucket": bucket, "Key": key}
+    if byte_range:
+        start, end = byte_range
+        get_kwargs["Range"] = f"bytes={start}-{end}"
+    else:
+        start, end = 0, size - 1
+
+    body = client.get_object(**get_kwargs)["Body"]
+
+    def chunks():
+        try:
+            yield from body.iter_chunks(chunk_size)
+        finally:
+            body.close()
+
+    response = StreamingHttpResponse(
+        chunks(),
+        status=206 if byte_range else 200,
+        content_type=content_type,
+    )
+    response["Content-Length"] = str(end - start + 1 if size else 0)
+    response["Accept-Ranges"] = "bytes"
+    if byte_range:
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    if head.get("ETag"):
+        response["ETag"] = head["ETag"]
+    if filename:
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+HLS_CONTENT_TYPES = {
+    ".m3u8": "application/vnd.apple.mpegurl",
+    ".ts": "video/MP2T",
+    ".vtt": "text/vtt",
+}
+
+
+def content_type_for(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext in HLS_CONTENT_TYPES:
+        return HLS_CONTENT_TYPES[ext]
+    return mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+
+def _upload_with_retry(client, bucket, local_path, key, retries):
+    for attempt in range(retries + 1):
+        try:
+            client.upload_file(
+                local_path,
+                bucket,
+                key,
+                ExtraArgs={"ContentType": content_type_for(local_path)},
+                # fixed part size, so sync can predict multipart ETags
+                Config=UPLOAD_TRANSFER_CONFIG,
+            )
+            return key
+        except Exception as exc:
+            if attempt == retries:
+                raise
+            delay = min(2 ** attempt, 30) * (0.5 + random.random())
+            logger.warning("Upload %s failed (%s); retry %s in %.1fs", key, exc, attempt + 1, delay)
+            time.sleep(delay)
+
+
+def upload_files_parallel(files, *, bucket=None, max_workers=None, retries=None, on_progress=None):
+    """
+    Upload [(local_path, r2_key), ...] on a bounded thread pool sharing
+    one pooled client. Each file is retried with exponential backoff;
+    the first file that still fails cancels the rest and is re-raised.
+
+    on_progress(done, total, key) is called from the calling thread.
+    """
+    bucket = bucket or settings.AWS_STORAGE_BUCKET_NAME
+    max_workers = max_workers or getattr(settings, "R2_UPLOAD_WORKERS", 16)
+    retries = getattr(settings, "R2_UPLOAD_RETRIES", 4) if retries is None else retries
+    client = get_r2_client()
+
+    total = len(files)
+    done = 0
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [
+            pool.submit(_upload_with_retry, client, bucket, local_path, key, retries)
+            for local_path, key in files
+        ]
+        try:
+            for future in as_completed(futures):
+                key = future.result()
+                done += 1
+                if on_progress:
+                    on_progress(done, total, key)
+        except Exception:
+            for future in futures:
+                future.cancel()
+            raise
+
+    return done
+
+
+class IncrementalFolderUploader:
+    """
+    Upload files from a directory while another process is still writing
+    it (e.g. ffmpeg producing HLS segments).
+
+    A watcher thread polls `local_root` and hands every file accepted by
+    `is_ready(relative_path)` to the upload pool. finish() stops the
+    watcher, uploads whatever is left, then uploads the remaining files
+    in order: other files first, playlists next, master.m3u8 last, so a
+    playlist never references a segment that is not in R2 yet.
+
+    Relative paths in `skip` (already in R2, e.g. from an earlier attempt)
+    are never uploaded.
+    """
+
+    def __init__(self, local_root, r2_prefix, *, is_ready, on_progress=None,
+                 poll_interval=1.0, max_workers=None, retries=None, bucket=None, skip=None):
+        self.local_root = local_root
+        self.r2_prefix = r2_prefix
+        self.is_ready = is_ready
+        self.on_progress = on_progress
+        self.poll_interval = poll_interval
+        self.retries = getattr(settings, "R2_UPLOAD_RETRIES", 4) if retries is None else retries
+        self.bucket = bucket or settings.AWS_STORAGE_BUCKET_NAME
+        self.client = get_r2_client()
+
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_workers or getattr(settings, "R2_UPLOAD_WORKERS", 16)
+        )
+        self._submitted = set(skip or ())
+        self._errors = []
+        # skipped files count as done, so progress still ends at 100%
+        self._done = len(self._submitted)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher = threading.Thread(target=self._watch, daemon=True)
+
+    def start(self):
+        self._watcher.start()
+        return self
+
+    @property
+    def uploaded(self):
+        return self._done
+
+    def _key(self, relative_path):
+        return f"{self.r2_prefix}/{relative_path}"
+
+    def _walk(self):
+        for root, _, files in os.walk(self.local_root):
+            for file in files:
+                local_path = os.path.join(root, file)
+                relative_path = os.path.relpath(local_path, self.local_root).replace("\\", "/")
+                yield local_path, relative_path
+
+    def _scan(self):
+        for local_path, relative_path in self._walk():
+            if relative_path in self._submitted or not self.is_ready(relative_path):
+                continue
+            self._submitted.add(relative_path)
+            future = self._pool.submit(
+                _upload_with_retry, self.client, self.bucket,
+                local_path, self._key(relative_path), self.retries,
+            )
+            future.add_done_callback(self._on_done)
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self._scan()
+            except Exception as exc:
+                logger.warning("Upload watcher scan failed: %s", exc)
+
+    def _on_done(self, future):
+        if future.cancelled():
+            return
+        exc = future.exception()
+        with self._lock:
+            if exc is not None:
+                self._errors.append(exc)
+                return
+            self._done += 1
+            done, total = self._done, len(self._submitted)
+        if self.on_progress:
+            self.on_progress(done, total, future.result())
+
+    def finish(self):
+        """
+        Drain the pool, then upload the held-back files in order.
+        Returns the number of files uploaded.
+        """
+        self._stop.set()
+        self._watcher.join()
+        self._scan()
+        self._pool.shutdown(wait=True)
+
+        if self._errors:
+            raise self._errors[0]
+
+        def publish_order(item):
+            relative_path = item[1]
+            if relative_path == "master.m3u8":
+                return 2, relative_path
+            if relative_path.endswith(".m3u8"):
+                return 1, relative_path
+            return 0, relative_path
+
+        remaining = sorted(
+            (item for item in self._walk() if item[1] not in self._submitted),
+            key=publish_order,
+        )
+        for local_path, relative_path in remaining:
+            self._submitted.add(relative_path)
+            key = _upload_with_retry(
+                self.client, self.bucket, local_path, self._key(relative_path), self.retries
+            )
+            self._done += 1
+            if self.on_progress:
+                self.on_progress(self._done, len(self._submitted), key)
+
+        return self._done
+
+    def abort(self):
+        self._stop.set()
+        if self._watcher.is_alive():
+            self._watcher.join()
+        self._pool.shutdown(wait=True, cancel_futures=True)
+
+
+# -------------------------
+# Multipart uploads: the browser sends parts straight to R2
+# -------------------------
+import math
+
+from boto3.s3.transfer import TransferConfig
+
+MULTIPART_MIN_PART_BYTES = 5 * 1024 * 1024    # S3/R2 minimum (except the last part)
+MULTIPART_MAX_PARTS = 10000
+
+
+def multipart_part_size(total_size):
+    """
+    Part size for an upload of `total_size` bytes. R2 wants every part
+    except the last to be the same size, so the client must stick to it.
+    """
+    part_size = max(getattr(settings, "R2_MULTIPART_PART_BYTES", 16 * 1024 * 1024), MULTIPART_MIN_PART_BYTES)
+    return max(part_size, math.ceil(total_size / MULTIPART_MAX_PARTS))
+
+
+def create_multipart_upload(key, content_type=None, bucket=None):
+    params = {"Bucket": bucket or settings.AWS_STORAGE_BUCKET_NAME, "Key": key}
+    if content_type:
+        params["ContentType"] = content_type
+    return get_r2_client().create_multipart_upload(**params)["UploadId"]
+
+
+def presign_upload_parts(key, upload_id, part_numbers, expires_in=3600, bucket=None):
+    client = get_r2_client()
+    bucket = bucket or settings.AWS_STORAGE_BUCKET_NAME
+    return {
+        number: client.generate_presigned_url(
+            "upload_part",
+            Params={"Bucket": bucket, "Key": key, "UploadId": upload_id, "PartNumber": number},
+            ExpiresIn=expires_in,
+        )
+        for number in part_numbers
+    }
+
+
+def list_uploaded_parts(key, upload_id, bucket=None):
+    """
+    Parts R2 already holds, so a client can resume after a reload.
+    """
+    client = get_r2_client()
+    params = {"Bucket": bucket or settings.AWS_STORAGE_BUCKET_NAME, "Key": key, "UploadId": upload_id}
+    parts = []
+    while True:
+        page = client.list_parts(**params)
+        parts += [
+            {"PartNumber": part["PartNumber"], "ETag": part["ETag"], "Size": part["Size"]}
+            for part in page.get("Parts", [])
+        ]
+        if not page.get("IsTruncated"):
+            return parts
+        params["PartNumberMarker"] = page["NextPartNumberMarker"]
+
+
+def complete_multipart_upload(key, upload_id, parts=None, bucket=None):
+    """
+    Stitch the parts together. Without `parts`, whatever R2 has recorded
+    is used. Returns the final object size.
+    """
+    bucket = bucket or settings.AWS_STORAGE_BUCKET_NAME
+    if not parts:
+        parts = list_uploaded_parts(key, upload_id, bucket=bucket)
+    parts = sorted(
+        ({"PartNumber": int(part["PartNumber"]), "ETag": part["ETag"]} for part in parts),
+        key=lambda part: part["PartNumber"],
+    )
+    client = get_r2_client()
+    client.complete_multipart_upload(
+        Bucket=bucket,
+        Key=key,
+        UploadId=upload_id,
+        MultipartUpload={"Parts": parts},
+    )
+    return client.head_object(Bucket=bucket, Key=key)["ContentLength"]
+
+
+def abort_multipart_upload(key, upload_id, bucket=None):
+    get_r2_client().abort_multipart_upload(
+        Bucket=bucket or settings.AWS_STORAGE_BUCKET_NAME,
+        Key=key,
+        UploadId=upload_id,
+    )
+
+
+def download_r2_object(key, local_path, bucket=None):
+    """
+    Download a (large) object with parallel ranged GETs.
+    """
+    get_r2_client().download_file(
+        bucket or settings.AWS_STORAGE_BUCKET_NAME,
+        key,
+        local_path,
+        Config=TransferConfig(
+            multipart_chunksize=16 * 1024 * 1024,
+            max_concurrency=getattr(settings, "R2_UPLOAD_WORKERS", 16),
+        ),
+    )
+
+
+# -------------------------
+# Sync: upload only what R2 does not have yet
+# -------------------------
+import hashlib
+
+# Part size used by _upload_with_retry (boto3's defaults, pinned): a
+# file above the threshold becomes a multipart object whose ETag is
+# md5(part md5s)-<parts>, which sync_folder_to_r2 recomputes locally.
+UPLOAD_MULTIPART_THRESHOLD = 8 * 1024 * 1024
+UPLOAD_MULTIPART_CHUNKSIZE = 8 * 1024 * 1024
+UPLOAD_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=UPLOAD_MULTIPART_THRESHOLD,
+    multipart_chunksize=UPLOAD_MULTIPART_CHUNKSIZE,
+)
+
+DELETE_BATCH_SIZE = 1000   # DeleteObjects limit
+
+
+def list_r2_objects(prefix, bucket=None):
+    """
+    {key: {"size": ..., "etag": ...}} for every object under `prefix`,
+    paging through ListObjectsV2 (1000 keys per page).
+    """
+    paginator = get_r2_client().get_paginator("list_objects_v2")
+    objects = {}
+    pages = paginator.paginate(Bucket=bucket or settings.AWS_STORAGE_BUCKET_NAME, Prefix=prefix)
+    for page in pages:
+        for item in page.get("Contents", []):
+            objects[item["Key"]] = {
+                "size": item["Size"],
+                "etag": item["ETag"].strip('"'),
+                "last_modified": item["LastModified"],
+            }
+    return objects
+
+
+def local_etag(path, size=None):
+    """
+    The ETag R2 reports for `path` once uploaded by _upload_with_retry:
+    the plain MD5 for single-part objects, md5-of-part-md5s-N otherwise.
+    """
+    size = os.path.getsize(path) if size is None else size
+    part_digests = []
+    with open(path, "rb") as f:
+        for part in iter(lambda: f.read(UPLOAD_MULTIPART_CHUNKSIZE), b""):
+            part_digests.append(hashlib.md5(part).digest())
+
+    if size < UPLOAD_MULTIPART_THRESHOLD:
+        return part_digests[0].hex() if part_digests else hashlib.md5(b"").hexdigest()
+    return f"{hashlib.md5(b''.join(part_digests)).hexdigest()}-{len(part_digests)}"
+
+
+def _delete_batch(client, bucket, batch):
+    response = client.delete_objects(
+        Bucket=bucket,
+        Delete={"Objects": [{"Key": key} for key in batch], "Quiet": True},
+    )
+    errors = response.get("Errors", [])
+    if errors:
+        raise RuntimeError(f"R2 could not delete {len(errors)} key(s), e.g. {errors[0]}")
+    return len(batch)
+
+
+def delete_r2_objects(keys, bucket=None, max_workers=None):
+    """
+    Delete `keys` with DeleteObjects, DELETE_BATCH_SIZE keys per call and
+    several calls in flight at once. Returns the number of keys deleted;
+    per-key errors are raised.
+    """
+    client = get_r2_client()
+    bucket = bucket or settings.AWS_STORAGE_BUCKET_NAME
+    keys = list(keys)
+    batches = [keys[start:start + DELETE_BATCH_SIZE] for start in range(0, len(keys), DELETE_BATCH_SIZE)]
+    if len(batches) <= 1:
+        return sum(_delete_batch(client, bucket, batch) for batch in batches)
+
+    max_workers = max_workers or getattr(settings, "R2_UPLOAD_WORKERS", 16)
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(batches))) as pool:
+        futures = [pool.submit(_delete_batch, client, bucket, batch) for batch in batches]
+        return sum(future.result() for future in as_completed(futures))
+
+
+def sync_folder_to_r2(local_folder, r2_prefix, *, delete=False, bucket=None, on_progress=None):
+    """
+    Make `r2_prefix` match `local_folder` with as little traffic as
+    possible. The prefix is listed once; a file is skipped when R2 has
+    the key with the same size and ETag, otherwise it is uploaded on
+    the upload_files_parallel pool. With delete=True, keys under the
+    prefix that have no local file are removed afterwards.
+
+    Returns a summary dict (files and bytes uploaded/skipped, deleted).
+    """
+    bucket = bucket or settings.AWS_STORAGE_BUCKET_NAME
+    r2_prefix = r2_prefix.rstrip("/")
+    remote = list_r2_objects(f"{r2_prefix}/", bucket=bucket)
+
+    to_upload = []
+    local_keys = set()
+    summary = {"uploaded": 0, "skipped": 0, "deleted": 0, "bytes_sent": 0, "bytes_skipped": 0}
+
+    for root, _, filenames in os.walk(local_folder):
+        for file in filenames:
+            local_path = os.path.join(root, file)
+            rel_path = os.path.relpath(local_path, local_folder).replace("\\", "/")
+            key = f"{r2_prefix}/{rel_path}"
+            size = os.path.getsize(local_path)
+            local_keys.add(key)
+
+            existing = remote.get(key)
+            # sizes first: only hash files that could be identical
+            if existing and existing["size"] == size and existing["etag"] == local_etag(local_path, size):
+                summary["skipped"] += 1
+                summary["bytes_skipped"] += size
+                continue
+            to_upload.append((local_path, key))
+            summary["bytes_sent"] += size
+
+    logger.info(
+        "Sync %s: %s to upload, %s unchanged (%s bytes skipped)",
+        r2_prefix, len(to_upload), summary["skipped"], summary["bytes_skipped"],
+    )
+    if to_upload:
+        summary["uploaded"] = upload_files_parallel(to_upload, bucket=bucket, on_progress=on_progress)
+
+    if delete:
+        stale = sorted(set(remote) - local_keys)
+        if stale:
+            summary["deleted"] = delete_r2_objects(stale, bucket=bucket)
+            logger.info("Sync %s: deleted %s stale key(s)", r2_prefix, summary["deleted"])
+
+    return summary
@@ -0,0 +1,18 @@
+# api/redis_store.py
+
+"""
+Shared Redis connection for data that needs more than the Django cache
+API (hashes, scripts, locks). Uses the same REDIS_URL as CACHES.
+"""
+
+import redis
+from django.conf import settings
+
+_client = None
+
+
+def get_redis():
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+    return _client
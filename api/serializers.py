@@ -4,6 +4,8 @@
 from rest_framework import serializers
 from django.contrib.auth.password_validation import validate_password
 from .models import CustomUser, Course, Video, Enrollment
+from .enrollment_cache import is_enrolled
+from .playback import playback_url
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -84,6 +86,11 @@ class VideoSerializer(serializers.ModelSerializer):
         if data["video_url"] and not data["video_url"].endswith(".m3u8"):
             data["video_url"] = None
 
+        # 🔑 short-lived signed playback URL per user (api/playback.py)
+        request = self.context.get("request")
+        if data["video_url"] and request and request.user.is_authenticated:
+            data["video_url"] = playback_url(instance, request.user)
+
         return data
 
 
@@ -201,7 +208,7 @@ class CourseSerializer(serializers.ModelSerializer):
     def get_is_enrolled(self, obj):
         user = self.context.get("request").user
         if user.is_authenticated:
-            return Enrollment.objects.filter(user=user, course=obj).exists()
+            return is_enrolled(user, obj)
         return False
 
     
@@ -219,7 +226,7 @@ class CourseListSerializer(serializers.ModelSerializer):
     def get_is_enrolled(self, obj):
         user = self.context.get("request").user
         if user.is_authenticated:
-            return Enrollment.objects.filter(user=user, course=obj).exists()
+            return is_enrolled(user, obj)
         return False
     def get_image(self, obj):
         if obj.image:
@@ -270,10 +277,8 @@ class CourseModuleSerializer(serializers.ModelSerializer):
         if obj.item_type != "video" or not obj.video_id:
             return False
 
-        return Video.objects.filter(
-            id=obj.video_id,
-            folder_attachment__isnull=False
-        ).exists()
+        # video is already loaded for title/description, no extra query
+        return bool(obj.video.folder_attachment)
 
 
     # ---------------------------------
@@ -328,10 +333,47 @@ class CourseModuleSerializer(serializers.ModelSerializer):
     # UNLOCK LOGIC HERE
     # ---------------------------------
     def get_is_unlocked(self, obj):
+        # Batched mode: unlock rows were loaded once for the whole course
+        unlocked_ids = self.context.get("unlocked_module_ids")
+        if unlocked_ids is not None:
+            return obj.id in unlocked_ids
+
         user = self.context.get("user")
         unlock = StudentModuleUnlock.objects.filter(user=user, module=obj).first()
         return unlock.is_unlocked if unlock else False
 
+
+def serialize_course_modules(modules, *, user=None, request=None, unlocked_module_ids=None):
+    """
+    Serialize a course's modules in a constant number of queries.
+
+    `modules` must be fetched with select_related("video", "test").
+    Unlock rows for `user` are loaded in one query unless
+    `unlocked_module_ids` is passed in.
+    """
+    modules = list(modules)
+
+    if unlocked_module_ids is None:
+        unlocked_module_ids = set()
+        if user is not None and user.is_authenticated and modules:
+            unlocked_module_ids = set(
+                StudentModuleUnlock.objects.filter(
+                    user=user,
+                    module_id__in=[m.id for m in modules],
+                    is_unlocked=True
+                ).values_list("module_id", flat=True)
+            )
+
+    return CourseModuleSerializer(
+        modules,
+        many=True,
+        context={
+            "request": request,
+            "user": user,
+            "unlocked_module_ids": unlocked_module_ids,
+        }
+    ).data
+
 from api.models import Question,Test
 class QuestionSerializer(serializers.ModelSerializer):
     class Meta:
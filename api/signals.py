@@ -1,7 +1,10 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
-from api.models import AdminProfile, CustomUser, SEOProfile, Video
+from api.enrollment_cache import invalidate_enrollments
+from api.grading import invalidate_answer_key
+from api.models import AdminProfile, CustomUser, Enrollment, Question, SEOProfile, Video
 
 
 @receiver(post_save, sender=CustomUser)
@@ -27,3 +30,18 @@ def auto_process_video(sender, instance, created, **kwargs):
     # Kept safe no-op: this project currently uses manual/other upload pipeline.
     # Avoid runtime crashes from missing fields/services.
     return
+
+
+@receiver(post_save, sender=Enrollment)
+@receiver(post_delete, sender=Enrollment)
+def sync_enrollment_cache(sender, instance, **kwargs):
+    # Payment verification and admin edits both land here
+    user_id = instance.user_id
+    transaction.on_commit(lambda: invalidate_enrollments(user_id))
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def drop_cached_answer_key(sender, instance, **kwargs):
+    test_id = instance.test_id
+    transaction.on_commit(lambda: invalidate_answer_key(test_id))
@@ -0,0 +1,60 @@
+from celery import shared_task
+from django.conf import settings
+
+from api.transcription import record_chunk_done, transcribe_chunk
+from api.video_checkpoints import gc_work_dirs
+from api.video_jobs import acquire_video_slot, set_job
+from api.video_pipeline import run_pipeline
+from api.video_progress import flush_pending_progress
+
+
+@shared_task(ignore_result=True)
+def flush_video_progress():
+    return flush_pending_progress()
+
+
+# Failed jobs keep their work dir for a resume; this drops the ones
+# nobody came back for. Routed to the "video" queue (VIDEO_WORK_DIR).
+@shared_task(ignore_result=True)
+def gc_video_work_dirs():
+    return len(gc_work_dirs())
+
+
+# acks_late + reject_on_worker_lost: a job whose worker dies mid-encode is
+# redelivered instead of silently lost. Routed to the "video" queue.
+@shared_task(
+    bind=True,
+    acks_late=True,
+    reject_on_worker_lost=True,
+    max_retries=None,
+    ignore_result=True,
+)
+def process_video_upload(self, *, job_id, video_id, course_id, lesson_key,
+                         input_path, temp_dir, language, source_key=None, expected_sha256=""):
+    slot = acquire_video_slot()
+    if slot is None:
+        set_job(job_id, phase="queued", message="Waiting for a free processing slot...")
+        raise self.retry(countdown=settings.VIDEO_SLOT_RETRY_DELAY)
+
+    with slot:
+        set_job(job_id, status="processing", worker=self.request.hostname)
+        run_pipeline(
+            job_id=job_id,
+            video_id=video_id,
+            course_id=course_id,
+            lesson_key=lesson_key,
+            input_path=input_path,
+            temp_dir=temp_dir,
+            language=language,
+            source_key=source_key,
+            expected_sha256=expected_sha256,
+        )
+
+
+# Runs on the "transcribe" queue; each worker process keeps one warm
+# Whisper model (api.transcription.get_whisper_model).
+@shared_task(acks_late=True, reject_on_worker_lost=True)
+def transcribe_audio_chunk(*, job_id, audio_path, start, end, language, total_chunks):
+    segments = transcribe_chunk(audio_path, start, end, language)
+    record_chunk_done(job_id, total_chunks)
+    return segments
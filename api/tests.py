@@ -0,0 +1,238 @@
+# api/tests.py
+from unittest import mock
+
+import redis
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from api.models import (
+    Course,
+    CourseModuleItem,
+    CustomUser,
+    Enrollment,
+    StudentCourseProgression,
+    StudentModuleUnlock,
+    StudentVideoProgress,
+    Test,
+    Video,
+)
+from api import video_progress
+from api.progression import get_progression
+
+
+class CourseModulesQueryCountTests(TestCase):
+    """
+    CourseModulesAPIView must not issue queries per module: the module
+    list, videos/tests, attachment flags and unlock state are batched.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(email="student@example.com", password="pass", role="student")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def make_course(self, module_count):
+        course = Course.objects.create(title=f"Course {module_count}", description="", price=0)
+        # the enrollment cache is refreshed on commit
+        with self.captureOnCommitCallbacks(execute=True):
+            Enrollment.objects.create(user=self.user, course=course)
+        for order in range(1, module_count + 1):
+            if order % 4 == 0:
+                test = Test.objects.create(course=course, name=f"Test {order}")
+                CourseModuleItem.objects.create(course=course, item_type="test", test=test, order=order)
+            else:
+                video = Video.objects.create(course=course, title=f"Video {order}", status="ready")
+                CourseModuleItem.objects.create(course=course, item_type="video", video=video, order=order)
+        return course
+
+    def count_queries(self, course):
+        url = f"/api/courses/{course.id}/modules/"
+        # first request builds the progression row and warms the caches
+        self.assertEqual(self.client.get(url, HTTP_HOST="localhost").status_code, 200)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, HTTP_HOST="localhost")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(any(module["is_unlocked"] for module in response.json()))
+        self.assertEqual(len(response.json()), CourseModuleItem.objects.filter(course=course).count())
+        return len(queries.captured_queries)
+
+    def test_query_count_does_not_grow_with_modules(self):
+        small = self.count_queries(self.make_course(3))
+        large = self.count_queries(self.make_course(60))
+
+        self.assertEqual(large, small)
+        self.assertLessEqual(large, 10)
+
+
+class CompleteVideoTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(email="student@example.com", password="pass", role="student")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.course = Course.objects.create(title="Course", description="", price=0)
+        self.modules = [
+            CourseModuleItem.objects.create(
+                course=self.course,
+                item_type="video",
+                video=Video.objects.create(course=self.course, title=f"Video {order}", status="ready"),
+                order=order,
+            )
+            # a gap in the order, as left behind by a deleted module
+            for order in (1, 3, 4)
+        ]
+
+    def test_unlocks_next_module_across_order_gaps(self):
+        first, second, third = self.modules
+        get_progression(self.user, self.course.id)
+
+        response = self.client.post(f"/api/modules/{first.id}/complete-video/", HTTP_HOST="localhost")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(StudentModuleUnlock.objects.filter(user=self.user, module=second).exists())
+        progression = StudentCourseProgression.objects.get(user=self.user, course=self.course)
+        self.assertEqual(progression.states, "CUL")
+        # a rebuild from the source tables agrees with the incremental update
+        progression.module_ids = []
+        progression.save()
+        self.assertEqual(get_progression(self.user, self.course.id).states, "CUL")
+
+
+class FakeRedis:
+    """
+    The hash/string/lock subset of redis-py that flush_pending_progress uses.
+    """
+
+    def __init__(self):
+        self.data = {}
+
+    def lock(self, name, timeout=None):
+        return mock.Mock(**{"acquire.return_value": True})
+
+    def exists(self, key):
+        return key in self.data
+
+    def rename(self, src, dst):
+        if src not in self.data:
+            raise redis.ResponseError("no such key")
+        self.data[dst] = self.data.pop(src)
+
+    def hgetall(self, key):
+        return dict(self.data.get(key, {}))
+
+    def hset(self, key, mapping):
+        self.data.setdefault(key, {}).update(mapping)
+
+    def incr(self, key):
+        self.data[key] = self.data.get(key, 0) + 1
+        return self.data[key]
+
+    def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+    def expire(self, key, ttl):
+        pass
+
+    def pipeline(self):
+        pipe = mock.Mock()
+        pipe.hset.side_effect = self.hset
+        pipe.expire.side_effect = self.expire
+        return pipe
+
+
+class VideoProgressWriteBehindTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(email="student@example.com", password="pass", role="student")
+        self.course = Course.objects.create(title="Course", description="", price=0)
+        with self.captureOnCommitCallbacks(execute=True):
+            Enrollment.objects.create(user=self.user, course=self.course)
+        self.videos = [
+            Video.objects.create(course=self.course, title=f"Video {order}", status="ready", duration=100)
+            for order in (1, 2)
+        ]
+        for order, video in enumerate(self.videos, start=1):
+            CourseModuleItem.objects.create(course=self.course, item_type="video", video=video, order=order)
+
+    def field(self, video):
+        return f"{self.user.id}:{self.course.id}:{video.id}"
+
+    def progress(self, video):
+        return StudentVideoProgress.objects.get(user=self.user, video=video)
+
+    def test_batch_max_merges_and_caps_at_duration(self):
+        video = self.videos[0]
+        video_progress.apply_progress_batch({self.field(video): "40"})
+        video_progress.apply_progress_batch({self.field(video): "25"})
+
+        progress = self.progress(video)
+        self.assertEqual((progress.watched_seconds, progress.last_position), (40, 40))
+        self.assertFalse(progress.is_completed)
+
+        with mock.patch("api.video_progress.complete_module"):
+            video_progress.apply_progress_batch({self.field(video): "5000"})
+        progress = self.progress(video)
+        self.assertEqual((progress.watched_seconds, progress.last_position), (100, 100))
+        self.assertTrue(progress.is_completed)
+
+    def test_completion_is_claimed_once(self):
+        video = self.videos[0]
+        video_progress.apply_progress_batch({self.field(video): "50"})
+        stale = self.progress(video)
+
+        with mock.patch("api.video_progress.complete_module") as complete:
+            video_progress.apply_progress_batch({self.field(video): "95"})
+            video_progress.apply_progress_batch({self.field(video): "98"})
+            # a flush that loaded the row before the first one committed
+            video_progress._apply_completions([(stale, self.course.id, 100)])
+
+        self.assertEqual(complete.call_count, 1)
+        self.assertTrue(self.progress(video).is_completed)
+
+    @override_settings(VIDEO_PROGRESS_FLUSH_ATTEMPTS=3)
+    def test_poison_entry_goes_to_dead_letter(self):
+        good, bad = self.videos
+        client = FakeRedis()
+        client.hset(video_progress.PENDING_KEY, {self.field(good): "30", self.field(bad): "30"})
+        apply_chunk = video_progress._apply_chunk
+
+        def failing_chunk(positions):
+            if any(video_id == bad.id for _, _, video_id in positions):
+                raise RuntimeError("poison")
+            return apply_chunk(positions)
+
+        with mock.patch("api.video_progress.get_redis", return_value=client), \
+                mock.patch("api.video_progress._apply_chunk", side_effect=failing_chunk):
+            for _ in range(2):
+                with self.assertRaises(RuntimeError):
+                    video_progress.flush_pending_progress()
+            with self.assertLogs("api.video_progress", level="ERROR"):
+                self.assertEqual(video_progress.flush_pending_progress(), 1)
+
+        self.assertEqual(self.progress(good).watched_seconds, 30)
+        self.assertFalse(StudentVideoProgress.objects.filter(user=self.user, video=bad).exists())
+        self.assertEqual(client.data[video_progress.DEAD_LETTER_KEY], {self.field(bad): "30"})
+        self.assertNotIn(video_progress.FLUSHING_KEY, client.data)
+        self.assertNotIn(video_progress.FLUSH_FAILURES_KEY, client.data)
+
+    @override_settings(VIDEO_PROGRESS_WRITE_BEHIND=True)
+    def test_heartbeat_falls_back_to_db_when_redis_is_down(self):
+        video = self.videos[0]
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        with mock.patch("api.views.buffer_heartbeat", side_effect=redis.ConnectionError("down")):
+            response = client.post(
+                f"/api/courses/{self.course.id}/videos/{video.id}/progress/",
+                {"current_time": 30},
+                format="json",
+                HTTP_HOST="localhost",
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("buffered", response.json())
+        self.assertEqual(self.progress(video).last_position, 30)
@@ -0,0 +1,395 @@
+# api/transcription.py
+
+"""
+Whisper transcription for the video pipeline.
+
+Two modes, picked by WHISPER_POOL_ENABLED:
+
+- pool: a background thread extracts 16 kHz mono audio while the HLS
+  encode runs, splits it into overlapping chunks and fans them out to
+  the "transcribe" Celery queue. Each worker process keeps one warm model. Segments are stitched back
+  onto the source timeline and written as one VTT.
+- process: a single transcribe_video child process next to ffmpeg
+  (no transcription workers needed).
+
+On CPU, WHISPER_CPU_QUANTIZE runs the model with int8 dynamic
+quantization of its Linear layers.
+"""
+
+import logging
+import os
+import subprocess
+import sys
+import threading
+import wave
+from collections import deque
+
+from django.conf import settings
+
+from api.video_jobs import incr_job, set_job
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+
+# per worker process: loaded once, reused across jobs
+_whisper_model = None
+_whisper_device = None
+
+
+def _quantize_linear_layers(model, linear_class):
+    """
+    int8 dynamic quantization of the model's Linear layers. Returns
+    (model, number of layers quantized); raises if there were none.
+
+    Whisper builds its layers from its own nn.Linear subclass, while
+    quantize_dynamic (qconfig propagation, module swap and from_float)
+    only matches the exact nn.Linear type. Each layer is first replaced
+    by a plain nn.Linear sharing its parameters; Whisper's subclass only
+    adds a dtype cast, which is a no-op for a float32 CPU model.
+    """
+    import torch
+
+    for parent in list(model.modules()):
+        for name, child in list(parent.named_children()):
+            if type(child) is linear_class:
+                plain = torch.nn.Linear(child.in_features, child.out_features, bias=child.bias is not None)
+                plain.weight = child.weight
+                plain.bias = child.bias
+                setattr(parent, name, plain)
+
+    model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    quantized = sum(
+        isinstance(module, torch.ao.nn.quantized.dynamic.Linear) for module in model.modules()
+    )
+    if not quantized:
+        raise RuntimeError("WHISPER_CPU_QUANTIZE is on but no Linear layer was quantized")
+    return model, quantized
+
+
+def get_whisper_model():
+    global _whisper_model, _whisper_device
+    if _whisper_model is not None:
+        return _whisper_model, _whisper_device
+
+    import torch
+    import whisper
+
+    model_name = getattr(settings, "WHISPER_MODEL", "base")
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    model = whisper.load_model(model_name, device=device)
+
+    if device == "cpu" and getattr(settings, "WHISPER_CPU_QUANTIZE", False):
+        model, quantized = _quantize_linear_layers(model, whisper.model.Linear)
+        logger.info(
+            "Whisper %s loaded with int8 dynamic quantization (%s Linear layers)",
+            model_name, quantized,
+        )
+
+    _whisper_model = model
+    _whisper_device = device
+    return _whisper_model, _whisper_device
+
+
+def seconds_to_vtt_time(seconds):
+    hours = int(seconds // 3600)
+    minutes = int((seconds % 3600) // 60)
+    secs = float(seconds % 60)
+    return f"{hours:02}:{minutes:02}:{secs:06.3f}"
+
+
+def write_vtt(subtitle_path, segments):
+    """
+    segments: iterable of (start, end, text) in seconds.
+    """
+    with open(subtitle_path, "w", encoding="utf-8") as vtt:
+        vtt.write("WEBVTT\n\n")
+        for start, end, text in segments:
+            text = (text or "").strip()
+            if text:
+                vtt.write(f"{seconds_to_vtt_time(start)} --> {seconds_to_vtt_time(end)}\n{text}\n\n")
+
+
+def _transcribe(audio, language):
+    whisper_model, whisper_device = get_whisper_model()
+    return whisper_model.transcribe(
+        audio,
+        language=language,
+        verbose=False,
+        fp16=(whisper_device == "cuda"),
+    ).get("segments", [])
+
+
+# -------------------------
+# process mode
+# -------------------------
+
+def transcribe_to_vtt(input_path, subtitle_path, *, language, job_id=None, threads=0):
+    """
+    Whisper → WebVTT for a whole file. Runs in the transcribe_video
+    management command, i.e. in its own process next to ffmpeg.
+    """
+    if threads:
+        import torch
+        torch.set_num_threads(threads)
+
+    segments = _transcribe(input_path, language)
+    write_vtt(
+        subtitle_path,
+        ((s.get("start", 0), s.get("end", 0), s.get("text", "")) for s in segments),
+    )
+    if job_id:
+        set_job(job_id, subtitle_progress=100)
+
+
+class ProcessTranscription:
+    def __init__(self, *, job_id, input_path, subtitle_path, language, temp_dir):
+        self.log_path = os.path.join(temp_dir, "transcribe.log")
+        threads = getattr(settings, "WHISPER_THREADS", 0)
+        env = dict(os.environ)
+        if threads:
+            for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+                env[var] = str(threads)
+
+        with open(self.log_path, "w") as log_file:
+            self.proc = subprocess.Popen(
+                [
+                    sys.executable, os.path.join(str(settings.BASE_DIR), "manage.py"),
+                    "transcribe_video", input_path, subtitle_path,
+                    "--language", language,
+                    "--job", job_id,
+                    "--threads", str(threads),
+                ],
+                stdout=subprocess.DEVNULL,
+                # a file, not a pipe: whisper's progress output would fill a pipe
+                stderr=log_file,
+                env=env,
+            )
+
+    def running(self):
+        return self.proc.poll() is None
+
+    def wait(self):
+        """
+        Block until done. Returns a warning string on failure, else None.
+        """
+        if self.proc.wait() == 0:
+            return None
+        with open(self.log_path, encoding="utf-8", errors="ignore") as log:
+            tail = [line.strip() for line in deque(log, maxlen=20) if line.strip()]
+        return tail[-1] if tail else "Subtitle generation failed"
+
+    def cancel(self):
+        if self.running():
+            self.proc.kill()
+            self.proc.wait()
+
+
+# -------------------------
+# pool mode
+# -------------------------
+
+def extract_audio(input_path, audio_path, on_start=None):
+    """
+    16 kHz mono WAV for the chunk workers. on_start(proc) receives the
+    ffmpeg process so a caller can kill it.
+    """
+    proc = subprocess.Popen(
+        [
+            "ffmpeg", "-y", "-i", input_path,
+            "-vn", "-ac", "1", "-ar", str(SAMPLE_RATE), "-c:a", "pcm_s16le",
+            audio_path,
+        ],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    if on_start:
+        on_start(proc)
+    _, stderr = proc.communicate()
+    if proc.returncode != 0:
+        raise RuntimeError(f"Audio extraction failed: {stderr[-300:]}")
+
+
+def audio_duration(audio_path):
+    with wave.open(audio_path, "rb") as wav:
+        return wav.getnframes() / float(wav.getframerate())
+
+
+def plan_chunks(duration, chunk_seconds, overlap_seconds):
+    """
+    [(start, end), ...] covering [0, duration]; neighbours overlap by
+    `overlap_seconds` so no word is cut at a boundary.
+    """
+    if duration <= chunk_seconds:
+        return [(0.0, duration)]
+
+    chunks = []
+    start = 0.0
+    step = chunk_seconds - overlap_seconds
+    while start < duration:
+        end = min(start + chunk_seconds, duration)
+        if duration - end <= overlap_seconds:
+            # fold a tail shorter than the overlap into this chunk
+            end = duration
+        chunks.append((start, end))
+        if end >= duration:
+            break
+        start += step
+    return chunks
+
+
+def load_audio_slice(audio_path, start, end):
+    import numpy as np
+
+    with wave.open(audio_path, "rb") as wav:
+        rate = wav.getframerate()
+        wav.setpos(min(int(start * rate), wav.getnframes()))
+        frames = wav.readframes(max(int((end - start) * rate), 0))
+    return np.frombuffer(frames, dtype=np.int16).astype(np.float32) / 32768.0
+
+
+def transcribe_chunk(audio_path, start, end, language):
+    """
+    Transcribe one chunk; timestamps are returned on the source timeline.
+    """
+    segments = _transcribe(load_audio_slice(audio_path, start, end), language)
+    return [
+        [start + s.get("start", 0), start + s.get("end", 0), s.get("text", "")]
+        for s in segments
+    ]
+
+
+def stitch_segments(chunks, chunk_segments):
+    """
+    Merge per-chunk segments. Inside an overlap, a segment belongs to the
+    chunk whose half of the overlap holds its midpoint, so every spoken
+    line is kept exactly once.
+    """
+    stitched = []
+    last = len(chunks) - 1
+    for i, ((start, end), segments) in enumerate(zip(chunks, chunk_segments)):
+        lower = float("-inf") if i == 0 else (chunks[i - 1][1] + start) / 2
+        upper = float("inf") if i == last else (end + chunks[i + 1][0]) / 2
+        for seg_start, seg_end, text in segments:
+            if lower <= (seg_start + seg_end) / 2 < upper:
+                stitched.append((seg_start, seg_end, text))
+    stitched.sort(key=lambda seg: seg[0])
+    return stitched
+
+
+class PooledTranscription:
+    """
+    Audio extraction and the chunk fan-out run on a background thread, so
+    the pipeline starts the HLS encode right away; running() and wait()
+    cover that phase as well as the chunks.
+    """
+
+    def __init__(self, *, job_id, input_path, subtitle_path, language, temp_dir):
+        self.job_id = job_id
+        self.subtitle_path = subtitle_path
+        self.audio_path = os.path.join(temp_dir, "audio.wav")
+        self.chunks = None
+        self.result = None
+        self.error = None
+
+        self._lock = threading.Lock()
+        self._cancelled = False
+        self._extract_proc = None
+        self._starter = threading.Thread(
+            target=self._start,
+            args=(input_path, language),
+            name=f"transcribe-start-{job_id}",
+            daemon=True,
+        )
+        self._starter.start()
+
+    def _start(self, input_path, language):
+        from celery import group
+        from api.tasks import transcribe_audio_chunk
+
+        def track(proc):
+            with self._lock:
+                self._extract_proc = proc
+                if self._cancelled:
+                    proc.kill()
+
+        try:
+            extract_audio(input_path, self.audio_path, on_start=track)
+            chunks = plan_chunks(
+                audio_duration(self.audio_path),
+                settings.WHISPER_CHUNK_SECONDS,
+                settings.WHISPER_CHUNK_OVERLAP,
+            )
+            with self._lock:
+                if self._cancelled:
+                    return
+                set_job(self.job_id, subtitle_chunks=len(chunks), subtitle_chunks_done=0)
+                self.chunks = chunks
+                self.result = group(
+                    transcribe_audio_chunk.s(
+                        job_id=self.job_id,
+                        audio_path=self.audio_path,
+                        start=start,
+                        end=end,
+                        language=language,
+                        total_chunks=len(chunks),
+                    )
+                    for start, end in chunks
+                ).apply_async()
+        except Exception as exc:
+            # reported by wait()
+            self.error = exc
+
+    def running(self):
+        if self._starter.is_alive():
+            return True
+        return self.result is not None and not self.result.ready()
+
+    def wait(self):
+        """
+        Block until done. Returns a warning string on failure, else None.
+        """
+        self._starter.join()
+        if self.error is not None:
+            return f"Subtitle generation unavailable: {self.error}"
+        if self.result is None:
+            return "Subtitle generation cancelled"
+        try:
+            # chunks run on the separate "transcribe" queue, so waiting here
+            # cannot starve the pool this task is running in
+            chunk_segments = self.result.get(
+                timeout=settings.WHISPER_POOL_TIMEOUT,
+                disable_sync_subtasks=False,
+            )
+        except Exception as exc:
+            self.cancel()
+            return f"Subtitle generation unavailable: {exc}"
+
+        write_vtt(self.subtitle_path, stitch_segments(self.chunks, chunk_segments))
+        return None
+
+    def cancel(self):
+        with self._lock:
+            self._cancelled = True
+            if self._extract_proc is not None and self._extract_proc.poll() is None:
+                self._extract_proc.kill()
+            result = self.result
+        if result is not None:
+            result.revoke()
+        self._starter.join()
+
+
+def start_transcription(**kwargs):
+    """
+    Start subtitles for a pipeline run; returns a handle with
+    running() / wait() / cancel().
+    """
+    if getattr(settings, "WHISPER_POOL_ENABLED", False):
+        return PooledTranscription(**kwargs)
+    return ProcessTranscription(**kwargs)
+
+
+def record_chunk_done(job_id, total_chunks):
+    done = incr_job(job_id, "subtitle_chunks_done")
+    set_job(job_id, subtitle_progress=min(int(done * 100 / max(total_chunks, 1)), 99))
@@ -53,12 +53,6 @@ urlpatterns = [
 ),
 
 
-path(
-    "courses/<int:course_id>/videos/<int:video_id>/duration/",
-    views.SaveVideoDurationAPIView.as_view(),
-    name="video-duration"
-),
-
     #update video progress and get video progress
 path(
     "courses/<int:course_id>/videos/<int:video_id>/progress/",
@@ -155,6 +149,12 @@ path(
     views.AttachmentDownloadAPIView.as_view(),
     name="attachment-download"
 ),
+
+path(
+    "courses/<int:course_id>/videos/<int:video_id>/stream/",
+    views.StreamVideoAPIView.as_view(),
+    name="video-stream"
+),
     # =========================
     # CERTIFICATES
     # =========================
@@ -214,9 +214,18 @@ path(
 
     
     path("admin-videos/presign/", views.R2PresignedUploadView.as_view()),
+    path("admin-videos/multipart/", views.R2MultipartUploadView.as_view()),
+    path("admin-videos/multipart/parts/", views.R2MultipartPartsView.as_view()),
+    path("admin-videos/multipart/complete/", views.R2MultipartCompleteView.as_view()),
+    path("admin-videos/multipart/abort/", views.R2MultipartAbortView.as_view()),
     path("admin-videos/create/", views.AdminVideoCreateView.as_view()),
     path("admin-videos/upload-zip/", views.AdminVideoUploadZipAPIView.as_view()),
     path("admin-videos/upload-progress/<str:job_id>/", views.AdminVideoUploadProgressAPIView.as_view()),
+    path("admin-videos/upload-progress/<uuid:job_id>/retry/", views.AdminVideoJobRetryAPIView.as_view()),
+    path("admin-videos/process-r2/", views.AdminVideoProcessR2APIView.as_view()),
+    path("admin-videos/upload-sessions/", views.AdminVideoUploadSessionCreateAPIView.as_view()),
+    path("admin-videos/upload-sessions/<uuid:upload_id>/", views.AdminVideoUploadSessionAPIView.as_view()),
+    path("admin-videos/upload-sessions/<uuid:upload_id>/finalize/", views.AdminVideoUploadSessionFinalizeAPIView.as_view()),
     path("contactus/",views.ContactUsCreateAPIView.as_view()),
     path("products/enquiry/", views.ProductEnquiryCreateAPIView.as_view()),
 
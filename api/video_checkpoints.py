@@ -0,0 +1,173 @@
+# api/video_checkpoints.py
+
+"""
+Per-phase checkpoints for video pipeline runs.
+
+A failed run keeps its work dir (VIDEO_WORK_DIR/jobs/<job_id>) so that a
+retry can pick up where it stopped instead of redoing Whisper and
+ffmpeg from scratch:
+
+    source      source present, hashed and probed (probe result kept)
+    transcript  VideoProject.vtt written
+    renditions  every rendition encoded and master.m3u8 written
+    uploaded    uploaded.txt: one R2 key per line, appended as uploads finish
+
+checkpoint.json holds the finished phases plus the task arguments, so
+the job can be re-queued from the work dir alone. The finished phases
+are mirrored into the job state (`checkpoints`) for the admin UI.
+Work dirs nobody resumes are removed by gc_work_dirs().
+"""
+
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+
+from django.conf import settings
+
+from api.video_jobs import get_job, set_job
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_FILE = "checkpoint.json"
+UPLOADED_FILE = "uploaded.txt"
+
+
+class PipelineCheckpoint:
+    def __init__(self, temp_dir, job_id):
+        self.temp_dir = temp_dir
+        self.job_id = job_id
+        self.path = os.path.join(temp_dir, CHECKPOINT_FILE)
+        self.uploaded_path = os.path.join(temp_dir, UPLOADED_FILE)
+        self._lock = threading.Lock()
+        self.state = load_checkpoint(temp_dir) or {"task": {}, "phases": {}}
+
+    @property
+    def phases(self):
+        return self.state["phases"]
+
+    def done(self, phase):
+        return phase in self.phases
+
+    def get(self, phase, default=None):
+        return self.phases.get(phase, default)
+
+    def _save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        # a crash mid-write leaves the previous checkpoint intact
+        os.replace(tmp_path, self.path)
+
+    def save_task(self, **task):
+        self.state["task"] = task
+        self._save()
+
+    def complete(self, phase, **data):
+        self.phases[phase] = data
+        self._save()
+        set_job(self.job_id, checkpoints=sorted(self.phases))
+
+    def reset(self, *phases):
+        for phase in phases:
+            self.phases.pop(phase, None)
+        self._save()
+        set_job(self.job_id, checkpoints=sorted(self.phases))
+
+    def uploaded_keys(self):
+        try:
+            with open(self.uploaded_path, encoding="utf-8") as f:
+                return {line.strip() for line in f if line.strip()}
+        except FileNotFoundError:
+            return set()
+
+    def record_upload(self, key):
+        # called from upload pool threads
+        with self._lock:
+            with open(self.uploaded_path, "a", encoding="utf-8") as f:
+                f.write(f"{key}\n")
+
+    def reset_uploads(self):
+        with self._lock:
+            if os.path.exists(self.uploaded_path):
+                os.remove(self.uploaded_path)
+
+
+def load_checkpoint(temp_dir):
+    try:
+        with open(os.path.join(temp_dir, CHECKPOINT_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _is_uuid(value):
+    try:
+        uuid.UUID(value)
+    except ValueError:
+        return False
+    return True
+
+
+def _last_modified(path):
+    """
+    Newest mtime of `path` and everything below it.
+    """
+    newest = os.path.getmtime(path)
+    for root, dirs, files in os.walk(path):
+        for name in dirs + files:
+            try:
+                newest = max(newest, os.path.getmtime(os.path.join(root, name)))
+            except FileNotFoundError:
+                pass
+    return newest
+
+
+def gc_work_dirs(max_age=None, dry_run=False, now=None):
+    """
+    Remove job and upload-session dirs under VIDEO_WORK_DIR that have not
+    been touched for `max_age` seconds (VIDEO_WORK_DIR_MAX_AGE). Jobs
+    still marked processing are kept, and open upload sessions whose
+    dir goes are marked aborted. Returns [(path, bytes), ...] removed.
+    """
+    from api.models import VideoUploadSession
+
+    max_age = settings.VIDEO_WORK_DIR_MAX_AGE if max_age is None else max_age
+    cutoff = (now or time.time()) - max_age
+    removed = []
+
+    for kind in ("jobs", "uploads"):
+        parent = os.path.join(settings.VIDEO_WORK_DIR, kind)
+        if not os.path.isdir(parent):
+            continue
+        for entry in os.scandir(parent):
+            if not entry.is_dir(follow_symlinks=False):
+                continue
+            try:
+                if _last_modified(entry.path) > cutoff:
+                    continue
+            except FileNotFoundError:
+                continue
+            if kind == "jobs" and (get_job(entry.name) or {}).get("status") == "processing":
+                continue
+
+            size = sum(
+                os.path.getsize(os.path.join(root, name))
+                for root, _, files in os.walk(entry.path)
+                for name in files
+            )
+            removed.append((entry.path, size))
+            if dry_run:
+                continue
+
+            shutil.rmtree(entry.path, ignore_errors=True)
+            if kind == "uploads" and _is_uuid(entry.name):
+                VideoUploadSession.objects.filter(id=entry.name, status="open").update(status="aborted")
+            logger.info("Removed stale work dir %s (%s bytes)", entry.path, size)
+
+    return removed
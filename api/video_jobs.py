@@ -0,0 +1,104 @@
+# api/video_jobs.py
+
+"""
+Shared state for video processing jobs.
+
+Job progress lives in Redis (one hash per job), so any web worker can
+answer a progress poll and the state survives worker restarts. The
+host-level slot lock caps how many ffmpeg/whisper pipelines run at
+once on one machine, whatever the Celery worker layout is.
+"""
+
+import fcntl
+import json
+import logging
+import os
+
+from django.conf import settings
+
+from api.redis_store import get_redis
+
+logger = logging.getLogger(__name__)
+
+JOB_KEY = "video_job:{job_id}"
+
+
+def set_job(job_id, **updates):
+    key = JOB_KEY.format(job_id=job_id)
+    client = get_redis()
+    pipe = client.pipeline()
+    pipe.hset(key, mapping={field: json.dumps(value) for field, value in updates.items()})
+    pipe.expire(key, getattr(settings, "VIDEO_JOB_TTL", 7 * 24 * 60 * 60))
+    pipe.execute()
+
+
+def incr_job(job_id, field, amount=1):
+    """
+    Atomic counter inside a job (values are JSON, and JSON ints are
+    plain digits, so HINCRBY works on them).
+    """
+    return get_redis().hincrby(JOB_KEY.format(job_id=job_id), field, amount)
+
+
+def get_job(job_id):
+    raw = get_redis().hgetall(JOB_KEY.format(job_id=job_id))
+    if not raw:
+        return None
+    return {field: json.loads(value) for field, value in raw.items()}
+
+
+def job_work_dir(job_id):
+    """
+    Per-job working directory under VIDEO_WORK_DIR. The directory must be
+    visible to both the web process (which writes the upload) and the
+    video workers.
+    """
+    path = os.path.join(settings.VIDEO_WORK_DIR, "jobs", job_id)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+class VideoSlot:
+    """
+    One of VIDEO_MAX_CONCURRENT_JOBS host-wide slots, held as an flock on
+    a file under VIDEO_WORK_DIR/slots. The kernel drops the lock if the
+    worker dies, so a crashed job never leaks its slot.
+    """
+
+    def __init__(self, fd, number):
+        self._fd = fd
+        self.number = number
+
+    def release(self):
+        if self._fd is None:
+            return
+        try:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+def acquire_video_slot():
+    """
+    Return a held VideoSlot, or None when every slot is busy.
+    """
+    slot_dir = os.path.join(settings.VIDEO_WORK_DIR, "slots")
+    os.makedirs(slot_dir, exist_ok=True)
+
+    for number in range(getattr(settings, "VIDEO_MAX_CONCURRENT_JOBS", 1)):
+        fd = os.open(os.path.join(slot_dir, f"slot-{number}.lock"), os.O_CREAT | os.O_RDWR, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            continue
+        return VideoSlot(fd, number)
+
+    return None
@@ -0,0 +1,603 @@
+# api/video_pipeline.py
+
+"""
+Admin video processing pipeline: Whisper subtitles → ffmpeg HLS ladder →
+upload to R2. Runs inside the Celery "video" queue (api.tasks), with job
+progress published through api.video_jobs.
+"""
+
+import logging
+import os
+import shutil
+import socket
+import subprocess
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+from api.hls_ladder import (
+    build_hls_command,
+    build_ladder,
+    build_rendition_commands,
+    probe_source,
+    write_master_playlist,
+)
+from api.models import Video, VideoEncodeMetric
+from api.r2 import IncrementalFolderUploader, download_r2_object, upload_files_parallel
+from api.transcription import start_transcription
+from api.video_checkpoints import PipelineCheckpoint
+from api.video_jobs import set_job
+from api.video_uploads import sha256_file
+
+logger = logging.getLogger(__name__)
+
+
+class SourceChecksumError(Exception):
+    """
+    The source does not match the sha256 the client sent. Not resumable:
+    the work dir is dropped and the video has to be uploaded again.
+    """
+
+
+# per worker process
+_ffmpeg_nvenc_available = None
+
+
+def has_ffmpeg_nvenc():
+    global _ffmpeg_nvenc_available
+    if _ffmpeg_nvenc_available is not None:
+        return _ffmpeg_nvenc_available
+    try:
+        res = subprocess.run(
+            ["ffmpeg", "-hide_banner", "-encoders"],
+            capture_output=True,
+            text=True,
+            check=False,
+        )
+        output = f"{res.stdout}\n{res.stderr}"
+        _ffmpeg_nvenc_available = "h264_nvenc" in output
+    except Exception:
+        _ffmpeg_nvenc_available = False
+    return _ffmpeg_nvenc_available
+
+
+def _parse_speed(value):
+    try:
+        return float((value or "").strip().rstrip("x"))
+    except ValueError:
+        return 0.0
+
+
+def run_ffmpeg(cmd, *, duration, on_progress=None, report_interval=1.0):
+    """
+    Run ffmpeg with `-progress pipe:1` and parse it as it streams.
+
+    on_progress(processed_seconds, speed, eta_seconds) is called at most
+    every `report_interval` seconds. stderr is drained on a thread and
+    only its tail is kept. Returns (returncode, stderr_tail, stats).
+    """
+    cmd = [cmd[0], "-progress", "pipe:1", "-nostats", *cmd[1:]]
+    proc = subprocess.Popen(
+        cmd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        bufsize=1,
+    )
+
+    stderr_tail = deque(maxlen=50)
+    drain = threading.Thread(
+        target=lambda: stderr_tail.extend(proc.stderr), daemon=True
+    )
+    drain.start()
+
+    started = time.monotonic()
+    last_report = 0.0
+    snapshot = {}
+    stats = {"processed_seconds": 0.0, "speed": 0.0}
+
+    for line in proc.stdout:
+        key, _, value = line.strip().partition("=")
+        if key != "progress":
+            snapshot[key] = value
+            continue
+
+        # one progress block complete
+        try:
+            # out_time_us (out_time_ms is also microseconds)
+            processed = int(snapshot.get("out_time_us") or snapshot.get("out_time_ms") or 0) / 1_000_000
+        except ValueError:
+            processed = stats["processed_seconds"]
+        processed = max(processed, 0.0)
+        # "speed=N/A" can show up mid-run; keep the last known value
+        speed = _parse_speed(snapshot.get("speed")) or stats["speed"]
+        stats.update(processed_seconds=processed, speed=speed)
+
+        now = time.monotonic()
+        if on_progress and (value == "end" or now - last_report >= report_interval):
+            last_report = now
+            eta = (duration - processed) / speed if speed > 0 and duration else None
+            on_progress(processed, speed, max(eta, 0.0) if eta is not None else None)
+
+    returncode = proc.wait()
+    drain.join(timeout=5)
+    stats["wall_seconds"] = time.monotonic() - started
+    return returncode, "".join(stderr_tail), stats
+
+
+def run_ffmpeg_parallel(commands, *, duration, on_progress=None, report_interval=1.0):
+    """
+    Run [(name, cmd), ...] side by side. on_progress gets the numbers of
+    the rendition that is furthest behind. Returns
+    [(name, cmd, returncode, stderr_tail, stats), ...].
+    """
+    latest = {name: (0.0, 0.0, None) for name, _ in commands}
+    lock = threading.Lock()
+
+    def progress_for(name):
+        def report(processed, speed, eta):
+            with lock:
+                latest[name] = (processed, speed, eta)
+                slowest = min(latest.values(), key=lambda item: item[0])
+            on_progress(*slowest)
+        return report
+
+    with ThreadPoolExecutor(max_workers=max(len(commands), 1)) as pool:
+        futures = [
+            pool.submit(
+                run_ffmpeg,
+                cmd,
+                duration=duration,
+                on_progress=progress_for(name) if on_progress else None,
+                report_interval=report_interval,
+            )
+            for name, cmd in commands
+        ]
+        return [
+            (name, cmd, *future.result())
+            for (name, cmd), future in zip(commands, futures)
+        ]
+
+
+def choose_encode_mode(encoder, ladder):
+    """
+    VIDEO_ENCODE_MODE: "single" (one ffmpeg for the whole ladder),
+    "per_rendition" (one ffmpeg per rendition) or "auto". Auto only splits
+    libx264 work: NVENC sessions per GPU are limited and already fast.
+    """
+    mode = getattr(settings, "VIDEO_ENCODE_MODE", "auto")
+    if mode == "auto":
+        return "per_rendition" if encoder == "libx264" and len(ladder) > 1 else "single"
+    return mode
+
+
+def build_encode_commands(*, mode, input_path, hls_root, source, ladder, encoder, hls_flags):
+    """
+    [(name, cmd), ...] for the chosen mode. FFMPEG_THREADS is a budget for
+    the whole encode, shared between the processes in per-rendition mode.
+    """
+    threads = getattr(settings, "FFMPEG_THREADS", 0)
+    options = dict(
+        input_path=input_path,
+        hls_root=hls_root,
+        source=source,
+        ladder=ladder,
+        encoder=encoder,
+        hls_flags=hls_flags,
+    )
+
+    if mode == "per_rendition":
+        threads = max(threads // len(ladder), 1) if threads else 0
+        thread_args = ["-threads", str(threads)] if threads else []
+        return build_rendition_commands(extra_output_args=thread_args, **options)
+
+    thread_args = ["-threads", str(threads), "-filter_threads", str(threads)] if threads else []
+    names = "+".join(rung["name"] for rung in ladder)
+    return [(names, build_hls_command(extra_output_args=thread_args, **options))]
+
+
+def _cmd_option(cmd, option, default=""):
+    try:
+        return cmd[cmd.index(option) + 1]
+    except (ValueError, IndexError):
+        return default
+
+
+def record_encode_metric(*, job_id, video_id, cmd, encoder, duration, stats, succeeded, renditions=None):
+    wall = stats.get("wall_seconds") or 0.0
+    processed = stats.get("processed_seconds") or 0.0
+    try:
+        VideoEncodeMetric.objects.create(
+            video_id=video_id,
+            job_id=job_id,
+            host=socket.gethostname(),
+            encoder=encoder,
+            preset=_cmd_option(cmd, "-preset", "default"),
+            renditions=renditions or _cmd_option(cmd, "-var_stream_map"),
+            source_seconds=duration,
+            processed_seconds=processed,
+            wall_seconds=wall,
+            speed=(processed / wall) if wall else 0.0,
+            succeeded=succeeded,
+        )
+    except Exception as exc:
+        logger.warning("[job:%s] Could not record encode metric: %s", job_id, exc)
+
+
+def media_info(source):
+    """
+    Video model fields from a probe_source() result.
+    """
+    return {
+        "duration": int(round(source["duration"])) or None,
+        "width": source["width"] or None,
+        "height": source["height"] or None,
+        "frame_rate": source["fps"] or None,
+        "video_codec": source["video_codec"],
+        "audio_codec": source["audio_codec"],
+        "bitrate": source["bitrate"] or None,
+    }
+
+
+def find_processed_duplicate(video):
+    """
+    An earlier ready Video with the same source bytes and subtitle
+    language, whose HLS prefix (playlists, segments and VTT) can be
+    shared instead of re-encoding.
+    """
+    if not video.source_sha256 or not getattr(settings, "VIDEO_DEDUPE_ENABLED", True):
+        return None
+    if not video.subtitle_language:
+        return None
+    return (
+        Video.objects
+        .filter(
+            source_sha256=video.source_sha256,
+            # the shared prefix holds one VTT, in the original's language
+            subtitle_language=video.subtitle_language,
+            status="ready",
+        )
+        .exclude(pk=video.pk)
+        .exclude(video_url__isnull=True)
+        .exclude(video_url="")
+        .order_by("created_at")
+        .first()
+    )
+
+
+def run_pipeline(*, job_id, video_id, course_id, lesson_key, input_path, temp_dir, language,
+                 source_key=None, expected_sha256=""):
+    hls_root = os.path.join(temp_dir, "hls")
+    os.makedirs(hls_root, exist_ok=True)
+    base_r2_path = f"videos/course-{course_id}/{lesson_key}/hls"
+    transcription = None
+    succeeded = False
+    checksum_failed = False
+
+    # A failed run leaves its work dir behind; pick up after the last
+    # finished phase instead of starting over.
+    checkpoint = PipelineCheckpoint(temp_dir, job_id)
+    checkpoint.save_task(
+        job_id=job_id,
+        video_id=video_id,
+        course_id=course_id,
+        lesson_key=lesson_key,
+        input_path=input_path,
+        temp_dir=temp_dir,
+        language=language,
+        source_key=source_key,
+        expected_sha256=expected_sha256,
+    )
+    if checkpoint.phases:
+        logger.info("[job:%s] Resuming after: %s", job_id, ", ".join(sorted(checkpoint.phases)))
+        set_job(job_id, resumed_after=sorted(checkpoint.phases))
+
+    try:
+        video = Video.objects.get(id=video_id)
+        if video.status == "ready":
+            # a redelivered copy of a job that already finished
+            logger.warning("[job:%s] Video %s is already ready; nothing to do", job_id, video_id)
+            succeeded = True
+            return
+
+        if checkpoint.done("source"):
+            source = checkpoint.get("source")["probe"]
+        else:
+            if source_key and not os.path.exists(input_path):
+                # uploaded straight to R2 (multipart); nothing local yet
+                set_job(job_id, phase="download", message="Fetching source from R2...")
+                download_r2_object(source_key, input_path)
+
+            if not video.source_sha256:
+                set_job(job_id, phase="hash", message="Checking for an identical upload...")
+                digest = sha256_file(input_path)
+                if expected_sha256 and digest != expected_sha256:
+                    # the stored bytes are not what the client has
+                    raise SourceChecksumError("Checksum mismatch; upload the video again")
+                video.source_sha256 = digest
+                video.save(update_fields=["source_sha256"])
+
+            # duration etc. come from the file itself, not from the player
+            source = probe_source(input_path)
+            info = media_info(source)
+            for field, value in info.items():
+                setattr(video, field, value)
+            video.save(update_fields=list(info))
+            checkpoint.complete("source", probe=source)
+
+        if video.subtitle_language != language:
+            video.subtitle_language = language
+            video.save(update_fields=["subtitle_language"])
+
+        # Same bytes already processed (e.g. a lecture re-used in another
+        # course)? Point this Video at the existing output.
+        original = find_processed_duplicate(video)
+        if original is not None:
+            logger.info("[job:%s] Source matches video %s; reusing its HLS output", job_id, original.id)
+            video.video_url = original.video_url
+            video.status = "ready"
+            video.save(update_fields=["video_url", "status"])
+            set_job(
+                job_id,
+                status="completed",
+                phase="done",
+                message=f"Identical to video {original.id}; reused its HLS output and subtitles.",
+                subtitle_progress=100,
+                hls_progress=100,
+                cloudflare_progress=100,
+                playlist_url=original.video_url,
+                subtitle="VideoProject.vtt",
+                reused_from=original.id,
+            )
+            succeeded = True
+            return
+
+        # Subtitles (separate process) and HLS encoding run side by side
+        set_job(
+            job_id,
+            phase="hls",
+            subtitle_progress=1,
+            hls_progress=1,
+            message="Generating subtitles and converting to HLS...",
+        )
+        subtitle_path = os.path.join(hls_root, "VideoProject.vtt")
+        subtitle_warning = None
+        if checkpoint.done("transcript"):
+            subtitle_warning = checkpoint.get("transcript").get("warning")
+        else:
+            try:
+                transcription = start_transcription(
+                    job_id=job_id,
+                    input_path=input_path,
+                    subtitle_path=subtitle_path,
+                    language=language,
+                    temp_dir=temp_dir,
+                )
+            except Exception as subtitle_err:
+                logger.warning("[job:%s] Subtitle generation unavailable: %s", job_id, subtitle_err)
+                subtitle_warning = f"Subtitle generation unavailable: {subtitle_err}"
+
+        overlap_upload = getattr(settings, "VIDEO_OVERLAP_UPLOAD", True)
+        encode_done = threading.Event()
+        last_reported = {"progress": 1}
+
+        def report_upload(done, total, r2_key):
+            checkpoint.record_upload(r2_key)
+            if not encode_done.is_set():
+                # total is still growing while ffmpeg runs
+                if done % 50 == 0:
+                    set_job(job_id, uploaded_files=done)
+                return
+            progress = int((done / max(total, 1)) * 100)
+            if progress != last_reported["progress"]:
+                last_reported["progress"] = progress
+                set_job(job_id, cloudflare_progress=progress, uploaded_files=done)
+                logger.info("[job:%s] cloudflare_progress=%s file=%s", job_id, progress, r2_key)
+
+        def start_segment_uploader():
+            if not overlap_upload:
+                return None
+            return IncrementalFolderUploader(
+                hls_root,
+                base_r2_path,
+                is_ready=lambda relative_path: relative_path.endswith(".ts"),
+                on_progress=report_upload,
+            ).start()
+
+        use_nvenc = has_ffmpeg_nvenc()
+        logger.info("[job:%s] FFmpeg NVENC available: %s", job_id, use_nvenc)
+
+        ladder = build_ladder(source)
+        source_duration = source["duration"]
+        logger.info(
+            "[job:%s] source %sx%s@%s audio=%s → ladder %s",
+            job_id, source["width"], source["height"], source["fps"], source["has_audio"],
+            ",".join(rung["name"] for rung in ladder),
+        )
+
+        # temp_file: a segment only appears under its .ts name once complete
+        hls_flags = "independent_segments+temp_file" if overlap_upload else "independent_segments"
+
+        def report_encode(processed, speed, eta):
+            progress = int((processed / source_duration) * 100) if source_duration else 1
+            set_job(
+                job_id,
+                hls_progress=min(max(progress, 1), 99),
+                encode_processed_seconds=round(processed, 1),
+                encode_speed=round(speed, 2),
+                encode_eta_seconds=round(eta) if eta is not None else None,
+            )
+
+        def encode(encoder):
+            mode = choose_encode_mode(encoder, ladder)
+            commands = build_encode_commands(
+                mode=mode,
+                input_path=input_path,
+                hls_root=hls_root,
+                source=source,
+                ladder=ladder,
+                encoder=encoder,
+                hls_flags=hls_flags,
+            )
+            started = time.monotonic()
+            runs = run_ffmpeg_parallel(commands, duration=source_duration, on_progress=report_encode)
+
+            failed = None
+            for name, cmd, returncode, stderr_tail, stats in runs:
+                record_encode_metric(
+                    job_id=job_id,
+                    video_id=video_id,
+                    cmd=cmd,
+                    encoder=encoder,
+                    duration=source_duration,
+                    stats=stats,
+                    succeeded=returncode == 0,
+                    renditions=name if mode == "per_rendition" else None,
+                )
+                if returncode != 0:
+                    logger.warning("[job:%s] ffmpeg %s failed rc=%s", job_id, name, returncode)
+                    failed = failed or (returncode, stderr_tail)
+            logger.info(
+                "[job:%s] ffmpeg %s mode=%s processes=%s ok=%s wall=%.1fs",
+                job_id, encoder, mode, len(runs), failed is None, time.monotonic() - started,
+            )
+            return failed or (0, "")
+
+        uploader = None
+        try:
+            if checkpoint.done("renditions"):
+                logger.info("[job:%s] Renditions already encoded; skipping ffmpeg", job_id)
+                set_job(job_id, hls_progress=100, encode_eta_seconds=0)
+            else:
+                # a new encode rewrites every segment, uploaded or not
+                checkpoint.reset_uploads()
+                # Segments are uploaded while ffmpeg is still encoding
+                uploader = start_segment_uploader()
+                returncode, stderr_tail = encode("h264_nvenc" if use_nvenc else "libx264")
+                if returncode != 0 and use_nvenc:
+                    logger.warning("[job:%s] NVENC failed; retrying with libx264", job_id)
+                    if uploader:
+                        uploader.abort()
+                    checkpoint.reset_uploads()
+                    uploader = start_segment_uploader()
+                    returncode, stderr_tail = encode("libx264")
+
+                if returncode != 0:
+                    raise RuntimeError(f"FFmpeg conversion failed: {stderr_tail[-400:]}")
+
+                set_job(job_id, hls_progress=100, encode_eta_seconds=0)
+                logger.info("[job:%s] hls_progress=100", job_id)
+
+                write_master_playlist(hls_root, source, ladder)
+                checkpoint.complete("renditions", ladder=[rung["name"] for rung in ladder])
+
+            # the VTT is published with the playlists, so wait for it here
+            if not checkpoint.done("transcript"):
+                if transcription is not None:
+                    if transcription.running():
+                        set_job(job_id, message="Waiting for subtitles...")
+                    subtitle_warning = transcription.wait()
+                    transcription = None
+                if subtitle_warning:
+                    logger.warning("[job:%s] %s", job_id, subtitle_warning)
+                    if not os.path.exists(subtitle_path):
+                        with open(subtitle_path, "w", encoding="utf-8") as vtt:
+                            vtt.write("WEBVTT\n\n")
+                checkpoint.complete("transcript", warning=subtitle_warning)
+            set_job(job_id, subtitle_progress=100)
+
+            set_job(job_id, phase="cloudflare", cloudflare_progress=1, message="Uploading to Cloudflare R2...")
+            encode_done.set()
+
+            if uploader:
+                # remaining segments, then playlists with master.m3u8 last
+                uploader.finish()
+                uploader = None
+            else:
+                # no overlap, or a resumed run: only what is not in R2 yet
+                uploaded = checkpoint.uploaded_keys()
+                segments, playlists, master = [], [], []
+                for root, _, files in os.walk(hls_root):
+                    for file in files:
+                        local_path = os.path.join(root, file)
+                        relative_path = os.path.relpath(local_path, hls_root).replace("\\", "/")
+                        r2_key = f"{base_r2_path}/{relative_path}"
+                        if r2_key in uploaded:
+                            continue
+                        if relative_path == "master.m3u8":
+                            master.append((local_path, r2_key))
+                        elif relative_path.endswith(".m3u8"):
+                            playlists.append((local_path, r2_key))
+                        else:
+                            segments.append((local_path, r2_key))
+
+                total = len(segments) + len(playlists) + len(master)
+                if uploaded:
+                    logger.info(
+                        "[job:%s] %s file(s) already in R2; uploading %s",
+                        job_id, len(uploaded), total,
+                    )
+
+                # same publish order as the overlapped uploader: a playlist
+                # never lists a segment that is not in R2 yet
+                offset = 0
+                for batch in (segments, playlists, master):
+                    def report_batch(done, _total, r2_key, offset=offset):
+                        report_upload(offset + done, total, r2_key)
+
+                    offset += upload_files_parallel(batch, on_progress=report_batch)
+        finally:
+            if uploader:
+                uploader.abort()
+
+        set_job(job_id, cloudflare_progress=100)
+
+        playlist_url = (
+            f"{settings.R2_PUBLIC_BASE_URL}/"
+            f"videos/course-{course_id}/{lesson_key}/hls/master.m3u8"
+        )
+
+        video = Video.objects.get(id=video_id)
+        video.video_url = playlist_url
+        video.status = "ready"
+        video.save(update_fields=["video_url", "status"])
+
+        result = {
+            "status": "completed",
+            "phase": "done",
+            "message": "Completed successfully.",
+            "subtitle_progress": 100,
+            "hls_progress": 100,
+            "cloudflare_progress": 100,
+            "playlist_url": playlist_url,
+            "subtitle": "VideoProject.vtt",
+        }
+        if subtitle_warning:
+            result["subtitle_warning"] = subtitle_warning
+        set_job(job_id, **result)
+        succeeded = True
+    except Exception as e:
+        logger.exception("[job:%s] Video pipeline failed", job_id)
+        checksum_failed = isinstance(e, SourceChecksumError)
+        try:
+            # never downgrade a video another run already finished
+            Video.objects.filter(id=video_id).exclude(status="ready").update(status="failed")
+        except Exception:
+            pass
+        set_job(
+            job_id,
+            status="failed",
+            phase="failed",
+            message=str(e),
+            error=str(e),
+            # the work dir is kept; a retry resumes from checkpoints
+            resumable=not checksum_failed,
+        )
+    finally:
+        if transcription is not None:
+            transcription.cancel()
+        if succeeded or checksum_failed:
+            shutil.rmtree(temp_dir, ignore_errors=True)
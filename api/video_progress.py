@@ -0,0 +1,312 @@
+# api/video_progress.py
+
+"""
+Write-behind buffer for video progress heartbeats.
+
+With VIDEO_PROGRESS_WRITE_BEHIND on, UpdateVideoProgressAPIView.post only
+records the furthest position per (user, course, video) in a Redis hash
+and returns. flush_pending_progress() (Celery beat, every
+VIDEO_PROGRESS_FLUSH_INTERVAL seconds) swaps the hash out and applies it
+to StudentVideoProgress in bulk.
+
+Positions are max-merged on both sides, so re-applying a batch is safe.
+A completion crossing (the 90% rule) is claimed with a conditional
+UPDATE ... WHERE is_completed = false; only the flush that wins it runs
+complete_module(), so unlock side effects happen exactly once.
+
+A batch that fails VIDEO_PROGRESS_FLUSH_ATTEMPTS times in a row is
+applied entry by entry; entries that still fail are parked in
+DEAD_LETTER_KEY so they cannot block later flushes.
+"""
+
+import logging
+
+import redis
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from api.models import CourseModuleItem, StudentVideoProgress, Video
+from api.progression import complete_module
+from api.redis_store import get_redis
+
+logger = logging.getLogger(__name__)
+
+PENDING_KEY = "video_progress:pending"
+FLUSHING_KEY = "video_progress:flushing"
+FLUSH_LOCK_KEY = "video_progress:flush_lock"
+FLUSH_FAILURES_KEY = "video_progress:flush_failures"
+DEAD_LETTER_KEY = "video_progress:dead_letter"
+DEAD_LETTER_TTL = 7 * 24 * 60 * 60
+TARGET_CACHE_KEY = "video_progress:target:v1:{course_id}:{video_id}"
+
+COMPLETION_PERCENT = 90
+
+# HSET only if the new position is further than the buffered one.
+_MAX_MERGE_LUA = """
+local current = tonumber(redis.call('HGET', KEYS[1], ARGV[1]) or '-1')
+local position = tonumber(ARGV[2])
+if position > current then
+    redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+    return position
+end
+return current
+"""
+
+_max_merge = None
+
+
+def _field(user_id, course_id, video_id):
+    return f"{user_id}:{course_id}:{video_id}"
+
+
+def buffer_heartbeat(user_id, course_id, video_id, position):
+    """
+    Record a heartbeat. Returns the furthest buffered position.
+    """
+    global _max_merge
+    client = get_redis()
+    if _max_merge is None:
+        _max_merge = client.register_script(_MAX_MERGE_LUA)
+    return int(_max_merge(
+        keys=[PENDING_KEY],
+        args=[_field(user_id, course_id, video_id), max(int(position), 0)],
+    ))
+
+
+def pending_position(user_id, course_id, video_id):
+    """
+    Furthest position not yet flushed to the DB, or None.
+    """
+    field = _field(user_id, course_id, video_id)
+    try:
+        client = get_redis()
+        values = [client.hget(PENDING_KEY, field), client.hget(FLUSHING_KEY, field)]
+    except redis.RedisError as exc:
+        logger.warning("Video progress buffer read failed: %s", exc)
+        return None
+
+    positions = [int(v) for v in values if v is not None]
+    return max(positions) if positions else None
+
+
+def get_progress_target(course, video_id, resolve_video):
+    """
+    Cached (video id, module id, duration) for a heartbeat URL, or None
+    when the video is not part of the course. `resolve_video` is the
+    view's resolve_video_for_requested_course. A target whose duration
+    is still unknown (0) is not cached, so the duration shows up as soon
+    as it is set.
+    """
+    key = TARGET_CACHE_KEY.format(course_id=course.id, video_id=video_id)
+    target = cache.get(key)
+    if target is not None:
+        return target or None
+
+    target = {}
+    video = resolve_video(course, video_id)
+    if video:
+        module_id = CourseModuleItem.objects.filter(
+            course=course, video=video, item_type="video"
+        ).values_list("id", flat=True).first()
+        if module_id:
+            target = {
+                "video_id": video.id,
+                "module_id": module_id,
+                "duration": video.duration or 0,
+            }
+
+    if not target or target["duration"]:
+        cache.set(key, target, getattr(settings, "VIDEO_PROGRESS_TARGET_TTL", 300))
+    return target or None
+
+
+def flush_pending_progress():
+    """
+    Apply buffered heartbeats to the DB. Returns the number of entries
+    applied. A batch left behind by a failed flush is retried first.
+    """
+    client = get_redis()
+    lock = client.lock(FLUSH_LOCK_KEY, timeout=120)
+    if not lock.acquire(blocking=False):
+        return 0
+
+    try:
+        if not client.exists(FLUSHING_KEY):
+            try:
+                client.rename(PENDING_KEY, FLUSHING_KEY)
+            except redis.ResponseError:
+                # nothing buffered
+                return 0
+
+        entries = client.hgetall(FLUSHING_KEY)
+        try:
+            applied = apply_progress_batch(entries)
+        except Exception:
+            failures = client.incr(FLUSH_FAILURES_KEY)
+            if failures < getattr(settings, "VIDEO_PROGRESS_FLUSH_ATTEMPTS", 3):
+                # kept in FLUSHING_KEY; the next flush retries it first
+                raise
+            logger.exception("Video progress batch failed %s times; applying entry by entry", failures)
+            applied = _apply_entries_one_by_one(client, entries)
+
+        client.delete(FLUSHING_KEY, FLUSH_FAILURES_KEY)
+        return applied
+    finally:
+        try:
+            lock.release()
+        except redis.exceptions.LockError:
+            pass
+
+
+def _apply_entries_one_by_one(client, entries):
+    """
+    Apply a batch that keeps failing one entry at a time. Entries that
+    still fail go to DEAD_LETTER_KEY. Returns the number applied.
+    """
+    applied = 0
+    dead = {}
+    for field, value in entries.items():
+        try:
+            applied += apply_progress_batch({field: value})
+        except Exception:
+            logger.exception("Video progress entry %r=%r failed; moved to %s", field, value, DEAD_LETTER_KEY)
+            dead[field] = value
+    if dead:
+        pipe = client.pipeline()
+        pipe.hset(DEAD_LETTER_KEY, mapping=dead)
+        pipe.expire(DEAD_LETTER_KEY, DEAD_LETTER_TTL)
+        pipe.execute()
+    return applied
+
+
+def apply_progress_batch(entries):
+    """
+    `entries` maps "user:course:video" → position (as stored in Redis).
+    """
+    positions = {}
+    for field, value in entries.items():
+        try:
+            user_id, course_id, video_id = (int(part) for part in field.split(":"))
+            position = int(value)
+        except (TypeError, ValueError):
+            logger.warning("Skipping bad video progress entry %r=%r", field, value)
+            continue
+        positions[(user_id, course_id, video_id)] = position
+
+    items = list(positions.items())
+    batch_size = getattr(settings, "VIDEO_PROGRESS_FLUSH_BATCH", 500)
+    for start in range(0, len(items), batch_size):
+        _apply_chunk(dict(items[start:start + batch_size]))
+
+    return len(items)
+
+
+def _apply_chunk(positions):
+    video_ids = {video_id for _, _, video_id in positions}
+    user_ids = {user_id for user_id, _, _ in positions}
+
+    durations = dict(
+        Video.objects.filter(id__in=video_ids).values_list("id", "duration")
+    )
+
+    # StudentVideoProgress is per (user, video); keep the furthest position
+    # and the course it came from (needed to find the module on completion).
+    targets = {}
+    for (user_id, course_id, video_id), position in positions.items():
+        if video_id not in durations or not durations[video_id]:
+            # heartbeats are only buffered once the duration is known
+            continue
+        capped = min(position, durations[video_id])
+        key = (user_id, video_id)
+        if key not in targets or capped > targets[key][0]:
+            targets[key] = (capped, course_id)
+
+    if not targets:
+        return
+
+    def load_rows():
+        return {
+            (row.user_id, row.video_id): row
+            for row in StudentVideoProgress.objects.select_for_update().filter(
+                user_id__in=user_ids, video_id__in=video_ids
+            )
+            if (row.user_id, row.video_id) in targets
+        }
+
+    with transaction.atomic():
+        rows = load_rows()
+        missing = [key for key in targets if key not in rows]
+        if missing:
+            StudentVideoProgress.objects.bulk_create(
+                [
+                    StudentVideoProgress(user_id=user_id, video_id=video_id)
+                    for user_id, video_id in missing
+                ],
+                ignore_conflicts=True,
+            )
+            rows = load_rows()
+
+        changed = []
+        for key, row in rows.items():
+            capped = targets[key][0]
+            watched = max(row.watched_seconds or 0, capped)
+            last = max(row.last_position or 0, capped)
+            if watched != row.watched_seconds or last != row.last_position:
+                row.watched_seconds = watched
+                row.last_position = last
+                changed.append(row)
+
+        if changed:
+            StudentVideoProgress.objects.bulk_update(
+                changed, ["watched_seconds", "last_position"]
+            )
+
+    crossings = []
+    for key, row in rows.items():
+        duration = durations[row.video_id] or 0
+        if row.is_completed or not duration:
+            continue
+        if (row.watched_seconds / duration) * 100 >= COMPLETION_PERCENT:
+            crossings.append((row, targets[key][1], duration))
+
+    if crossings:
+        _apply_completions(crossings)
+
+
+def _apply_completions(crossings):
+    users = get_user_model().objects.in_bulk({row.user_id for row, _, _ in crossings})
+    modules = {
+        (module.course_id, module.video_id): module
+        for module in CourseModuleItem.objects.filter(
+            item_type="video",
+            course_id__in={course_id for _, course_id, _ in crossings},
+            video_id__in={row.video_id for row, _, _ in crossings},
+        )
+    }
+
+    for row, course_id, duration in crossings:
+        try:
+            with transaction.atomic():
+                claimed = StudentVideoProgress.objects.filter(
+                    pk=row.pk, is_completed=False
+                ).update(
+                    is_completed=True,
+                    completed_at=timezone.now(),
+                    last_position=duration,
+                    watched_seconds=duration,
+                )
+                if not claimed:
+                    continue
+
+                module = modules.get((course_id, row.video_id))
+                user = users.get(row.user_id)
+                if module and user:
+                    complete_module(user, module)
+        except Exception:
+            # left incomplete; the next heartbeat past 90% retries it
+            logger.exception(
+                "Video completion failed user=%s video=%s", row.user_id, row.video_id
+            )
@@ -0,0 +1,275 @@
+# api/video_uploads.py
+
+"""
+Resumable chunked uploads of source videos.
+
+Protocol (admin only):
+
+    POST   /admin-videos/upload-sessions/                 create → upload_id
+    PUT    /admin-videos/upload-sessions/<id>/            one chunk, with
+           Content-Range: bytes <start>-<end>/<size>
+    GET    /admin-videos/upload-sessions/<id>/            current offset
+    POST   /admin-videos/upload-sessions/<id>/finalize/   size check + enqueue
+    DELETE /admin-videos/upload-sessions/<id>/            abort
+
+Chunks must arrive in order: a chunk is only accepted at the committed
+offset, so a client that lost its connection asks for the offset and
+continues from there. Only finalize creates the Video and enqueues the
+processing pipeline. The optional sha256 is checked by the video worker,
+which hashes the source anyway, so finalize never reads the whole file
+inside the request.
+"""
+
+import fcntl
+import hashlib
+import os
+import re
+import shutil
+import uuid
+
+from django.conf import settings
+
+from api.models import Video, VideoUploadSession
+from api.video_jobs import job_work_dir, set_job
+
+ALLOWED_VIDEO_EXTENSIONS = {".mp4", ".mov", ".mkv", ".m4v", ".webm"}
+
+COPY_BUFFER = 1024 * 1024
+
+_CONTENT_RANGE = re.compile(r"^bytes (\d+)-(\d+)/(\d+)$")
+
+
+class UploadError(Exception):
+    """
+    Client error; `status` is the HTTP status to answer with and
+    `offset` the committed offset where that helps the client resume.
+    """
+
+    def __init__(self, message, status=400, offset=None):
+        super().__init__(message)
+        self.status = status
+        self.offset = offset
+
+
+def session_dir(session):
+    return os.path.join(settings.VIDEO_WORK_DIR, "uploads", str(session.id))
+
+
+def part_path(session):
+    return os.path.join(session_dir(session), "source.part")
+
+
+class _SessionLock:
+    """
+    Non-blocking flock per session: one chunk (or finalize) at a time.
+    """
+
+    def __init__(self, session):
+        os.makedirs(session_dir(session), exist_ok=True)
+        self._fd = os.open(os.path.join(session_dir(session), "lock"), os.O_CREAT | os.O_RDWR, 0o644)
+        try:
+            fcntl.flock(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(self._fd)
+            raise UploadError("Another request is writing to this upload", status=409)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        finally:
+            os.close(self._fd)
+
+
+def parse_content_range(header):
+    """
+    "bytes <start>-<end>/<size>" → (start, end, size), end inclusive.
+    """
+    match = _CONTENT_RANGE.match((header or "").strip())
+    if not match:
+        raise UploadError("Content-Range: bytes <start>-<end>/<size> is required")
+    start, end, size = (int(value) for value in match.groups())
+    if end < start:
+        raise UploadError("Invalid Content-Range")
+    return start, end, size
+
+
+def create_session(*, course, user, filename, size, sha256="", title="Video",
+                   description="", language="en"):
+    ext = os.path.splitext(filename or "")[1].lower()
+    if ext not in ALLOWED_VIDEO_EXTENSIONS:
+        raise UploadError("Unsupported format. Upload a video file (mp4/mov/mkv/m4v/webm).")
+    try:
+        size = int(size)
+    except (TypeError, ValueError):
+        raise UploadError("size must be the total file size in bytes")
+    if size <= 0:
+        raise UploadError("size must be the total file size in bytes")
+    sha256 = (sha256 or "").strip().lower()
+    if sha256 and not re.fullmatch(r"[0-9a-f]{64}", sha256):
+        raise UploadError("sha256 must be a hex digest")
+
+    session = VideoUploadSession.objects.create(
+        course=course,
+        created_by=user,
+        filename=filename,
+        size=size,
+        sha256=sha256,
+        title=title or "Video",
+        description=description or "",
+        language=language or "en",
+    )
+    os.makedirs(session_dir(session), exist_ok=True)
+    return session
+
+
+def write_chunk(session, content_range, stream, content_length):
+    """
+    Append one chunk at the committed offset. The offset only moves once
+    the whole chunk is on disk, so a dropped request leaves nothing
+    half-committed. Returns the new offset.
+    """
+    if session.status != "open":
+        raise UploadError(f"Upload is {session.status}", status=409)
+
+    start, end, size = parse_content_range(content_range)
+    length = end - start + 1
+    if size != session.size or end >= session.size:
+        raise UploadError("Content-Range does not match the upload size")
+    if content_length != length:
+        raise UploadError("Content-Length does not match Content-Range")
+    if length > settings.VIDEO_UPLOAD_MAX_CHUNK_BYTES:
+        raise UploadError("Chunk too large", status=413)
+
+    with _SessionLock(session):
+        session.refresh_from_db(fields=["received", "status"])
+        if session.status != "open":
+            raise UploadError(f"Upload is {session.status}", status=409)
+        if start != session.received:
+            raise UploadError("Chunk does not start at the upload offset", status=409, offset=session.received)
+
+        path = part_path(session)
+        mode = "r+b" if os.path.exists(path) else "wb"
+        with open(path, mode) as part:
+            part.seek(start)
+            remaining = length
+            while remaining > 0:
+                data = stream.read(min(COPY_BUFFER, remaining))
+                if not data:
+                    raise UploadError("Chunk ended early", offset=session.received)
+                part.write(data)
+                remaining -= len(data)
+            part.truncate()
+            part.flush()
+            os.fsync(part.fileno())
+
+        updated = VideoUploadSession.objects.filter(
+            pk=session.pk, received=start, status="open"
+        ).update(received=end + 1)
+        if not updated:
+            # finalized, aborted or moved on while the chunk was written
+            session.refresh_from_db(fields=["received", "status"])
+            raise UploadError("Upload changed while the chunk was written", status=409, offset=session.received)
+        session.received = end + 1
+    return session.received
+
+
+def sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(COPY_BUFFER), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def abort_session(session):
+    with _SessionLock(session):
+        # the caller's copy may predate a finalize that held the lock
+        session.refresh_from_db(fields=["status"])
+        if session.status == "finalized":
+            raise UploadError("Upload is already finalized", status=409)
+        session.status = "aborted"
+        session.save(update_fields=["status", "updated_at"])
+    shutil.rmtree(session_dir(session), ignore_errors=True)
+
+
+def queue_video_job(*, job_id, video, language, input_path, temp_dir, message, source_key=None,
+                    expected_sha256=""):
+    """
+    Publish the initial job state and hand the source to the video worker.
+    With `source_key`, the worker downloads the source from R2 to
+    `input_path` first; with `expected_sha256` it fails the job when the
+    source does not match.
+    """
+    from api.tasks import process_video_upload
+
+    set_job(
+        job_id,
+        id=job_id,
+        status="processing",
+        phase="upload",
+        message=message,
+        upload_progress=100,
+        subtitle_progress=0,
+        hls_progress=0,
+        cloudflare_progress=0,
+        video_id=video.id,
+    )
+    process_video_upload.delay(
+        job_id=job_id,
+        video_id=video.id,
+        course_id=video.course_id,
+        lesson_key=f"lesson_{video.id}",
+        input_path=input_path,
+        temp_dir=temp_dir,
+        language=language,
+        source_key=source_key,
+        expected_sha256=expected_sha256,
+    )
+
+
+def finalize_session(session):
+    """
+    Check the size, move the file into a job work dir and enqueue
+    processing; the checksum is verified by the worker. Returns
+    (job_id, video).
+    """
+    with _SessionLock(session):
+        session.refresh_from_db()
+        if session.status != "open":
+            raise UploadError(f"Upload is {session.status}", status=409)
+        if session.received != session.size:
+            raise UploadError("Upload is incomplete", status=409, offset=session.received)
+
+        path = part_path(session)
+        video = Video.objects.create(
+            course=session.course,
+            title=session.title,
+            description=session.description,
+            status="uploading",
+        )
+        job_id = str(uuid.uuid4())
+        temp_dir = job_work_dir(job_id)
+        ext = os.path.splitext(session.filename)[1].lower()
+        input_path = os.path.join(temp_dir, f"source{ext}")
+        # same VIDEO_WORK_DIR filesystem: a rename, not a copy
+        os.replace(path, input_path)
+
+        session.status = "finalized"
+        session.job_id = job_id
+        session.video = video
+        session.save(update_fields=["status", "job_id", "video", "updated_at"])
+
+    shutil.rmtree(session_dir(session), ignore_errors=True)
+    queue_video_job(
+        job_id=job_id,
+        video=video,
+        language=session.language,
+        input_path=input_path,
+        temp_dir=temp_dir,
+        message="Upload received. Processing started.",
+        expected_sha256=session.sha256,
+    )
+    return job_id, video
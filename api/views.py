@@ -9,6 +9,7 @@ from django.contrib.auth import authenticate
 from django.conf import settings
 from django.http import FileResponse, HttpResponse, Http404
 import razorpay
+import redis
 import os
 import zipfile
 from rest_framework.views import APIView
@@ -23,12 +24,21 @@ from .models import (
     CustomUser, Course, Video, Enrollment,
     CourseModuleItem, Test,
     StudentTest, StudentAnswer, Question,
-    SEOPageMeta, SEOChangeBackup
+    SEOPageMeta, SEOChangeBackup, StudentCourseProgression
 )
+from .progression import complete_module, get_progression
+from .enrollment_cache import is_enrolled
+from .grading import submit_test_attempt
+from . import zip_index
+from .zip_index import (
+    find_entry, index_matches, index_tree, index_video_attachment,
+    iter_member, member_data_offset, open_attachment, read_member,
+)
+from .video_progress import buffer_heartbeat, get_progress_target, pending_position
 from .serializers import (
     UserSerializer, UserSignupSerializer, CourseSerializer,
     CourseListSerializer, VideoSerializer, EnrollmentSerializer,
-    CourseModuleSerializer, TestDetailSerializer,
+    CourseModuleSerializer, TestDetailSerializer, serialize_course_modules,
     SEOPageMetaSerializer, CourseSEOMetaSerializer, JobSEOMetaSerializer,
     SEOChangeBackupSerializer, AdminUserManagementSerializer
 )
@@ -385,39 +395,20 @@ class CourseDetailAPIView(APIView):
         )
 
 def get_user_unlock_status(user, course):
-    if not Enrollment.objects.filter(user=user, course=course).exists():
+    if not is_enrolled(user, course):
         return []
     
-    modules = CourseModuleItem.objects.filter(course=course).order_by("order")
-    unlocked_modules = []
-
-    last_completed = True  # First module always unlocked
-
-    for module in modules:
-        module_data = CourseModuleSerializer(module, context={"request": None}).data
-
-        if last_completed:
-            module_data["is_unlocked"] = True
-        else:
-            module_data["is_unlocked"] = False
-
-        unlocked_modules.append(module_data)
+    modules = list(
+        CourseModuleItem.objects.filter(course=course)
+        .select_related("video", "test")
+        .order_by("order")
+    )
+    progression = get_progression(user, course.id, [m.id for m in modules])
 
-        # ---------- Update last_completed for NEXT module ----------
-        if module.item_type == "video":
-            last_completed = True
-
-        elif module.item_type == "test":
-            attempt = StudentTest.objects.filter(
-                user=user, test=module.test
-            ).first()
-
-            if attempt and attempt.score >= (attempt.total_marks / 2):
-                last_completed = True
-            else:
-                last_completed = False
-
-    return unlocked_modules
+    return serialize_course_modules(
+        modules,
+        unlocked_module_ids=progression.unlocked_module_ids()
+    )
 
 
 
@@ -432,39 +423,30 @@ class CourseModulesAPIView(APIView):
         user = request.user
         course = get_object_or_404(Course, id=course_id)
 
-        is_enrolled = Enrollment.objects.filter(
-            user=user,
-            course=course
-        ).exists()
+        enrolled = is_enrolled(user, course)
 
-        modules = CourseModuleItem.objects.filter(
-            course=course
-        ).order_by("order")
+        # One query for modules + their video/test rows
+        modules = list(
+            CourseModuleItem.objects.filter(course=course)
+            .select_related("video", "test")
+            .order_by("order")
+        )
 
         # Keep unlock progression only for enrolled students
-        if is_enrolled:
-            first = modules.first()
-            if first:
-                StudentModuleUnlock.objects.get_or_create(
-                    user=user,
-                    module=first,
-                    defaults={"is_unlocked": True}
-                )
-
-        response = []
-        for module in modules:
-            item = CourseModuleSerializer(
-                module,
-                context={
-                    "request": request,
-                    "user": user
-                }
-            ).data
-
-            if not is_enrolled:
-                item["is_unlocked"] = False
-
-            response.append(item)
+        if enrolled:
+            progression = get_progression(user, course.id, [m.id for m in modules])
+            response = serialize_course_modules(
+                modules,
+                user=user,
+                request=request,
+                unlocked_module_ids=progression.unlocked_module_ids()
+            )
+        else:
+            response = serialize_course_modules(
+                modules,
+                request=request,
+                unlocked_module_ids=set()
+            )
 
         return Response(response)
 
@@ -482,7 +464,7 @@ class CreatePaymentOrderAPIView(APIView):
         course = get_object_or_404(Course, id=request.data.get("course_id"))
         coordinator_id = request.data.get("coordinator_id")
 
-        if Enrollment.objects.filter(user=request.user, course=course).exists():
+        if is_enrolled(request.user, course):
             return Response({"error": "Already enrolled"}, status=400)
 
         order = razorpay_client.order.create({
@@ -576,32 +558,44 @@ class VerifyPaymentAPIView(APIView):
 from django.http import FileResponse
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
-from django.http import StreamingHttpResponse
-from wsgiref.util import FileWrapper
+from django.http import HttpResponseRedirect, StreamingHttpResponse
+from .r2 import content_type_for, presigned_get_url, stream_r2_object
 
 
 class StreamVideoAPIView(APIView):
-    authentication_classes = []   # ❌ no auth
-    permission_classes = []       # ❌ no permission
+    """
+    The source MP4 of a video (Video.source_key in R2), for seeking
+    players. "redirect" mode answers with a short-lived presigned R2 URL
+    so the bytes never pass through gunicorn; "stream" mode proxies
+    single byte ranges (206) in fixed-size chunks.
+    """
+    permission_classes = [IsAuthenticated]
 
     def get(self, request, course_id, video_id):
         course = get_object_or_404(Course, id=course_id)
-        if not Enrollment.objects.filter(user=request.user, course=course).exists():
+        if not is_enrolled(request.user, course):
             return Response({"error": "Not enrolled"}, status=403)
         video = resolve_video_for_requested_course(course, video_id)
         if not video:
             return Response({"error": "Video not found in this course"}, status=404)
+        if not video.source_key:
+            return Response({"error": "No streamable source for this video"}, status=404)
 
-        file = video.video_file.open("rb")
-
-        response = StreamingHttpResponse(
-            FileWrapper(file),
-            content_type="video/mp4"
-        )
-        response["Accept-Ranges"] = "bytes"
+        if settings.VIDEO_STREAM_MODE == "redirect":
+            response = HttpResponseRedirect(
+                presigned_get_url(video.source_key, expires_in=settings.VIDEO_STREAM_URL_TTL)
+            )
+        else:
+            response = stream_r2_object(
+                request,
+                video.source_key,
+                content_type=content_type_for(video.source_key),
+                chunk_size=settings.VIDEO_STREAM_CHUNK_BYTES,
+            )
         response["Cache-Control"] = "no-store"
-
         return response
+
+
 # ============================================================
 # TEST SYSTEM
 # ============================================================
@@ -613,10 +607,7 @@ class CourseTestsAPIView(APIView):
         # -------------------------------
         # 1️⃣ Enrollment check
         # -------------------------------
-        if not Enrollment.objects.filter(
-            user=request.user,
-            course_id=course_id,
-        ).exists():
+        if not is_enrolled(request.user, course_id):
             return Response(
                 {"error": "You are not enrolled in this course"},
                 status=403
@@ -677,10 +668,7 @@ class SubmitTestAPIView(APIView):
         # ----------------------------------
         # 2️⃣ Enrollment check
         # ----------------------------------
-        if not Enrollment.objects.filter(
-            user=request.user,
-            course_id=course_id,
-        ).exists():
+        if not is_enrolled(request.user, course_id):
             return Response(
                 {"error": "You are not enrolled in this course"},
                 status=status.HTTP_403_FORBIDDEN
@@ -702,55 +690,17 @@ class SubmitTestAPIView(APIView):
             )
 
         # ----------------------------------
-        # 4️⃣ Create new attempt (ALWAYS)
+        # 4️⃣ Grade in memory + create new attempt (ALWAYS)
         # ----------------------------------
-        student_test = StudentTest.objects.create(
-            user=request.user,
-            test=test
-        )
-
-        score = 0
-        total = 0
         answers = request.data.get("answers", {})
+        student_test = submit_test_attempt(request.user, test, answers)
 
-        # ----------------------------------
-        # 5️⃣ Evaluate answers
-        # ----------------------------------
-        for qid, selected in answers.items():
-            question = Question.objects.filter(
-                id=qid,
-                test=test
-            ).first()
-
-            if not question:
-                continue
-
-            is_correct = question.correct_answer == selected
-            marks = question.marks if is_correct else 0
-
-            score += marks
-            total += question.marks
-
-            StudentAnswer.objects.create(
-                student_test=student_test,
-                question=question,
-                selected_answer=selected,
-                is_correct=is_correct,
-                marks_awarded=marks
-            )
-
-        # ----------------------------------
-        # 6️⃣ Pass logic (>= 50%)
-        # ----------------------------------
-        passed = total > 0 and score >= (total * 0.5)
-
-        student_test.score = score
-        student_test.total_marks = total
-        student_test.passed = passed
-        student_test.save()
+        score = student_test.score
+        total = student_test.total_marks
+        passed = student_test.passed
 
         # ======================================================
-        # 7️⃣ IF PASSED → COMPLETE MODULE & UNLOCK NEXT
+        # 5️⃣ IF PASSED → COMPLETE MODULE & UNLOCK NEXT
         # ======================================================
         if passed:
             current_module = CourseModuleItem.objects.filter(
@@ -760,29 +710,10 @@ class SubmitTestAPIView(APIView):
             ).first()
 
             if current_module:
-                StudentContentProgress.objects.update_or_create(
-                    user=request.user,
-                    module=current_module,
-                    defaults={
-                        "is_completed": True,
-                        "completed_at": timezone.now()
-                    }
-                )
-
-                next_module = CourseModuleItem.objects.filter(
-                    course_id=course_id,
-                    order__gt=current_module.order
-                ).order_by("order").first()
-
-                if next_module:
-                    StudentModuleUnlock.objects.update_or_create(
-                        user=request.user,
-                        module=next_module,
-                        defaults={"is_unlocked": True}
-                    )
+                complete_module(request.user, current_module)
 
         # ----------------------------------
-        # 8️⃣ Response
+        # 6️⃣ Response
         # ----------------------------------
         return Response({
             "message": "Test submitted successfully",
@@ -803,10 +734,7 @@ class TestHistoryAPIView(APIView):
         # ----------------------------------
         # 1️⃣ Enrollment check (MANDATORY)
         # ----------------------------------
-        if not Enrollment.objects.filter(
-            user=request.user,
-            course_id=course_id,
-        ).exists():
+        if not is_enrolled(request.user, course_id):
             return Response(
                 {"error": "You are not enrolled in this course"},
                 status=status.HTTP_403_FORBIDDEN
@@ -944,10 +872,7 @@ class AttachmentPreviewAPIView(APIView):
         )
 
         # Enrollment check
-        if not Enrollment.objects.filter(
-            user=request.user,
-            course_id=course_id,
-        ).exists():
+        if not is_enrolled(request.user, course_id):
             return Response(
                 {"error": "You are not enrolled in this course"},
                 status=403
@@ -972,10 +897,7 @@ class AttachmentTreeAPIView(APIView):
     def get(self, request, course_id, video_id):
         video = get_object_or_404(Video, id=video_id, course_id=course_id)
 
-        if not Enrollment.objects.filter(
-            user=request.user,
-            course_id=course_id,
-        ).exists():
+        if not is_enrolled(request.user, course_id):
             return Response({"error": "You are not enrolled"}, status=403)
 
         if not video.folder_attachment:
@@ -984,20 +906,16 @@ class AttachmentTreeAPIView(APIView):
         if not video.folder_attachment.name.lower().endswith(".zip"):
             return Response({"tree": {}})
 
-        # ✅ MUST OPEN FIRST (Cloudflare R2)
-        with video.folder_attachment.open("rb") as f:
-            zip_bytes = BytesIO(f.read())
-
-        with zipfile.ZipFile(zip_bytes, "r") as z:
-            files = [f for f in z.namelist() if not f.endswith("/")]
+        # ✅ Answer from the stored central-directory index (no R2 read);
+        # index once if it is missing or belongs to an older file
+        index = video.attachment_index
+        if not index_matches(index, video.folder_attachment.name):
+            index = index_video_attachment(video)
 
-        tree = {}
-        for f in files:
-            current = tree
-            for part in f.split("/"):
-                current = current.setdefault(part, {})
+        if not index:
+            return Response({"tree": {}})
 
-        return Response({"tree": tree})
+        return Response({"tree": index_tree(index)})
 
 
 class AttachmentContentAPIView(APIView):
@@ -1006,34 +924,65 @@ class AttachmentContentAPIView(APIView):
     def get(self, request, course_id, video_id, file_path):
         video = get_object_or_404(Video, id=video_id, course_id=course_id)
 
-        if not Enrollment.objects.filter(
-            user=request.user,
-            course_id=course_id,
-        ).exists():
+        if not is_enrolled(request.user, course_id):
             return Response({"error": "You are not enrolled"}, status=403)
 
         if not video.folder_attachment:
             return Response({"content": ""})
 
-        try:
-            with video.folder_attachment.open("rb") as f:
-                zip_bytes = BytesIO(f.read())
+        index = video.attachment_index
+        if not index_matches(index, video.folder_attachment.name):
+            index = index_video_attachment(video)
+
+        entry = find_entry(index, file_path) if index else None
+        if not entry or file_path.endswith("/"):
+            return Response({"content": "Unable to read file"})
 
-            with zipfile.ZipFile(zip_bytes, "r") as z:
-                content = z.read(file_path).decode("utf-8", errors="ignore")
+        file_size = entry[zip_index.FILE_SIZE]
+        if file_size > settings.ATTACHMENT_CONTENT_MAX_BYTES:
+            return Response({"error": "File too large to preview"}, status=413)
 
+        # ✅ Only this member's bytes are fetched (ranged GETs on R2)
+        f = open_attachment(video.folder_attachment, size=index["size"])
+
+        if file_size > settings.ATTACHMENT_CONTENT_INLINE_BYTES:
+            # check the local header before the 200 goes out
+            try:
+                data_offset = member_data_offset(f, entry)
+            except Exception as e:
+                f.close()
+                logger.warning("Attachment read failed video=%s path=%s: %s", video.id, file_path, e)
+                return Response({"error": "Unable to read file"}, status=502)
+
+            def stream():
+                try:
+                    yield from iter_member(
+                        f, entry, settings.ATTACHMENT_CONTENT_MAX_BYTES, data_offset=data_offset
+                    )
+                finally:
+                    f.close()
+
+            return StreamingHttpResponse(stream(), content_type="text/plain; charset=utf-8")
+
+        try:
+            data = read_member(f, entry, settings.ATTACHMENT_CONTENT_INLINE_BYTES)
+            content = data.decode("utf-8", errors="ignore")
         except Exception as e:
+            logger.warning("Attachment read failed video=%s path=%s: %s", video.id, file_path, e)
             content = "Unable to read file"
+        finally:
+            f.close()
 
         return Response({"content": content})
 
 
-from django.http import HttpResponse
+from django.http import FileResponse, HttpResponse, HttpResponseRedirect
 from django.shortcuts import get_object_or_404
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated,AllowAny
 from io import BytesIO
 import os
+from .r2 import presigned_get_url, stream_r2_object
 
 class AttachmentDownloadAPIView(APIView):
     permission_classes = [AllowAny]  # ✅ PUBLIC
@@ -1044,14 +993,34 @@ class AttachmentDownloadAPIView(APIView):
         if not video.folder_attachment:
             return HttpResponse("No attachment", status=404)
 
-        with video.folder_attachment.open("rb") as f:
-            zip_bytes = f.read()
+        attachment = video.folder_attachment
+        filename = os.path.basename(attachment.name)
 
-        filename = os.path.basename(video.folder_attachment.name)
+        # Local/dev storage: plain file response
+        if not hasattr(attachment.storage, "bucket_name"):
+            return FileResponse(
+                attachment.open("rb"),
+                as_attachment=True,
+                filename=filename,
+                content_type="application/zip"
+            )
 
-        response = HttpResponse(zip_bytes, content_type="application/zip")
-        response["Content-Disposition"] = f'attachment; filename="{filename}"'
-        return response
+        # ✅ "redirect" → short-lived presigned R2 URL (worker is freed at once)
+        if settings.ATTACHMENT_DOWNLOAD_MODE == "redirect":
+            url = presigned_get_url(
+                attachment.name,
+                expires_in=settings.ATTACHMENT_DOWNLOAD_URL_TTL,
+                filename=filename
+            )
+            return HttpResponseRedirect(url)
+
+        # ✅ "stream" → chunked proxy with Range / 206 support
+        return stream_r2_object(
+            request,
+            attachment.name,
+            content_type="application/zip",
+            filename=filename
+        )
 
 class CourseVideosAPIView(APIView):
     permission_classes = [permissions.IsAuthenticated]
@@ -1059,10 +1028,7 @@ class CourseVideosAPIView(APIView):
     def get(self, request, course_id, video_id=None):
         course = get_object_or_404(Course, id=course_id)
 
-        if not Enrollment.objects.filter(
-            user=request.user,
-            course=course
-        ).exists():
+        if not is_enrolled(request.user, course):
             return Response(
                 {"error": "You must enroll in this course"},
                 status=403
@@ -1385,23 +1351,9 @@ class CompleteVideoAPIView(APIView):
             item_type="video"
         )
 
-        StudentContentProgress.objects.update_or_create(
-            user=request.user,
-            module=module,
-            defaults={"is_completed": True}
-        )
-
-        next_module = CourseModuleItem.objects.filter(
-            course=module.course,
-            order=module.order + 1
-        ).first()
-
-        if next_module:
-            StudentModuleUnlock.objects.update_or_create(
-                user=request.user,
-                module=next_module,
-                defaults={"is_unlocked": True}
-            )
+        # same path as video progress and test submit: the next module by
+        # order (gaps included), then the materialized state
+        complete_module(request.user, module)
 
         return Response({"message": "Video completed"})
 
@@ -1424,42 +1376,68 @@ from api.models import (
 )
 from django.conf import settings
 
-from moviepy.editor import VideoFileClip
 import tempfile
 import shutil
-from moviepy.editor import VideoFileClip
+from django.db.models import Q
 
 
 
 class UpdateVideoDurationAPIView(APIView):
+    """
+    Duration and media info are probed from the source by the processing
+    pipeline. POST still takes the duration the player reports, but only
+    for videos that were never probed (external playlists, admin-created
+    or legacy rows), and only once.
+    """
     permission_classes = [IsAuthenticated]
 
-    def post(self, request, course_id, video_id):
-        duration = int(request.data.get("duration", 0))
+    def get(self, request, course_id, video_id):
+        course = get_object_or_404(Course, id=course_id)
+        if not is_enrolled(request.user, course):
+            return Response({"error": "Not enrolled"}, status=403)
+
+        video = resolve_video_for_requested_course(course, video_id)
+        if not video:
+            return Response({"error": "Video not found in this course"}, status=404)
 
-        if duration <= 0:
-            return Response({"error": "Invalid duration"}, status=400)
+        return Response({
+            "video_id": video.id,
+            "duration": video.duration,
+            "width": video.width,
+            "height": video.height,
+            "frame_rate": video.frame_rate,
+            "video_codec": video.video_codec,
+            "audio_codec": video.audio_codec,
+            "bitrate": video.bitrate,
+        })
 
+    def post(self, request, course_id, video_id):
         course = get_object_or_404(Course, id=course_id)
-        if not Enrollment.objects.filter(user=request.user, course=course).exists():
+        if not is_enrolled(request.user, course):
             return Response({"error": "Not enrolled"}, status=403)
 
         video = resolve_video_for_requested_course(course, video_id)
         if not video:
             return Response({"error": "Video not found in this course"}, status=404)
 
-        # Save only once
-        if not video.duration or video.duration == 0:
-            video.duration = duration
-            video.save(update_fields=["duration"])
+        if not video.duration:
+            try:
+                duration = int(float(request.data.get("duration", 0)))
+            except (TypeError, ValueError):
+                duration = 0
+            if duration <= 0:
+                return Response({"error": "Invalid duration"}, status=400)
+
+            # a probed (or earlier reported) duration always wins
+            Video.objects.filter(Q(duration__isnull=True) | Q(duration=0), id=video.id).update(duration=duration)
 
-        return Response({"duration": video.duration})
+        return self.get(request, course_id, video_id)
 
 
 def ensure_video_duration(video):
     """
     Return video duration safely.
-    Duration is saved from frontend once.
+    Duration is probed from the source when the video is processed.
     """
     return video.duration or 0
 
@@ -1491,56 +1469,6 @@ from rest_framework.permissions import IsAuthenticated
 from django.shortcuts import get_object_or_404
 from api.models import Video
 
-class SaveVideoDurationAPIView(APIView):
-    permission_classes = [IsAuthenticated]
-
-    def post(self, request, course_id, video_id):
-        # ✅ Ensure course exists
-        course = get_object_or_404(Course, id=course_id)
-
-        video = resolve_video_for_requested_course(course, video_id)
-        if not video:
-            return Response({"error": "Video not found in this course"}, status=404)
-
-        # ✅ Save duration only once
-        if video.duration:
-            return Response(
-                {
-                    "video_id": video.id,
-                    "duration": video.duration,
-                    "message": "Duration already saved"
-                },
-                status=200
-            )
-
-        duration = request.data.get("duration")
-
-        try:
-            duration = int(duration)
-        except (TypeError, ValueError):
-            return Response(
-                {"error": "Invalid duration"},
-                status=400
-            )
-
-        if duration <= 0:
-            return Response(
-                {"error": "Duration must be greater than 0"},
-                status=400
-            )
-
-        video.duration = duration
-        video.save(update_fields=["duration"])
-
-        return Response(
-            {
-                "course_id": course.id,
-                "video_id": video.id,
-                "duration": video.duration
-            },
-            status=201
-        )
-
 MAX_FORWARD_SKIP = 1800  # ✅ 30 minutes (in seconds)
 
 class UpdateVideoProgressAPIView(APIView):
@@ -1553,9 +1481,7 @@ class UpdateVideoProgressAPIView(APIView):
         user = request.user
         course = get_object_or_404(Course, id=course_id)
 
-        if not Enrollment.objects.filter(
-            user=user, course=course
-        ).exists():
+        if not is_enrolled(user, course):
             return Response({"error": "Not enrolled"}, status=403)
 
         video = resolve_video_for_requested_course(course, video_id)
@@ -1571,6 +1497,15 @@ class UpdateVideoProgressAPIView(APIView):
 
         watched = progress.watched_seconds if progress else 0
         completed = progress.is_completed if progress else False
+        last_position = progress.last_position if progress else 0
+
+        # ⏳ Heartbeats not yet flushed (write-behind mode)
+        if settings.VIDEO_PROGRESS_WRITE_BEHIND and not completed:
+            buffered = pending_position(user.id, course.id, video.id)
+            if buffered is not None:
+                buffered = min(buffered, duration)
+                watched = max(watched, buffered)
+                last_position = max(last_position, buffered)
 
         percentage = (
             int((watched / duration) * 100)
@@ -1584,7 +1519,7 @@ class UpdateVideoProgressAPIView(APIView):
             "duration": duration,
             "watched_seconds": watched,
             "progress_percent": percentage,
-            "last_position": progress.last_position if progress else 0,
+            "last_position": last_position,
             "is_completed": completed,
             "has_attachment": bool(video.folder_attachment),
 
@@ -1599,13 +1534,15 @@ class UpdateVideoProgressAPIView(APIView):
         # ⏱ current time from frontend
         current_time = int(request.data.get("current_time", 0))
 
+        if settings.VIDEO_PROGRESS_WRITE_BEHIND:
+            response = self._buffer_heartbeat(user, course_id, video_id, current_time)
+            if response is not None:
+                return response
+
         course = get_object_or_404(Course, id=course_id)
 
         # 🔒 Enrollment check
-        if not Enrollment.objects.filter(
-            user=user,
-            course=course,
-        ).exists():
+        if not is_enrolled(user, course):
             return Response({"error": "Not enrolled"}, status=403)
 
         # 🎬 Video from URL (NOT request body)
@@ -1638,10 +1575,14 @@ class UpdateVideoProgressAPIView(APIView):
         # 🔒 SAFE SYNC
         # ==============================
         duration = ensure_video_duration(video)
-        capped_time = min(current_time, duration)
-
-        progress.last_position = max(progress.last_position, capped_time)
-        progress.watched_seconds = max(progress.watched_seconds, capped_time)
+        if duration:
+            capped_time = min(current_time, duration)
+            progress.last_position = max(progress.last_position, capped_time)
+            progress.watched_seconds = max(progress.watched_seconds, capped_time)
+        else:
+            # duration not known yet: keep the resume position, but watch
+            # time cannot be validated, so it is not credited
+            progress.last_position = max(progress.last_position, current_time)
 
         # ==============================
         # ✅ COMPLETION CHECK (>= 90%)
@@ -1653,26 +1594,7 @@ class UpdateVideoProgressAPIView(APIView):
                 progress.last_position = duration
                 progress.watched_seconds = duration
 
-                StudentContentProgress.objects.update_or_create(
-                    user=user,
-                    module=module,
-                    defaults={
-                        "is_completed": True,
-                        "completed_at": timezone.now()
-                    }
-                )
-
-                next_module = CourseModuleItem.objects.filter(
-                    course=course,
-                    order__gt=module.order
-                ).order_by("order").first()
-
-                if next_module:
-                    StudentModuleUnlock.objects.update_or_create(
-                        user=user,
-                        module=next_module,
-                        defaults={"is_unlocked": True}
-                    )
+                complete_module(user, module)
                 # else:
                 #     Enrollment.objects.filter(
                 #         user=user,
@@ -1688,6 +1610,50 @@ class UpdateVideoProgressAPIView(APIView):
             "is_completed": progress.is_completed
         })
 
+    # ==============================
+    # WRITE-BEHIND HEARTBEAT
+    # ==============================
+    def _buffer_heartbeat(self, user, course_id, video_id, current_time):
+        """
+        Record the position in Redis and return; the DB row is written by
+        api.tasks.flush_video_progress. Enrollment and the (course, video)
+        → module lookup come from cache, so a warm heartbeat does no SQL.
+        Returns None when the video's duration is still unknown or Redis
+        is unavailable, so post() falls back to the synchronous path.
+
+        The response only carries `last_position` (the furthest buffered
+        position) and `buffered: True`: watch time and completion live in
+        the DB row, which this path does not read. GET returns the merged
+        values.
+        """
+        if not is_enrolled(user, course_id):
+            return Response({"error": "Not enrolled"}, status=403)
+
+        course = Course(id=course_id)
+        target = get_progress_target(course, video_id, resolve_video_for_requested_course)
+        if not target:
+            return Response({"error": "Video not found in this course"}, status=404)
+
+        duration = target["duration"]
+        if not duration:
+            # nothing to clamp against yet; the synchronous path records
+            # the resume position without crediting watch time
+            return None
+
+        try:
+            position = buffer_heartbeat(
+                user.id, course.id, target["video_id"], min(current_time, duration)
+            )
+        except redis.RedisError as exc:
+            logger.warning("Video progress buffer write failed; writing synchronously: %s", exc)
+            return None
+
+        return Response({
+            "video_id": target["video_id"],
+            "last_position": position,
+            "buffered": True
+        })
+
 
 
 class CourseModuleProgressAPIView(APIView):
@@ -1700,46 +1666,29 @@ class CourseModuleProgressAPIView(APIView):
         course = get_object_or_404(Course, id=course_id)
 
         # 2️⃣ Enrollment check
-        if not Enrollment.objects.filter(
-            user=user,
-            course=course,
-        ).exists():
+        if not is_enrolled(user, course):
             return Response(
                 {"error": "You are not enrolled in this course"},
                 status=403
             )
 
         # 3️⃣ Fetch all modules in order
-        modules = CourseModuleItem.objects.filter(
-            course=course
-        ).order_by("order")
-
-        response = []
-        previous_completed = False
+        modules = list(
+            CourseModuleItem.objects.filter(course=course)
+            .select_related("video", "test")
+            .order_by("order")
+        )
 
-        for index, module in enumerate(modules):
-            # 🔓 FIRST MODULE ALWAYS UNLOCKED
-            if index == 0:
-                unlocked = True
-            else:
-                unlocked = previous_completed
+        # 4️⃣ Unlock/completion state → single progression row
+        progression = get_progression(user, course.id, [m.id for m in modules])
+        states = progression.state_map()
 
-            # ✅ CHECK COMPLETION
-            if module.item_type == "video" and module.video:
-                completed = StudentVideoProgress.objects.filter(
-                    user=user,
-                    video=module.video,
-                    is_completed=True
-                ).exists()
-            else:
-                completed = StudentContentProgress.objects.filter(
-                    user=user,
-                    module=module,
-                    is_completed=True
-                ).exists()
+        response = []
 
-            # 🔥 UPDATE previous_completed for next iteration
-            previous_completed = completed
+        for module in modules:
+            state = states.get(module.id, StudentCourseProgression.LOCKED)
+            unlocked = state != StudentCourseProgression.LOCKED
+            completed = state == StudentCourseProgression.COMPLETED
 
             item_data = {
                 "module_id": module.id,
@@ -2164,10 +2113,7 @@ class CourseVideoAllProgressAPIView(APIView):
 
     def get(self, request, course_id):
         # 🔐 ensure enrolled
-        if not Enrollment.objects.filter(
-            user=request.user,
-            course_id=course_id,
-        ).exists():
+        if not is_enrolled(request.user, course_id):
             return Response({"error": "Not enrolled"}, status=403)
 
         videos = Video.objects.filter(course_id=course_id)
@@ -2271,6 +2217,20 @@ from rest_framework.permissions import IsAuthenticated
 import boto3
 from django.conf import settings
 
+from django.core import signing
+from botocore.exceptions import ClientError
+
+from api.r2 import (
+    abort_multipart_upload,
+    complete_multipart_upload,
+    create_multipart_upload,
+    get_r2_client,
+    list_uploaded_parts,
+    multipart_part_size,
+    presign_upload_parts,
+)
+
+
 class R2PresignedUploadView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -2284,15 +2244,7 @@ class R2PresignedUploadView(APIView):
         ext = filename.split(".")[-1]
         key = f"uploads/raw/{uuid.uuid4()}.{ext}"
 
-        s3 = boto3.client(
-            "s3",
-            region_name="auto",
-            endpoint_url=settings.AWS_S3_ENDPOINT_URL,
-            aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-        )
-
-        url = s3.generate_presigned_url(
+        url = get_r2_client().generate_presigned_url(
             ClientMethod="put_object",
             Params={
                 "Bucket": settings.AWS_STORAGE_BUCKET_NAME,
@@ -2309,6 +2261,129 @@ class R2PresignedUploadView(APIView):
         })
 
 
+# -------------------------
+# Multipart direct-to-R2 upload
+# initiate → presign parts → (browser PUTs parts to R2) → complete / abort
+# -------------------------
+MULTIPART_TOKEN_SALT = "r2-multipart-upload"
+
+
+def _load_multipart_token(token):
+    """
+    (key, upload_id) from an upload token, or None. The token is signed,
+    so clients can only touch uploads this API started.
+    """
+    try:
+        data = signing.loads(
+            token or "",
+            salt=MULTIPART_TOKEN_SALT,
+            max_age=settings.R2_MULTIPART_TOKEN_TTL,
+        )
+    except signing.BadSignature:
+        return None
+    return data["key"], data["upload_id"]
+
+
+class R2MultipartUploadView(APIView):
+    permission_classes = [IsAuthenticated, IsAdminUserRole]
+
+    def post(self, request):
+        filename = request.data.get("filename")
+        content_type = request.data.get("content_type")
+        try:
+            size = int(request.data.get("size") or 0)
+        except (TypeError, ValueError):
+            size = 0
+
+        if not filename or size <= 0:
+            return Response({"error": "filename and size required"}, status=400)
+
+        ext = filename.split(".")[-1]
+        key = f"uploads/raw/{uuid.uuid4()}.{ext}"
+        upload_id = create_multipart_upload(key, content_type=content_type)
+        part_size = multipart_part_size(size)
+
+        return Response({
+            "upload_token": signing.dumps({"key": key, "upload_id": upload_id}, salt=MULTIPART_TOKEN_SALT),
+            "key": key,
+            "part_size": part_size,
+            "part_count": -(-size // part_size),
+        }, status=201)
+
+
+class R2MultipartPartsView(APIView):
+    permission_classes = [IsAuthenticated, IsAdminUserRole]
+
+    def get(self, request):
+        """
+        Parts already in R2, for resuming after a reload.
+        """
+        upload = _load_multipart_token(request.query_params.get("upload_token"))
+        if not upload:
+            return Response({"error": "Invalid or expired upload_token"}, status=400)
+        key, upload_id = upload
+        return Response({"key": key, "parts": list_uploaded_parts(key, upload_id)})
+
+    def post(self, request):
+        upload = _load_multipart_token(request.data.get("upload_token"))
+        if not upload:
+            return Response({"error": "Invalid or expired upload_token"}, status=400)
+
+        try:
+            part_numbers = sorted({int(n) for n in request.data.get("part_numbers") or []})
+        except (TypeError, ValueError):
+            return Response({"error": "part_numbers must be integers"}, status=400)
+        if not part_numbers or part_numbers[0] < 1 or part_numbers[-1] > 10000:
+            return Response({"error": "part_numbers must be between 1 and 10000"}, status=400)
+        if len(part_numbers) > settings.R2_MULTIPART_MAX_PRESIGN:
+            return Response({"error": f"At most {settings.R2_MULTIPART_MAX_PRESIGN} parts per request"}, status=400)
+
+        key, upload_id = upload
+        urls = presign_upload_parts(key, upload_id, part_numbers, expires_in=settings.R2_MULTIPART_URL_TTL)
+        return Response({
+            "key": key,
+            "urls": {str(number): url for number, url in urls.items()},
+            "expires_in": settings.R2_MULTIPART_URL_TTL,
+        })
+
+
+class R2MultipartCompleteView(APIView):
+    permission_classes = [IsAuthenticated, IsAdminUserRole]
+
+    def post(self, request):
+        upload = _load_multipart_token(request.data.get("upload_token"))
+        if not upload:
+            return Response({"error": "Invalid or expired upload_token"}, status=400)
+        key, upload_id = upload
+
+        try:
+            # parts: [{"PartNumber": 1, "ETag": "..."}]; omitted → what R2 recorded
+            size = complete_multipart_upload(key, upload_id, parts=request.data.get("parts"))
+        except ClientError as err:
+            return Response({"error": f"Could not complete upload: {err}"}, status=400)
+
+        return Response({
+            "key": key,
+            "size": size,
+            "public_url": f"{settings.R2_PUBLIC_URL}/{key}",
+        })
+
+
+class R2MultipartAbortView(APIView):
+    permission_classes = [IsAuthenticated, IsAdminUserRole]
+
+    def post(self, request):
+        upload = _load_multipart_token(request.data.get("upload_token"))
+        if not upload:
+            return Response({"error": "Invalid or expired upload_token"}, status=400)
+        key, upload_id = upload
+        try:
+            abort_multipart_upload(key, upload_id)
+        except ClientError as err:
+            return Response({"error": f"Could not abort upload: {err}"}, status=400)
+        return Response({"key": key, "status": "aborted"})
+
+
 
 from api.models import Video
 
@@ -2396,247 +2471,24 @@ from rest_framework.permissions import IsAuthenticated
 import boto3
 
 from .models import Video, Course
+from .models import VideoUploadSession
+from .video_checkpoints import load_checkpoint
+from .video_jobs import get_job, job_work_dir, set_job
+from .video_uploads import (
+    ALLOWED_VIDEO_EXTENSIONS,
+    UploadError,
+    abort_session,
+    create_session,
+    finalize_session,
+    queue_video_job,
+    write_chunk,
+)
 
 logger = logging.getLogger(__name__)
 
 
 class AdminVideoUploadZipAPIView(APIView):
     permission_classes = [IsAuthenticated, IsAdminUserRole]
-    _whisper_model = None
-    _whisper_device = None
-    _ffmpeg_nvenc_available = None
-    _jobs = {}
-    _jobs_lock = threading.Lock()
-
-    @staticmethod
-    def _seconds_to_vtt_time(seconds):
-        hours = int(seconds // 3600)
-        minutes = int((seconds % 3600) // 60)
-        secs = float(seconds % 60)
-        return f"{hours:02}:{minutes:02}:{secs:06.3f}"
-
-    @classmethod
-    def _get_whisper_model(cls):
-        if cls._whisper_model is not None:
-            return cls._whisper_model, cls._whisper_device
-
-        import torch
-        import whisper
-
-        model_name = getattr(settings, "WHISPER_MODEL", "base")
-        device = "cuda" if torch.cuda.is_available() else "cpu"
-        cls._whisper_model = whisper.load_model(model_name, device=device)
-        cls._whisper_device = device
-        return cls._whisper_model, cls._whisper_device
-
-    @classmethod
-    def _has_ffmpeg_nvenc(cls):
-        if cls._ffmpeg_nvenc_available is not None:
-            return cls._ffmpeg_nvenc_available
-        try:
-            res = subprocess.run(
-                ["ffmpeg", "-hide_banner", "-encoders"],
-                capture_output=True,
-                text=True,
-                check=False,
-            )
-            output = f"{res.stdout}\n{res.stderr}"
-            cls._ffmpeg_nvenc_available = "h264_nvenc" in output
-        except Exception:
-            cls._ffmpeg_nvenc_available = False
-        return cls._ffmpeg_nvenc_available
-
-    @classmethod
-    def _set_job(cls, job_id, **updates):
-        with cls._jobs_lock:
-            current = cls._jobs.get(job_id, {})
-            current.update(updates)
-            cls._jobs[job_id] = current
-            return current
-
-    @classmethod
-    def _get_job(cls, job_id):
-        with cls._jobs_lock:
-            job = cls._jobs.get(job_id)
-            return dict(job) if job else None
-
-    @classmethod
-    def _build_s3_client(cls):
-        return boto3.client(
-            "s3",
-            endpoint_url=settings.AWS_S3_ENDPOINT_URL,
-            aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-            region_name=settings.AWS_S3_REGION_NAME,
-            config=boto3.session.Config(
-                signature_version=settings.AWS_S3_SIGNATURE_VERSION
-            ),
-        )
-
-    @classmethod
-    def _run_pipeline(cls, *, job_id, video_id, course_id, lesson_key, input_path, temp_dir, language):
-        hls_root = os.path.join(temp_dir, "hls")
-        os.makedirs(hls_root, exist_ok=True)
-        base_r2_path = f"videos/course-{course_id}/{lesson_key}/hls"
-
-        try:
-            cls._set_job(job_id, phase="subtitle", subtitle_progress=1, message="Generating subtitles...")
-            subtitle_path = os.path.join(hls_root, "VideoProject.vtt")
-            subtitle_warning = None
-
-            try:
-                whisper_model, whisper_device = cls._get_whisper_model()
-                logger.info("[job:%s] Whisper device: %s", job_id, whisper_device)
-                transcript = whisper_model.transcribe(
-                    input_path,
-                    language=language,
-                    verbose=False,
-                    fp16=(whisper_device == "cuda"),
-                )
-                segments = transcript.get("segments", [])
-                total = max(len(segments), 1)
-                with open(subtitle_path, "w", encoding="utf-8") as vtt:
-                    vtt.write("WEBVTT\n\n")
-                    for idx, segment in enumerate(segments, start=1):
-                        start = cls._seconds_to_vtt_time(segment.get("start", 0))
-                        end = cls._seconds_to_vtt_time(segment.get("end", 0))
-                        text = (segment.get("text", "") or "").strip()
-                        if text:
-                            logger.info("subtitle_line start=%s end=%s text=%s", start, end, text)
-                            vtt.write(f"{start} --> {end}\n{text}\n\n")
-                        progress = int((idx / total) * 100)
-                        cls._set_job(job_id, subtitle_progress=progress)
-                        logger.info("[job:%s] subtitle_progress=%s", job_id, progress)
-            except Exception as subtitle_err:
-                logger.warning("[job:%s] Subtitle generation unavailable: %s", job_id, subtitle_err)
-                subtitle_warning = f"Subtitle generation unavailable: {subtitle_err}"
-                with open(subtitle_path, "w", encoding="utf-8") as vtt:
-                    vtt.write("WEBVTT\n\n")
-                cls._set_job(job_id, subtitle_progress=100)
-
-            cls._set_job(job_id, phase="hls", hls_progress=1, message="Converting to HLS...")
-            use_nvenc = cls._has_ffmpeg_nvenc()
-            logger.info("[job:%s] FFmpeg NVENC available: %s", job_id, use_nvenc)
-
-            ffmpeg_cmd = [
-                "ffmpeg", "-y",
-                "-i", input_path,
-                "-filter_complex",
-                "[0:v]split=3[v480src][v720src][v1080src];"
-                "[v480src]scale=854:480[v480];"
-                "[v720src]scale=1280:720[v720];"
-                "[v1080src]scale=1920:1080[v1080]",
-                "-map", "[v480]", "-map", "0:a?",
-                "-c:v:0", "h264_nvenc" if use_nvenc else "libx264", "-b:v:0", "1400k",
-                "-g", "90", "-keyint_min", "90", "-sc_threshold", "0",
-                "-force_key_frames", "expr:gte(t,n_forced*3)",
-                "-map", "[v720]", "-map", "0:a?",
-                "-c:v:1", "h264_nvenc" if use_nvenc else "libx264", "-b:v:1", "2800k",
-                "-g", "90", "-keyint_min", "90", "-sc_threshold", "0",
-                "-force_key_frames", "expr:gte(t,n_forced*3)",
-                "-map", "[v1080]", "-map", "0:a?",
-                "-c:v:2", "h264_nvenc" if use_nvenc else "libx264", "-b:v:2", "5000k",
-                "-g", "90", "-keyint_min", "90", "-sc_threshold", "0",
-                "-force_key_frames", "expr:gte(t,n_forced*3)",
-                "-c:a", "aac", "-b:a", "128k",
-                "-hls_time", "3",
-                "-hls_playlist_type", "vod",
-                "-hls_flags", "independent_segments",
-                "-hls_segment_filename", os.path.join(hls_root, "%v", "segment_%03d.ts"),
-                "-master_pl_name", "master.m3u8",
-                "-var_stream_map",
-                "v:0,a:0,name:480p v:1,a:1,name:720p v:2,a:2,name:1080p",
-                os.path.join(hls_root, "%v", "index.m3u8"),
-            ]
-
-            ffmpeg_result = subprocess.run(ffmpeg_cmd, capture_output=True, text=True)
-            if ffmpeg_result.returncode != 0 and use_nvenc:
-                logger.warning("[job:%s] NVENC failed; retrying with libx264", job_id)
-                ffmpeg_cmd_cpu = ["libx264" if token == "h264_nvenc" else token for token in ffmpeg_cmd]
-                ffmpeg_result = subprocess.run(ffmpeg_cmd_cpu, capture_output=True, text=True)
-
-            if ffmpeg_result.returncode != 0:
-                raise RuntimeError(f"FFmpeg conversion failed: {ffmpeg_result.stderr[:400]}")
-
-            cls._set_job(job_id, hls_progress=100)
-            logger.info("[job:%s] hls_progress=100", job_id)
-
-            master_path = os.path.join(hls_root, "master.m3u8")
-            if not os.path.exists(master_path):
-                raise RuntimeError("master.m3u8 not generated")
-
-            cls._set_job(job_id, phase="cloudflare", cloudflare_progress=1, message="Uploading to Cloudflare R2...")
-            files_to_upload = []
-            for root, _, files in os.walk(hls_root):
-                for file in files:
-                    local_path = os.path.join(root, file)
-                    relative_path = os.path.relpath(local_path, hls_root).replace("\\", "/")
-                    files_to_upload.append((local_path, relative_path))
-
-            total_files = max(len(files_to_upload), 1)
-            s3 = cls._build_s3_client()
-
-            for idx, (local_path, relative_path) in enumerate(files_to_upload, start=1):
-                r2_key = f"{base_r2_path}/{relative_path}"
-                if relative_path.endswith(".m3u8"):
-                    content_type = "application/vnd.apple.mpegurl"
-                elif relative_path.endswith(".ts"):
-                    content_type = "video/MP2T"
-                elif relative_path.endswith(".vtt"):
-                    content_type = "text/vtt"
-                else:
-                    content_type = "application/octet-stream"
-
-                s3.upload_file(
-                    local_path,
-                    settings.AWS_STORAGE_BUCKET_NAME,
-                    r2_key,
-                    ExtraArgs={"ContentType": content_type},
-                )
-                progress = int((idx / total_files) * 100)
-                cls._set_job(job_id, cloudflare_progress=progress)
-                logger.info("[job:%s] cloudflare_progress=%s file=%s", job_id, progress, relative_path)
-
-            playlist_url = (
-                f"{settings.R2_PUBLIC_BASE_URL}/"
-                f"videos/course-{course_id}/{lesson_key}/hls/master.m3u8"
-            )
-
-            video = Video.objects.get(id=video_id)
-            video.video_url = playlist_url
-            video.status = "ready"
-            video.save(update_fields=["video_url", "status"])
-
-            result = {
-                "status": "completed",
-                "phase": "done",
-                "message": "Completed successfully.",
-                "subtitle_progress": 100,
-                "hls_progress": 100,
-                "cloudflare_progress": 100,
-                "playlist_url": playlist_url,
-                "subtitle": "VideoProject.vtt",
-            }
-            if subtitle_warning:
-                result["subtitle_warning"] = subtitle_warning
-            cls._set_job(job_id, **result)
-        except Exception as e:
-            logger.exception("[job:%s] Video pipeline failed", job_id)
-            try:
-                video = Video.objects.get(id=video_id)
-                video.status = "failed"
-                video.save(update_fields=["status"])
-            except Exception:
-                pass
-            cls._set_job(
-                job_id,
-                status="failed",
-                phase="failed",
-                message=str(e),
-                error=str(e),
-            )
-        finally:
-            shutil.rmtree(temp_dir, ignore_errors=True)
 
     def post(self, request):
         logger.info("Video processing upload request received")
@@ -2651,8 +2503,7 @@ class AdminVideoUploadZipAPIView(APIView):
             return JsonResponse({"error": "Missing video file or course_id"}, status=400)
 
         ext = os.path.splitext(upload_file.name)[1].lower()
-        allowed_ext = {".mp4", ".mov", ".mkv", ".m4v", ".webm"}
-        if ext not in allowed_ext:
+        if ext not in ALLOWED_VIDEO_EXTENSIONS:
             return JsonResponse(
                 {"error": "Unsupported format. Upload a video file (mp4/mov/mkv/m4v/webm)."},
                 status=400,
@@ -2667,43 +2518,128 @@ class AdminVideoUploadZipAPIView(APIView):
             status="uploading"
         )
 
-        temp_dir = tempfile.mkdtemp()
+        # Shared work dir: the Celery video worker picks the file up from here
+        job_id = str(uuid.uuid4())
+        temp_dir = job_work_dir(job_id)
         input_path = os.path.join(temp_dir, f"source{ext}")
-        upload_size = getattr(upload_file, "size", 0) or 0
-        written = 0
         with open(input_path, "wb+") as dst:
             for chunk in upload_file.chunks():
                 dst.write(chunk)
-                written += len(chunk)
 
-        lesson_key = f"lesson_{video.id}"
-        job_id = str(uuid.uuid4())
-        self._set_job(
-            job_id,
-            id=job_id,
-            status="processing",
-            phase="upload",
+        queue_video_job(
+            job_id=job_id,
+            video=video,
+            language=language,
+            input_path=input_path,
+            temp_dir=temp_dir,
             message="Upload received. Processing started.",
-            upload_progress=100 if upload_size == 0 else int((written / upload_size) * 100),
-            subtitle_progress=0,
-            hls_progress=0,
-            cloudflare_progress=0,
-            video_id=video.id,
         )
 
-        threading.Thread(
-            target=self._run_pipeline,
-            kwargs={
+        return JsonResponse(
+            {
                 "job_id": job_id,
                 "video_id": video.id,
-                "course_id": course.id,
-                "lesson_key": lesson_key,
-                "input_path": input_path,
-                "temp_dir": temp_dir,
-                "language": language,
+                "status": "processing",
+                "message": "Upload complete. Processing in background.",
             },
-            daemon=True,
-        ).start()
+            status=202,
+        )
+
+
+# -------------------------
+# Resumable chunked upload (see api/video_uploads.py)
+# -------------------------
+
+def _upload_error_response(err):
+    body = {"error": str(err)}
+    if err.offset is not None:
+        body["offset"] = err.offset
+    return JsonResponse(body, status=err.status)
+
+
+def _upload_session_payload(session):
+    return {
+        "upload_id": str(session.id),
+        "status": session.status,
+        "offset": session.received,
+        "size": session.size,
+        "chunk_size": settings.VIDEO_UPLOAD_CHUNK_BYTES,
+        "job_id": session.job_id or None,
+        "video_id": session.video_id,
+    }
+
+
+class AdminVideoUploadSessionCreateAPIView(APIView):
+    permission_classes = [IsAuthenticated, IsAdminUserRole]
+
+    def post(self, request):
+        course_id = request.data.get("course_id")
+        if not course_id:
+            return JsonResponse({"error": "course_id is required"}, status=400)
+        course = get_object_or_404(Course, id=course_id)
+
+        try:
+            session = create_session(
+                course=course,
+                user=request.user,
+                filename=request.data.get("filename", ""),
+                size=request.data.get("size"),
+                sha256=request.data.get("sha256", ""),
+                title=request.data.get("title", "Video"),
+                description=request.data.get("description", ""),
+                language=request.data.get("language", "en"),
+            )
+        except UploadError as err:
+            return _upload_error_response(err)
+
+        return JsonResponse(_upload_session_payload(session), status=201)
+
+
+class AdminVideoUploadSessionAPIView(APIView):
+    permission_classes = [IsAuthenticated, IsAdminUserRole]
+
+    def get(self, request, upload_id):
+        session = get_object_or_404(VideoUploadSession, id=upload_id)
+        return JsonResponse(_upload_session_payload(session), status=200)
+
+    def put(self, request, upload_id):
+        session = get_object_or_404(VideoUploadSession, id=upload_id)
+        try:
+            content_length = int(request.META.get("CONTENT_LENGTH") or 0)
+        except ValueError:
+            content_length = 0
+
+        try:
+            # raw body, read straight from the socket in 1 MB pieces
+            offset = write_chunk(
+                session,
+                request.META.get("HTTP_CONTENT_RANGE"),
+                request.stream,
+                content_length,
+            )
+        except UploadError as err:
+            return _upload_error_response(err)
+
+        return JsonResponse({"upload_id": str(session.id), "offset": offset, "size": session.size}, status=200)
+
+    def delete(self, request, upload_id):
+        session = get_object_or_404(VideoUploadSession, id=upload_id)
+        try:
+            abort_session(session)
+        except UploadError as err:
+            return _upload_error_response(err)
+        return JsonResponse({"upload_id": str(session.id), "status": "aborted"}, status=200)
+
+
+class AdminVideoUploadSessionFinalizeAPIView(APIView):
+    permission_classes = [IsAuthenticated, IsAdminUserRole]
+
+    def post(self, request, upload_id):
+        session = get_object_or_404(VideoUploadSession, id=upload_id)
+        try:
+            job_id, video = finalize_session(session)
+        except UploadError as err:
+            return _upload_error_response(err)
 
         return JsonResponse(
             {
@@ -2716,14 +2652,119 @@ class AdminVideoUploadZipAPIView(APIView):
         )
 
 
+class AdminVideoProcessR2APIView(APIView):
+    """
+    Start the processing pipeline for a source video that was uploaded
+    straight to R2 (multipart flow). The worker downloads it itself.
+    """
+    permission_classes = [IsAuthenticated, IsAdminUserRole]
+
+    def post(self, request):
+        key = request.data.get("key", "")
+        course_id = request.data.get("course_id")
+        language = request.data.get("language", "en")
+
+        if not key or not course_id:
+            return JsonResponse({"error": "Missing key or course_id"}, status=400)
+        ext = os.path.splitext(key)[1].lower()
+        if not key.startswith("uploads/raw/") or ext not in ALLOWED_VIDEO_EXTENSIONS:
+            return JsonResponse({"error": "key must be an uploaded video under uploads/raw/"}, status=400)
+
+        course = get_object_or_404(Course, id=course_id)
+        try:
+            get_r2_client().head_object(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=key)
+        except ClientError:
+            return JsonResponse({"error": "Uploaded object not found"}, status=404)
+
+        video = Video.objects.create(
+            course=course,
+            title=request.data.get("title", "Video"),
+            description=request.data.get("description", ""),
+            status="uploading",
+            source_key=key,
+        )
+
+        job_id = str(uuid.uuid4())
+        temp_dir = job_work_dir(job_id)
+        input_path = os.path.join(temp_dir, f"source{ext}")
+        queue_video_job(
+            job_id=job_id,
+            video=video,
+            language=language,
+            input_path=input_path,
+            temp_dir=temp_dir,
+            message="Source is in R2. Processing queued.",
+            source_key=key,
+        )
+
+        return JsonResponse(
+            {
+                "job_id": job_id,
+                "video_id": video.id,
+                "status": "processing",
+                "message": "Processing in background.",
+            },
+            status=202,
+        )
+
+
 class AdminVideoUploadProgressAPIView(APIView):
     permission_classes = [IsAuthenticated, IsAdminUserRole]
 
     def get(self, request, job_id):
-        job = AdminVideoUploadZipAPIView._get_job(job_id)
+        job = get_job(job_id)
         if not job:
             return JsonResponse({"error": "Job not found"}, status=404)
         return JsonResponse(job, status=200)
+
+
+class AdminVideoJobRetryAPIView(APIView):
+    """
+    Re-queue a failed job. The pipeline resumes from the checkpoints in
+    its work dir, so finished phases (subtitles, encoding, uploaded
+    files) are not redone.
+    """
+    permission_classes = [IsAuthenticated, IsAdminUserRole]
+
+    def post(self, request, job_id):
+        from .tasks import process_video_upload
+
+        # <uuid:job_id> in the route: the id is safe to use as a dir name
+        job_id = str(job_id)
+        job = get_job(job_id) or {}
+        if job.get("status") == "processing":
+            return JsonResponse({"error": "Job is still processing"}, status=409)
+
+        state = load_checkpoint(os.path.join(settings.VIDEO_WORK_DIR, "jobs", job_id))
+        task = (state or {}).get("task")
+        if not task:
+            return JsonResponse({"error": "Nothing left to resume for this job; upload the video again"}, status=404)
+
+        # claim the retry: of two concurrent clicks only one updates the row
+        claimed = Video.objects.filter(id=task["video_id"]).exclude(
+            status__in=("processing", "ready")
+        ).update(status="processing")
+        if not claimed:
+            video = Video.objects.filter(id=task["video_id"]).first()
+            if video is None:
+                return JsonResponse({"error": "Video not found"}, status=404)
+            if video.status == "ready":
+                return JsonResponse({"error": "Video is already processed"}, status=409)
+            return JsonResponse({"error": "Job is already being retried"}, status=409)
+
+        set_job(
+            job_id,
+            status="processing",
+            phase="queued",
+            message="Retrying from the last checkpoint...",
+            error=None,
+            resumable=False,
+        )
+        process_video_upload.delay(**task)
+        return JsonResponse(
+            {"job_id": job_id, "checkpoints": sorted(state.get("phases", {}))},
+            status=202,
+        )
 from urllib.parse import quote
 from api.serializers import ContactUsSerializer, ProductEnquirySerializer
 from .models import Contactus, ProductEnquiry
@@ -0,0 +1,242 @@
+# api/zip_index.py
+
+"""
+Central-directory index for zip attachments.
+
+The index is parsed once when Video.folder_attachment is saved and stored
+in Video.attachment_index, so listing an attachment never touches R2:
+
+    {
+        "v": 1,
+        "name": "<storage name of the zip>",
+        "size": <archive bytes>,
+        "entries": [[path, compress_type, compress_size, file_size,
+                     header_offset, crc], ...]
+    }
+"""
+
+import logging
+import struct
+import zipfile
+import zlib
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 1
+
+# positions inside an entry row
+NAME, COMPRESS_TYPE, COMPRESS_SIZE, FILE_SIZE, HEADER_OFFSET, CRC = range(6)
+
+LOCAL_HEADER_SIZE = 30
+LOCAL_HEADER_SIGNATURE = b"PK\x03\x04"
+# room for the local "extra" field, which may differ from the central one
+LOCAL_EXTRA_SLACK = 256
+
+
+class MemberReadError(Exception):
+    pass
+
+
+def build_zip_index(fileobj, name):
+    """
+    Parse the central directory of a seekable zip file object.
+    Returns None when the file is not a readable zip.
+    """
+    try:
+        fileobj.seek(0, 2)
+        size = fileobj.tell()
+        fileobj.seek(0)
+
+        # zipfile only reads the end record + central directory here
+        with zipfile.ZipFile(fileobj, "r") as z:
+            entries = [
+                [
+                    info.filename,
+                    info.compress_type,
+                    info.compress_size,
+                    info.file_size,
+                    info.header_offset,
+                    info.CRC,
+                ]
+                for info in z.infolist()
+            ]
+    except (zipfile.BadZipFile, OSError, ValueError) as exc:
+        logger.warning("Could not index zip %s: %s", name, exc)
+        return None
+    finally:
+        try:
+            fileobj.seek(0)
+        except Exception:
+            pass
+
+    return {"v": INDEX_VERSION, "name": name, "size": size, "entries": entries}
+
+
+def index_matches(index, name):
+    return bool(index) and index.get("v") == INDEX_VERSION and index.get("name") == name
+
+
+def find_entry(index, path):
+    for entry in index["entries"]:
+        if entry[NAME] == path:
+            return entry
+    return None
+
+
+def index_tree(index):
+    """
+    Nested {name: {...}} tree of the files in the archive.
+    """
+    tree = {}
+    for entry in index["entries"]:
+        path = entry[NAME]
+        if path.endswith("/"):
+            continue
+        current = tree
+        for part in path.split("/"):
+            current = current.setdefault(part, {})
+    return tree
+
+
+def open_attachment(attachment, size=None):
+    """
+    Seekable file object for a stored attachment. On R2 every read is a
+    ranged GET instead of a download of the whole archive; pass the
+    indexed `size` to skip the HEAD that would look it up.
+    """
+    if hasattr(attachment.storage, "bucket_name"):
+        from .r2 import R2RangeReader
+        return R2RangeReader(attachment.name, size=size)
+    return attachment.open("rb")
+
+
+def _data_start(header, entry):
+    if len(header) < LOCAL_HEADER_SIZE or header[:4] != LOCAL_HEADER_SIGNATURE:
+        raise MemberReadError(f"Bad local header for {entry[NAME]}")
+    name_len, extra_len = struct.unpack("<HH", header[26:30])
+    return LOCAL_HEADER_SIZE + name_len + extra_len
+
+
+def _decompressor(entry):
+    if entry[COMPRESS_TYPE] == zipfile.ZIP_STORED:
+        return None
+    if entry[COMPRESS_TYPE] == zipfile.ZIP_DEFLATED:
+        return zlib.decompressobj(-15)
+    raise MemberReadError(f"Unsupported compression for {entry[NAME]}")
+
+
+def read_member(f, entry, max_bytes):
+    """
+    Read and inflate one member using its stored offsets. Header and
+    compressed data normally come back in a single ranged read.
+    """
+    compress_size = entry[COMPRESS_SIZE]
+    guess = (
+        LOCAL_HEADER_SIZE + len(entry[NAME].encode("utf-8"))
+        + LOCAL_EXTRA_SLACK + compress_size
+    )
+
+    f.seek(entry[HEADER_OFFSET])
+    blob = f.read(guess)
+    start = _data_start(blob, entry)
+
+    data = blob[start:start + compress_size]
+    if len(data) < compress_size:
+        f.seek(entry[HEADER_OFFSET] + start + len(data))
+        data += f.read(compress_size - len(data))
+
+    decompressor = _decompressor(entry)
+    if decompressor is not None:
+        # cap output: central-directory sizes are not trusted
+        data = decompressor.decompress(data, max_bytes + 1)
+        if len(data) <= max_bytes:
+            data += decompressor.flush()
+
+    if len(data) > max_bytes:
+        raise MemberReadError(f"{entry[NAME]} is larger than {max_bytes} bytes")
+    if zlib.crc32(data) != entry[CRC]:
+        raise MemberReadError(f"CRC mismatch for {entry[NAME]}")
+    return data
+
+
+def member_data_offset(f, entry):
+    """
+    Read and check the member's local header; returns the offset of its
+    compressed data. Raises MemberReadError when the header is not there
+    (e.g. the archive changed after it was indexed).
+    """
+    f.seek(entry[HEADER_OFFSET])
+    header = f.read(LOCAL_HEADER_SIZE)
+    return entry[HEADER_OFFSET] + _data_start(header, entry)
+
+
+def iter_member(f, entry, max_bytes, chunk_size=256 * 1024, data_offset=None):
+    """
+    Yield the inflated bytes of one member, reading the compressed data
+    as one streamed range when the file object supports it. Pass
+    `data_offset` from member_data_offset() to check the header before
+    a response is committed.
+    """
+    if data_offset is None:
+        data_offset = member_data_offset(f, entry)
+    compress_size = entry[COMPRESS_SIZE]
+
+    if hasattr(f, "iter_range"):
+        chunks = f.iter_range(data_offset, compress_size, chunk_size)
+    else:
+        def _chunks():
+            f.seek(data_offset)
+            remaining = compress_size
+            while remaining > 0:
+                chunk = f.read(min(chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+        chunks = _chunks()
+
+    decompressor = _decompressor(entry)
+
+    def _inflated():
+        for chunk in chunks:
+            if decompressor is None:
+                yield chunk
+                continue
+            # bounded output per step, so one chunk cannot balloon
+            data = decompressor.decompress(chunk, chunk_size)
+            while data:
+                yield data
+                data = decompressor.decompress(decompressor.unconsumed_tail, chunk_size)
+        if decompressor is not None:
+            yield decompressor.flush()
+
+    crc = 0
+    produced = 0
+    for data in _inflated():
+        produced += len(data)
+        if produced > max_bytes:
+            logger.warning("Stopped streaming %s at %s bytes", entry[NAME], max_bytes)
+            return
+        crc = zlib.crc32(data, crc)
+        yield data
+
+    if crc != entry[CRC]:
+        logger.warning("CRC mismatch while streaming %s", entry[NAME])
+
+
+def index_video_attachment(video, save=True):
+    """
+    (Re)build video.attachment_index from the stored attachment.
+    Used for backfill and when the stored index is stale.
+    """
+    attachment = video.folder_attachment
+    index = None
+
+    if attachment and attachment.name.lower().endswith(".zip"):
+        with open_attachment(attachment) as f:
+            index = build_zip_index(f, attachment.name)
+
+    video.attachment_index = index
+    if save:
+        video.save(update_fields=["attachment_index"])
+    return index
@@ -267,6 +267,135 @@ CELERY_TIMEZONE = "Asia/Kolkata"
 # Celery hard timeout increased 50%+
 CELERY_TASK_TIME_LIMIT = 60 * 60 * 6      # 6 hours
 CELERY_TASK_SOFT_TIME_LIMIT = 60 * 60 * 5 # 5 hours
+# Redis redelivers an unacked (acks_late) task after visibility_timeout;
+# keep it above the hard limit so a long encode is not started twice
+CELERY_BROKER_TRANSPORT_OPTIONS = {"visibility_timeout": CELERY_TASK_TIME_LIMIT + 60 * 60}
+
+
+# -------------------------------------------------
+# CACHE (REDIS)
+# -------------------------------------------------
+REDIS_URL = os.getenv("REDIS_URL", "redis://127.0.0.1:6379/1")
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": REDIS_URL,
+    }
+}
+
+# Per-user enrollment set cache (api/enrollment_cache.py)
+ENROLLMENT_CACHE_TTL = 60 * 60        # shared cache, seconds
+ENROLLMENT_LOCAL_CACHE_TTL = 30       # per-process LRU, seconds
+ENROLLMENT_LOCAL_CACHE_SIZE = 10000
+
+# Attachment member preview (api/zip_index.py)
+ATTACHMENT_CONTENT_INLINE_BYTES = 1 * 1024 * 1024    # larger files are streamed
+ATTACHMENT_CONTENT_MAX_BYTES = 20 * 1024 * 1024      # hard cap → 413
+
+# Attachment download: "redirect" (presigned R2 URL) or "stream" (chunked proxy)
+ATTACHMENT_DOWNLOAD_MODE = os.getenv("ATTACHMENT_DOWNLOAD_MODE", "redirect")
+ATTACHMENT_DOWNLOAD_URL_TTL = 5 * 60   # seconds
+
+# Source MP4 playback (StreamVideoAPIView): "redirect" or "stream", as above
+VIDEO_STREAM_MODE = os.getenv("VIDEO_STREAM_MODE", "redirect")
+VIDEO_STREAM_URL_TTL = 15 * 60         # seconds
+VIDEO_STREAM_CHUNK_BYTES = 512 * 1024
+
+# Signed HLS playback URLs (api/playback.py). Off until both are set; the
+# edge worker at PLAYBACK_BASE_URL validates tokens with the same key.
+PLAYBACK_SIGNING_KEY = os.getenv("PLAYBACK_SIGNING_KEY", "")
+PLAYBACK_BASE_URL = os.getenv("PLAYBACK_BASE_URL", "")
+PLAYBACK_TOKEN_TTL = 2 * 60 * 60        # minimum lifetime of a URL
+PLAYBACK_TOKEN_WINDOW = 60 * 60         # expiry rounded up to this
+
+# Test answer keys (api/grading.py), dropped on Question save/delete
+ANSWER_KEY_CACHE_TTL = 60 * 60
+
+# Video progress heartbeats (api/video_progress.py)
+# When enabled, POSTs are buffered in Redis and flushed to MySQL in bulk.
+VIDEO_PROGRESS_WRITE_BEHIND = os.getenv("VIDEO_PROGRESS_WRITE_BEHIND", "False").lower() == "true"
+VIDEO_PROGRESS_FLUSH_INTERVAL = 5     # seconds
+VIDEO_PROGRESS_FLUSH_BATCH = 500
+VIDEO_PROGRESS_TARGET_TTL = 5 * 60    # cached (course, video) → module lookup
+VIDEO_PROGRESS_FLUSH_ATTEMPTS = 3     # then the batch is applied entry by entry
+
+# Video processing (api/video_pipeline.py) runs on its own queue:
+#   celery -A bekola worker -Q video --concurrency=1 --prefetch-multiplier=1
+# Subtitle chunks go to a warm Whisper pool:
+#   celery -A bekola worker -Q transcribe --concurrency=<models that fit in RAM/VRAM>
+CELERY_TASK_ROUTES = {
+    "api.tasks.process_video_upload": {"queue": "video"},
+    "api.tasks.transcribe_audio_chunk": {"queue": "transcribe"},
+    "api.tasks.gc_video_work_dirs": {"queue": "video"},
+}
+
+# R2 uploads (api/r2.py upload_files_parallel)
+R2_UPLOAD_WORKERS = int(os.getenv("R2_UPLOAD_WORKERS", "16"))
+R2_UPLOAD_RETRIES = 4
+R2_MAX_POOL_CONNECTIONS = 32   # >= R2_UPLOAD_WORKERS
+
+# Shared between web (writes uploads) and video workers
+VIDEO_WORK_DIR = os.getenv("VIDEO_WORK_DIR", "/tmp/bekola-video")
+VIDEO_MAX_CONCURRENT_JOBS = int(os.getenv("VIDEO_MAX_CONCURRENT_JOBS", "1"))  # per host
+VIDEO_SLOT_RETRY_DELAY = 30           # seconds before re-checking for a free slot
+VIDEO_JOB_TTL = 7 * 24 * 60 * 60      # job progress kept in Redis
+# Failed jobs keep their work dir so a retry resumes from checkpoints;
+# job and upload dirs untouched for this long are removed
+VIDEO_WORK_DIR_MAX_AGE = int(os.getenv("VIDEO_WORK_DIR_MAX_AGE", str(3 * 24 * 60 * 60)))
+VIDEO_WORK_DIR_GC_INTERVAL = 6 * 60 * 60
+# Resumable chunked uploads (api/video_uploads.py)
+VIDEO_UPLOAD_CHUNK_BYTES = 16 * 1024 * 1024       # suggested to clients
+VIDEO_UPLOAD_MAX_CHUNK_BYTES = 64 * 1024 * 1024
+# Multipart direct-to-R2 uploads (admin-videos/multipart/*)
+R2_MULTIPART_PART_BYTES = 16 * 1024 * 1024
+R2_MULTIPART_URL_TTL = 60 * 60               # presigned part URLs
+R2_MULTIPART_TOKEN_TTL = 24 * 60 * 60        # signed upload_token
+R2_MULTIPART_MAX_PRESIGN = 1000              # part URLs per request
+# CPU threads per phase (0 = library default). Subtitles and encoding run
+# at the same time, so on CPU-only hosts keep the sum near the core count.
+WHISPER_THREADS = int(os.getenv("WHISPER_THREADS", "0"))
+FFMPEG_THREADS = int(os.getenv("FFMPEG_THREADS", "0"))
+# Whisper (api/transcription.py). Off: subtitles run in one child process
+# of the video worker. On: chunks go to the "transcribe" queue, which needs
+# its own workers (see CELERY_TASK_ROUTES). Those workers must mount the
+# same VIDEO_WORK_DIR, since each chunk task gets an audio_path inside the
+# video worker's job dir. Without them, uploads wait WHISPER_POOL_TIMEOUT
+# and publish empty subtitles.
+WHISPER_POOL_ENABLED = os.getenv("WHISPER_POOL_ENABLED", "False").lower() == "true"
+WHISPER_CHUNK_SECONDS = 300
+WHISPER_CHUNK_OVERLAP = 5
+WHISPER_POOL_TIMEOUT = 3 * 60 * 60
+WHISPER_CPU_QUANTIZE = os.getenv("WHISPER_CPU_QUANTIZE", "False").lower() == "true"
+# Upload finished HLS segments while ffmpeg is still encoding
+VIDEO_OVERLAP_UPLOAD = os.getenv("VIDEO_OVERLAP_UPLOAD", "True").lower() == "true"
+# Reuse the HLS output of an earlier upload with identical source bytes
+VIDEO_DEDUPE_ENABLED = os.getenv("VIDEO_DEDUPE_ENABLED", "True").lower() == "true"
+# HLS rendition ladder (api/hls_ladder.py). Rungs taller than the source
+# are skipped; bitrates in kbit/s for <=30 fps (x1.5 above that).
+HLS_LADDER = [
+    {"name": "480p", "height": 480, "bitrate": 1400},
+    {"name": "720p", "height": 720, "bitrate": 2800},
+    {"name": "1080p", "height": 1080, "bitrate": 5000},
+]
+HLS_SEGMENT_SECONDS = 3
+# "single": one ffmpeg for the whole ladder; "per_rendition": one ffmpeg per
+# rendition, in parallel; "auto": per_rendition for multi-rung libx264 encodes
+VIDEO_ENCODE_MODE = os.getenv("VIDEO_ENCODE_MODE", "auto")
+HLS_AUDIO_BITRATE = 128
+# audio-only rendition for low-bandwidth students
+HLS_AUDIO_ONLY_BITRATE = 64
+
+CELERY_BEAT_SCHEDULE = {
+    "flush-video-progress": {
+        "task": "api.tasks.flush_video_progress",
+        "schedule": VIDEO_PROGRESS_FLUSH_INTERVAL,
+    },
+    "gc-video-work-dirs": {
+        "task": "api.tasks.gc_video_work_dirs",
+        "schedule": VIDEO_WORK_DIR_GC_INTERVAL,
+    },
+}
 
 
 import os